@@ -0,0 +1,37 @@
+import os
+import time
+
+from pytoncenter.address import Address, AddressBatch, parse_addresses
+
+"""
+Convert 100k raw addresses to the bounceable url-safe form and back, element by element and with the bulk API.
+
+python benchmarks/address_bulk.py
+"""
+
+N = 100_000
+
+
+def bench(name: str, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    print(f"  {name:<36} {N / (time.perf_counter() - start):14,.0f} addresses/s")
+    return result
+
+
+def main():
+    hash_parts = os.urandom(32 * N)
+    raws = [f"0:{hash_parts[32 * i : 32 * i + 32].hex()}" for i in range(N)]
+
+    print(f"{N} addresses, raw -> bounceable url-safe")
+    friendly = bench("Address(x).to_string", lambda: [Address(raw).to_string(True, True, True) for raw in raws])
+    assert bench("parse_addresses(...).to_strings", lambda: parse_addresses(raws).to_strings("bounceable_url")) == friendly
+    assert bench("AddressBatch.from_hash_parts", lambda: AddressBatch.from_hash_parts(hash_parts).to_strings("bounceable_url")) == friendly
+
+    print(f"{N} addresses, bounceable url-safe -> raw")
+    bench("Address(x).to_string", lambda: [Address(s).to_string(False) for s in friendly])
+    assert bench("parse_addresses(...).to_strings", lambda: parse_addresses(friendly).to_strings("raw")) == raws
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import os
+import timeit
+
+from pytoncenter.address import Address, crc16, crc16_many
+
+"""
+Compare the C backed CRC16 with the previous bit by bit implementation on 34 byte address payloads.
+
+python benchmarks/address_crc16.py
+"""
+
+N = 100_000
+
+
+def bitwise_crc16(data) -> bytearray:
+    POLY = 0x1021
+    reg = 0
+    message = bytes(data) + bytes(2)
+    for byte in message:
+        mask = 0x80
+        while mask > 0:
+            reg <<= 1
+            if byte & mask:
+                reg += 1
+            mask >>= 1
+            if reg > 0xFFFF:
+                reg &= 0xFFFF
+                reg ^= POLY
+    return bytearray([reg // 256, reg % 256])
+
+
+def main():
+    payloads = [os.urandom(34) for _ in range(N)]
+    assert [bytes(crc16(p)) for p in payloads[:1000]] == [bytes(bitwise_crc16(p)) for p in payloads[:1000]]
+    for name, stmt in (
+        ("bitwise crc16", lambda: [bitwise_crc16(p) for p in payloads]),
+        ("crc16", lambda: [crc16(p) for p in payloads]),
+        ("crc16_many", lambda: crc16_many(payloads)),
+    ):
+        elapsed = timeit.timeit(stmt, number=1)
+        print(f"{name:<16} {N / elapsed:14,.0f} checksums/s")
+
+    addresses = [f"0:{os.urandom(32).hex()}" for _ in range(N // 10)]
+    elapsed = timeit.timeit(lambda: [Address(a).to_string(True) for a in addresses], number=1)
+    print(f"{'to_string(True)':<16} {len(addresses) / elapsed:14,.0f} addresses/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import os
+import time
+import tracemalloc
+
+from pytoncenter.address import Address
+
+"""
+Measure the memory held by a million parsed addresses and the throughput of to_string, cold and memoized.
+
+python benchmarks/address_memory.py
+"""
+
+N = 1_000_000
+
+
+def main():
+    raws = [f"0:{os.urandom(32).hex()}" for _ in range(N)]
+
+    tracemalloc.start()
+    addrs = [Address(raw) for raw in raws]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # exclude the list holding the addresses
+    print(f"memory per million addresses {(size - 8 * N) / 2**20:10.1f} MiB")
+
+    for label in ("cold", "memoized"):
+        start = time.perf_counter()
+        for addr in addrs:
+            addr.to_string(True, True, True)
+        print(f"to_string {label:<9} {N / (time.perf_counter() - start):18,.0f} calls/s")
+
+    friendly = [addr.to_string(True, True, True) for addr in addrs[: N // 10]]
+    start = time.perf_counter()
+    for s in friendly:
+        Address(s)
+    print(f"parse friendly {len(friendly) / (time.perf_counter() - start):20,.0f} calls/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import os
+import time
+import tracemalloc
+
+from pytoncenter.address import Address, AddressBatch, AddressSet
+
+"""
+Compare the memory and membership throughput of AddressSet with a set of Address over 1M addresses, 100k queries of which half are members.
+
+python benchmarks/address_set.py
+"""
+
+N = 1_000_000
+Q = 100_000
+
+
+def measure(name: str, build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {name:<28} built in {elapsed:6.2f}s, {size / 2**20:8.1f} MiB")
+    return result
+
+
+def bench(name: str, fn):
+    start = time.perf_counter()
+    hits = sum(fn())
+    print(f"  {name:<28} {Q / (time.perf_counter() - start):14,.0f} queries/s ({hits} hits)")
+
+
+def main():
+    batch = AddressBatch.from_hash_parts(os.urandom(32 * N))
+    members = batch.to_strings("bounceable_url")
+    queries = members[: Q // 2] + AddressBatch.from_hash_parts(os.urandom(32 * (Q // 2))).to_strings("bounceable_url")
+
+    print(f"{N} addresses")
+    py_set = measure("set of Address", lambda: {Address(m) for m in members})
+    address_set = measure("AddressSet", lambda: AddressSet(batch))
+    bloom_set = measure("AddressSet with bloom", lambda: AddressSet(batch, bloom_bits_per_key=10))
+
+    print(f"{Q} queries")
+    bench("set of Address", lambda: [Address(q) in py_set for q in queries])
+    bench("AddressSet.contains_many", lambda: address_set.contains_many(queries))
+    bench("bloom contains_many", lambda: bloom_set.contains_many(queries))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import asyncio
+import time
+import tracemalloc
+
+from pytoncenter.decoder import Decoder, Types
+from pytoncenter.getmethod import BulkProgress
+from pytoncenter.v3.api import AsyncTonCenterClientV3
+from pytoncenter.v3.models import RunGetMethodRequest
+
+"""
+Run a get method on 100k addresses against an in-memory client, with multicall over run_get_method and with iter_get_methods,
+comparing the throughput and the peak memory.
+
+python benchmarks/bulk_getmethod.py
+"""
+
+N = 100_000
+
+
+class Client(AsyncTonCenterClientV3):
+    def __init__(self):
+        super().__init__(network="testnet", api_key="dummy", qps=10**9)
+
+    async def _async_post(self, handler: str, payload):
+        await asyncio.sleep(0)
+        return {"gas_used": 0, "exit_code": 0, "stack": [{"type": "num", "value": "0x1"}]}
+
+
+def addresses():
+    return (f"0:{i:064x}" for i in range(N))
+
+
+async def bench(name: str, fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = await fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {name:<24} {count / elapsed:10,.0f} calls/s, peak {peak / 2**20:8.1f} MiB")
+
+
+async def main():
+    client = Client()
+    decoder = Decoder(Types.Number("index"))
+
+    async def multicall():
+        results = await client.multicall([client.run_get_method(RunGetMethodRequest(address=a, method="get_index", stack=[])) for a in addresses()])
+        return len([decoder.decode(r) for r in results])
+
+    async def bulk():
+        progress = BulkProgress()
+        async for _ in client.iter_get_methods(((a, "get_index") for a in addresses()), decoder=decoder, max_concurrency=64, progress=progress):
+            pass
+        return progress.completed
+
+    print(f"{N} get methods")
+    await bench("multicall", multicall)
+    await bench("iter_get_methods", bulk)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
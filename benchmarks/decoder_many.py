@@ -0,0 +1,66 @@
+import os
+import time
+from collections import OrderedDict
+
+from tonpy import begin_cell
+
+from pytoncenter.address import Address
+from pytoncenter.decoder import Decoder, Types
+from pytoncenter.v3.models import GetMethodParameterOutput, RunGetMethodResponse
+
+"""
+Decode 50k synthetic get_wallet_data results of one jetton, comparing the previous per call validation with the compiled plan and decode_many.
+
+python benchmarks/decoder_many.py
+"""
+
+N = 50_000
+OWNERS = 5_000
+
+
+def address_cell(address: str) -> str:
+    return begin_cell().store_address(Address(address).to_string(True)).end_cell().to_boc()
+
+
+def make_results():
+    master = address_cell(f"0:{os.urandom(32).hex()}")
+    code = begin_cell().store_uint(0xDEADBEEF, 32).end_cell().to_boc()
+    owners = [address_cell(f"0:{os.urandom(32).hex()}") for _ in range(OWNERS)]
+    v3 = []
+    for i in range(N):
+        stack = [
+            GetMethodParameterOutput(type="num", value=hex(i * 10**9)),
+            GetMethodParameterOutput(type="cell", value=owners[i % OWNERS]),
+            GetMethodParameterOutput(type="cell", value=master),
+            GetMethodParameterOutput(type="cell", value=code),
+        ]
+        v3.append(RunGetMethodResponse(gas_used=0, exit_code=0, stack=stack))
+    v2 = [[{"type": p.type, "value": {"bytes": p.value} if p.type == "cell" else p.value} for p in result.stack] for result in v3]
+    return v2, v3
+
+
+def legacy_decode(decoder: Decoder, data):
+    _data = decoder._validate(data)
+    return OrderedDict((field.name, field.decode(_data[i].value)) for i, field in enumerate(decoder.types))
+
+
+def bench(name: str, fn):
+    start = time.perf_counter()
+    fn()
+    print(f"  {name:<32} {N / (time.perf_counter() - start):12,.0f} results/s")
+
+
+def main():
+    decoder = Decoder(Types.Number("balance"), Types.Address("owner"), Types.Address("jetton"), Types.B64String("jetton_wallet_code"))
+    v2, v3 = make_results()
+    for label, results in (("v2", v2), ("v3", v3)):
+        print(f"{N} {label} results, {OWNERS} distinct owners")
+        bench("validate + decode (previous)", lambda: [legacy_decode(decoder, r) for r in results])
+        bench("decode", lambda: [decoder.decode(r) for r in results])
+        bench("decode_many dict", lambda: decoder.decode_many(results))
+        bench("decode_many tuple", lambda: decoder.decode_many(results, output="tuple"))
+        bench("decode_many columns", lambda: decoder.decode_many(results, output="columns"))
+
+
+if __name__ == "__main__":
+    main()
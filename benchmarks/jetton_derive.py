@@ -0,0 +1,47 @@
+import os
+import time
+
+from tonpy import begin_cell
+
+from pytoncenter.address import Address, AddressBatch
+from pytoncenter.jetton import JettonWalletDeriver
+
+"""
+Derive the jetton wallets of 100k owners of one master, building the StateInit cells with tonpy and with JettonWalletDeriver.
+
+python benchmarks/jetton_derive.py
+"""
+
+N = 100_000
+MASTER = "EQCxE6mUtQJKFnGfaROTKOt1lZbDiiX1kCixRv7Nw2Id_sDs"
+CODE = begin_cell().store_uint(0xDEAD, 16).store_ref(begin_cell().store_uint(1, 5).end_cell()).end_cell()
+
+
+def with_cells(owners):
+    master = Address(MASTER).to_string(True)
+    wallets = []
+    for owner in owners:
+        data = begin_cell().store_grams(0).store_address(owner).store_address(master).store_ref(CODE).end_cell()
+        state_init = begin_cell().store_uint(0b0011, 4).store_ref(CODE).store_ref(data).store_uint(0, 1).end_cell()
+        wallets.append(f"0:{state_init.get_hash().lower()}")
+    return wallets
+
+
+def bench(name: str, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    print(f"  {name:<32} {N / (time.perf_counter() - start):12,.0f} owners/s")
+    return result
+
+
+def main():
+    owners = AddressBatch.from_hash_parts(os.urandom(32 * N))
+    deriver = JettonWalletDeriver()
+    deriver.register(MASTER, CODE)
+    print(f"{N} owners")
+    expected = bench("tonpy cells", with_cells, owners.to_strings("raw"))
+    assert bench("JettonWalletDeriver.derive_many", lambda: deriver.derive_many(MASTER, owners).to_strings("raw")) == expected
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import os
+import time
+
+from tonpy import begin_cell
+
+from pytoncenter.address import Address
+from pytoncenter.extension.message import JettonMessage, MessageRegistry
+
+"""
+Filter 100k synthetic jetton transfer bodies on the amount and read the destination of the 1% which are kept,
+parsing every field eagerly and lazily.
+
+PYTHONPATH=. python benchmarks/lazy_message.py
+"""
+
+N = 100_000
+THRESHOLD = 99 * 10**6
+
+
+def transfer_body(i: int) -> str:
+    destination = Address(f"0:{os.urandom(32).hex()}").to_string(True)
+    builder = begin_cell().store_uint(0x0F8A7EA5, 32).store_uint(i, 64).store_grams(i % 100 * 10**6).store_address(destination).store_address(destination)
+    payload = begin_cell().store_uint(0, 32).store_string("comment").end_cell()
+    return builder.store_uint(0, 1).store_grams(1).store_uint(1, 1).store_ref(payload).end_cell().to_boc()
+
+
+def bench(name: str, registry: MessageRegistry, bodies):
+    start = time.perf_counter()
+    kept = [msg.destination for msg in map(registry.parse, bodies) if msg.amount >= THRESHOLD]
+    print(f"  {name:<24} {N / (time.perf_counter() - start):12,.0f} bodies/s, {len(kept)} kept")
+
+
+def main():
+    bodies = [transfer_body(i) for i in range(N)]
+    print(f"{N} transfer bodies, keeping amount >= {THRESHOLD}")
+    bench("eager", MessageRegistry(JettonMessage.Transfer), bodies)
+    bench("lazy", MessageRegistry(JettonMessage.Transfer, lazy=True), bodies)
+
+
+if __name__ == "__main__":
+    main()
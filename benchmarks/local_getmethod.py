@@ -0,0 +1,59 @@
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from tonpy import begin_cell
+from tonpy.fift.fift import convert_assembler
+from tonpy.tvm.tvm import method_name_to_id
+
+from pytoncenter.address import AddressBatch
+from pytoncenter.getmethod import LocalGetMethodRunner
+from pytoncenter.v3.models import (
+    Account,
+    GetAccountRequest,
+    GetMethodParameterInput,
+    RunGetMethodRequest,
+)
+
+"""
+Run 20k get methods of 1k accounts locally, in the current process and over process pools of growing size.
+
+python benchmarks/local_getmethod.py
+"""
+
+N = 20_000
+ACCOUNTS = 1_000
+
+CODE = convert_assembler(f"<{{ SETCP0 DUP {method_name_to_id('get_counter')} INT EQUAL IFJMP:<{{ DROP c4 PUSH CTOS 64 LDU DROP ADD }}> 11 THROW }}>c").to_boc()
+
+
+class Client:
+    async def get_account(self, req: GetAccountRequest) -> Account:
+        data = begin_cell().store_uint(7, 64).end_cell().to_boc()
+        return Account(balance=0, code=CODE, data=data, last_transaction_lt=1, last_transaction_hash=None, status="active")
+
+
+async def bench(name: str, reqs, workers: int = 0):
+    runner = LocalGetMethodRunner(Client(), executor=ProcessPoolExecutor(workers) if workers else None)
+    await asyncio.gather(*[runner.load(req.address) for req in reqs[:ACCOUNTS]])
+    start = time.perf_counter()
+    if workers:
+        await runner.run_many(reqs)
+        runner._executor.shutdown()
+    else:
+        for req in reqs:
+            await runner.run_get_method(req)
+    print(f"  {name:<24} {N / (time.perf_counter() - start):10,.0f} calls/s")
+
+
+async def main():
+    addresses = AddressBatch.from_hash_parts(b"".join(i.to_bytes(32, "big") for i in range(ACCOUNTS))).to_strings("raw")
+    reqs = [RunGetMethodRequest(address=addresses[i % ACCOUNTS], method="get_counter", stack=[GetMethodParameterInput(type="num", value=i)]) for i in range(N)]
+    print(f"{N} get methods over {ACCOUNTS} accounts")
+    await bench("in process", reqs)
+    for workers in (1, 2, 4):
+        await bench(f"process pool x{workers}", reqs, workers)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
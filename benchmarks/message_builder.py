@@ -0,0 +1,49 @@
+import os
+import time
+
+from tonpy import begin_cell
+
+from pytoncenter.address import Address
+from pytoncenter.extension.message import JettonMessage, MessageBuilder
+
+"""
+Serialize 20k jetton transfers of a payout job to 2k distinct owners with the same comment, building the cells by hand,
+with `to_boc` of every message and with `MessageBuilder.build_many`.
+
+PYTHONPATH=. python benchmarks/message_builder.py
+"""
+
+N = 20_000
+OWNERS = 2_000
+
+
+def by_hand(payouts, response: Address, comment):
+    bodies = []
+    for i, (owner, amount) in enumerate(payouts):
+        b = begin_cell().store_uint(0x0F8A7EA5, 32).store_uint(i, 64).store_grams(amount)
+        b = b.store_address(owner.to_string(True)).store_address(response.to_string(True)).store_uint(0, 1)
+        bodies.append(b.store_grams(1).store_uint(1, 1).store_ref(comment).end_cell().to_boc())
+    return bodies
+
+
+def bench(name: str, fn):
+    start = time.perf_counter()
+    bodies = fn()
+    print(f"  {name:<24} {N / (time.perf_counter() - start):12,.0f} transfers/s")
+    return bodies
+
+
+def main():
+    owners = [Address(f"0:{os.urandom(32).hex()}") for _ in range(OWNERS)]
+    response = Address(f"0:{os.urandom(32).hex()}")
+    comment = begin_cell().store_uint(0, 32).store_string("payout").end_cell()
+    payouts = [(owners[i % OWNERS], i * 10**6) for i in range(N)]
+    transfers = [JettonMessage.Transfer(i, amount, owner, response, None, 1, comment) for i, (owner, amount) in enumerate(payouts)]
+    print(f"{N} transfers, {OWNERS} distinct owners")
+    expected = bench("by hand", lambda: by_hand(payouts, response, comment))
+    assert bench("to_boc", lambda: [msg.to_boc() for msg in transfers]) == expected
+    assert bench("build_many", lambda: MessageBuilder().build_many(transfers)) == expected
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import time
+
+from tonpy import CellSlice, begin_cell
+
+from pytoncenter.extension.message import (
+    JettonMessage,
+    MessageRegistry,
+    ParsedMessageCache,
+    message_registry,
+)
+from pytoncenter.utils import encode_base64, get_opcode
+from pytoncenter.v3.models import Message, MessageContent, Transaction
+
+"""
+Parse the messages of 20k synthetic transactions, a jetton transfer in and an excess plus an unknown opcode out,
+with a hand written opcode dict over get_opcode and with MessageRegistry.parse_transactions,
+then with every transaction seen twice, as in a trace where each message is an out message and an in message, with and without ParsedMessageCache.
+
+python benchmarks/message_registry.py
+"""
+
+N = 20_000
+
+TRANSFER = encode_base64(
+    "b5ee9c720101020100a10001ad0f8a7ea5000000000000000034c4b3f8017bc28408f06d3fc030d138584d9fcb47783984a2c899f8ac8a2fda3678a085fd000a5d50c10e52e1e7068f9149d6e2924659dea588b592dd5e3c9f7fd94dfde4b94973eed80101008a010000000000000000000000000000000000000000000000000000000000000016000000010000000000000000000000000000000000000000000000000147ae147ae147ae"
+)
+EXCESS = encode_base64("b5ee9c7201010101000e000018d53276db0000000000000000")
+UNKNOWN = begin_cell().store_uint(0xDEADBEEF, 32).store_uint(0, 64).end_cell().to_boc()
+
+
+def message(body: str, opcode: str, body_hash: str) -> Message:
+    return Message.model_construct(opcode=opcode, message_content=MessageContent.model_construct(hash=body_hash, body=body, decoded=None))
+
+
+def by_hand(txs):
+    parsers = {cls.OPCODE: cls for cls in (JettonMessage.Transfer, JettonMessage.Excess, JettonMessage.InternalTransfer)}
+    out = []
+    for tx in txs:
+        for msg in [tx.in_msg, *tx.out_msgs]:
+            cs = CellSlice(msg.message_content.body)
+            cls = parsers.get(get_opcode(cs.preload_uint(32)))
+            out.append(cls.parse(cs) if cls is not None else None)
+    return out
+
+
+def bench(name: str, fn, txs):
+    start = time.perf_counter()
+    fn(txs)
+    print(f"  {name:<32} {len(txs) / (time.perf_counter() - start):10,.0f} transactions/s")
+
+
+def main():
+    txs = [
+        Transaction.model_construct(hash=str(i), in_msg=message(TRANSFER, "0x0f8a7ea5", f"t{i}"), out_msgs=[message(EXCESS, "0xd53276db", f"e{i}"), message(UNKNOWN, "0xdeadbeef", f"u{i}")])
+        for i in range(N)
+    ]
+    print(f"{N} transactions, 3 messages each")
+    bench("opcode dict over get_opcode", by_hand, txs)
+    bench("MessageRegistry", message_registry.parse_transactions, txs)
+    print(f"{2 * N} transactions, every body seen twice")
+    bench("MessageRegistry", message_registry.parse_transactions, txs + txs)
+    cached = MessageRegistry(JettonMessage.Transfer, JettonMessage.Excess, cache=ParsedMessageCache())
+    bench("MessageRegistry with cache", cached.parse_transactions, txs + txs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import asyncio
+import time
+
+from tonpy import begin_cell
+
+from pytoncenter import AsyncTonCenterClientV3
+from pytoncenter.outbound import OutboundPipeline, message_hash
+from pytoncenter.v3.models import *
+
+"""
+Send 100 external messages through a simulated 25 QPS API where a request takes 50ms and a message lands 1s after it is sent,
+one at a time waiting for each confirmation with wait_message_exists, and with OutboundPipeline.
+
+PYTHONPATH=. python benchmarks/outbound_pipeline.py
+"""
+
+N = 100
+QPS = 25
+LATENCY = 0.05
+LANDING = 1.0
+
+
+class SimulatedClient(AsyncTonCenterClientV3):
+    def __init__(self):
+        super().__init__(network="testnet", api_key="dummy", qps=QPS)
+        self.sent_at = {}
+        self.requests = 0
+
+    async def _request(self):
+        async with self.limiter:
+            self.requests += 1
+            await asyncio.sleep(LATENCY)
+
+    async def send_message(self, req: ExternalMessage) -> SentMessage:
+        await self._request()
+        msg_hash = message_hash(req.boc)
+        self.sent_at.setdefault(msg_hash, time.monotonic())
+        return SentMessage(message_hash=msg_hash)
+
+    async def get_transaction_by_message(self, req: GetTransactionByMessageRequest):
+        await self._request()
+        sent_at = self.sent_at.get(req.msg_hash.upper())
+        if sent_at is None or time.monotonic() - sent_at < LANDING:
+            return [], {}
+        return [Transaction.model_construct(hash=req.msg_hash, description={"aborted": False})], {}
+
+
+async def sequential(bocs):
+    client = SimulatedClient()
+    for boc in bocs:
+        sent = await client.send_message(ExternalMessage(boc=boc))
+        async for _ in client.wait_message_exists(WaitMessageExistsRequest(msg_hash=sent.message_hash, interval=0.25)):
+            pass
+    return client.requests
+
+
+async def pipelined(bocs):
+    client = SimulatedClient()
+    pipeline = OutboundPipeline(client, poll_interval=0.25, max_concurrency=QPS)
+    results = [result async for result in pipeline.send_many(bocs)]
+    assert len(results) == N and all(result["status"] == "confirmed" for result in results)
+    return client.requests
+
+
+async def main():
+    bocs = [begin_cell().store_uint(i, 32).end_cell().to_boc() for i in range(N)]
+    print(f"{N} messages, {QPS} QPS, {LATENCY * 1000:.0f}ms per request, landing after {LANDING}s")
+    for name, fn in (("sequential", sequential), ("OutboundPipeline", pipelined)):
+        start = time.perf_counter()
+        requests = await fn(bocs)
+        elapsed = time.perf_counter() - start
+        print(f"  {name:<20} {elapsed:8.2f}s {N / elapsed:8.1f} messages/s {requests:6} requests")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
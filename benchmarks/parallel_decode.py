@@ -0,0 +1,49 @@
+import asyncio
+import os
+import time
+
+from tonpy import begin_cell
+
+from pytoncenter.address import Address
+from pytoncenter.extension.message import message_registry
+from pytoncenter.extension.parallel import ParallelMessageDecoder, compact_message
+
+"""
+Decode 100k synthetic jetton transfer bodies of a backfill, in the event loop with the registry and in a process pool with ParallelMessageDecoder.
+The pool only pays off with several cores, on a single core it measures the cost of pickling the chunks.
+
+PYTHONPATH=. python benchmarks/parallel_decode.py
+"""
+
+N = 100_000
+
+
+def transfer_body(i: int) -> str:
+    destination = Address(f"0:{os.urandom(32).hex()}").to_string(True)
+    builder = begin_cell().store_uint(0x0F8A7EA5, 32).store_uint(i, 64).store_grams(i * 10**6).store_address(destination).store_address(destination)
+    return builder.store_uint(0, 1).store_grams(1).store_uint(0, 1).end_cell().to_boc()
+
+
+async def stream(decoder: ParallelMessageDecoder, bodies):
+    count = 0
+    async for _ in decoder.stream(bodies):
+        count += 1
+    return count
+
+
+def main():
+    bodies = [transfer_body(i) for i in range(1_000)] * (N // 1_000)
+    print(f"{N} transfer bodies, {os.cpu_count()} cores")
+    start = time.perf_counter()
+    [compact_message(message_registry.parse(body)) for body in bodies]
+    print(f"  {'registry in the event loop':<32} {N / (time.perf_counter() - start):12,.0f} bodies/s")
+    for workers in sorted({1, 2, os.cpu_count() or 1}):
+        decoder = ParallelMessageDecoder(max_workers=workers, chunksize=1_000)
+        start = time.perf_counter()
+        assert asyncio.run(stream(decoder, bodies)) == N
+        print(f"  {f'process pool, {workers} workers':<32} {N / (time.perf_counter() - start):12,.0f} bodies/s")
+        decoder.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import io
+import os
+import random
+import time
+from typing import List, Optional
+
+from treelib import Node, Tree
+
+from pytoncenter.address import Address
+from pytoncenter.utils import (
+    _default_address_mapping,
+    format_trace,
+    format_tx,
+    write_trace,
+)
+from pytoncenter.v3.models import Message, Transaction, TransactionTrace
+
+"""
+Render synthetic transaction traces with 10k nodes, comparing the streaming renderer with the previous treelib based one.
+
+python benchmarks/trace_render.py
+"""
+
+NODES = 10_000
+
+
+def make_tx(i: int, source: Optional[str], destination: str) -> Transaction:
+    msg = Message.model_construct(hash=str(i), source=source, destination=destination, value=random.randint(0, 10**10), opcode="0x0f8a7ea5", message_content=None)
+    return Transaction.model_construct(hash=str(i), in_msg=msg, out_msgs=[])
+
+
+def make_trace(nodes: int, fanout: int, addresses: List[str]) -> TransactionTrace:
+    root = TransactionTrace.model_construct(id="0", transaction=make_tx(0, None, addresses[0]), children=[])
+    frontier = [root]
+    for i in range(1, nodes):
+        parent = frontier[(i - 1) // fanout] if fanout > 0 else frontier[-1]
+        node = TransactionTrace.model_construct(id=str(i), transaction=make_tx(i, random.choice(addresses), random.choice(addresses)), children=[])
+        parent.children.append(node)
+        frontier.append(node)
+    return root
+
+
+def legacy_format_trace(root: TransactionTrace) -> str:
+    def recursive_add_node(tree: Tree, trace: TransactionTrace, parent: Optional[Node] = None):
+        node = tree.create_node(identifier=trace.transaction.hash, tag=format_tx(trace.transaction, _default_address_mapping), parent=parent)
+        for child in trace.children:
+            recursive_add_node(tree, child, node)
+
+    tree = Tree()
+    recursive_add_node(tree, root)
+    return tree.show(stdout=False)  # type: ignore
+
+
+def bench(name: str, fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    print(f"  {name:<24} {time.perf_counter() - start:8.3f}s")
+
+
+def main():
+    random.seed(0)
+    addresses = [Address(f"0:{os.urandom(32).hex()}").to_string(True) for _ in range(200)]
+    for label, fanout in (("wide (fanout 8)", 8), ("bushy (fanout 2)", 2)):
+        trace = make_trace(NODES, fanout, addresses)
+        print(f"{NODES} nodes, {label}")
+        bench("treelib format_trace", legacy_format_trace, trace)
+        bench("format_trace", format_trace, trace)
+        bench("write_trace", write_trace, trace, io.StringIO().write)
+
+
+if __name__ == "__main__":
+    main()
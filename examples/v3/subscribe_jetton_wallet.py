@@ -2,14 +2,11 @@ import asyncio
 import logging
 import traceback
 from datetime import datetime
-from typing import Callable, Coroutine, Dict
-
-from tonpy import CellSlice
+from typing import Callable, Coroutine, Dict, Type
 
 from pytoncenter import get_client
 from pytoncenter.address import Address
-from pytoncenter.extension.message import JettonMessage
-from pytoncenter.utils import get_opcode
+from pytoncenter.extension.message import BaseMessage, JettonMessage, message_registry
 from pytoncenter.v2.tools import NamedFunction, create_named_mapping_func
 from pytoncenter.v3.models import *
 
@@ -17,8 +14,7 @@ logging.basicConfig(level=logging.INFO)
 LOGGER = logging.getLogger(__name__)
 
 
-async def handle_jetton_internal_transfer(body: CellSlice, tx: Transaction, labeler: NamedFunction):
-    msg = JettonMessage.InternalTransfer.parse(body)
+async def handle_jetton_internal_transfer(msg: JettonMessage.InternalTransfer, tx: Transaction, labeler: NamedFunction):
     src = labeler(Address(tx.in_msg.source))  # type: ignore
     dst = labeler(Address(tx.in_msg.destination))  # type: ignore
     forward_ton = round(float(msg.forward_ton_amount) / 1e9, 4)
@@ -28,8 +24,7 @@ async def handle_jetton_internal_transfer(body: CellSlice, tx: Transaction, labe
         LOGGER.info(f"[{msg.OPCODE}] Jetton Internal Transfer | {src} -> {dst}, forward {forward_ton} TON")
 
 
-async def handle_jetton_transfer(body: CellSlice, tx: Transaction, labeler: NamedFunction):
-    msg = JettonMessage.Transfer.parse(body)
+async def handle_jetton_transfer(msg: JettonMessage.Transfer, tx: Transaction, labeler: NamedFunction):
     jetton_amount = round(float(msg.amount) / 1e6, 4)
     value = round(float(tx.in_msg.value) / 1e9, 4)  # type: ignore
     src = labeler(Address(tx.in_msg.source))  # type: ignore
@@ -37,8 +32,7 @@ async def handle_jetton_transfer(body: CellSlice, tx: Transaction, labeler: Name
     LOGGER.info(f"[{msg.OPCODE}] Jetton Transfer | {src} -> {dst} | {jetton_amount} USDT, {value} TON")
 
 
-async def handle_jetton_burn(body: CellSlice, tx: Transaction, labeler: NamedFunction):
-    msg = JettonMessage.Burn.parse(body)
+async def handle_jetton_burn(msg: JettonMessage.Burn, tx: Transaction, labeler: NamedFunction):
     burn_amount = round(float(msg.amount) / 1e6, 4)
     src = labeler(Address(tx.in_msg.source))  # type: ignore
     LOGGER.info(f"[{msg.OPCODE}] Jetton Burn | 🔥 {src} burn {burn_amount} USDT 🔥")
@@ -50,10 +44,10 @@ async def default_handler(*args, **kwargs): ...
 async def main():
     client = get_client(version="v3", network="testnet")
 
-    callbacks: Dict[str, Callable[[CellSlice, Transaction, NamedFunction], Coroutine]] = {
-        JettonMessage.InternalTransfer.OPCODE: handle_jetton_internal_transfer,
-        JettonMessage.Transfer.OPCODE: handle_jetton_transfer,
-        JettonMessage.Burn.OPCODE: handle_jetton_burn,
+    callbacks: Dict[Type[BaseMessage], Callable[[BaseMessage, Transaction, NamedFunction], Coroutine]] = {
+        JettonMessage.InternalTransfer: handle_jetton_internal_transfer,
+        JettonMessage.Transfer: handle_jetton_transfer,
+        JettonMessage.Burn: handle_jetton_burn,
     }
 
     labeler = create_named_mapping_func(
@@ -100,17 +94,14 @@ async def main():
                 LOGGER.info(f"{sender} sends {receiver} {value} TON with comment {comment}")
                 continue
 
-            # normal message with cell data
-            cs = CellSlice(tx.in_msg.message_content.body)
-
-            # preload 32 bits to get opcode
-            opcode = get_opcode(cs.preload_uint(32))
+            # normal message with cell data, parsed by the parser registered for its opcode
+            msg = message_registry.parse_message(tx.in_msg)
 
-            # get handler for opcode
-            handler = callbacks.get(opcode, default_handler)
+            # get handler for the message type, unknown opcodes are parsed as RawMessage
+            handler = callbacks.get(type(msg), default_handler)
 
             # call handler and get output string
-            await handler(cs, tx, labeler)
+            await handler(msg, tx, labeler)
         except Exception as e:
             LOGGER.error("Error: %s on tx %s\n* Reason\n============\n%s", e, tx, traceback.format_exc())
 
@@ -5,7 +5,7 @@ import click
 import pyfiglet
 
 from pytoncenter import get_client
-from pytoncenter.utils import format_trace
+from pytoncenter.utils import iter_trace_lines
 from pytoncenter.v3.models import *
 
 
@@ -44,8 +44,8 @@ def cli():
 async def trace(txhash: str,network:Literal["mainnet","testnet"], api_key: str):
     client = get_client(version="v3", network=network) # type: ignore
     trace = await client.get_trace_alternative(GetTransactionTraceRequest(hash=txhash))
-    fmt = format_trace(trace)
-    click.echo(fmt)
+    for line in iter_trace_lines(trace):
+        click.echo(line)
 
 @cli.command(help="Get account balance")
 @click.option("--address", required=True, help="Address")
@@ -1,9 +1,13 @@
 from __future__ import annotations
 
 import base64
+import binascii
 import ctypes
-import math
-from typing import Optional, TypedDict, Union
+import mmap
+import struct
+from array import array
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Literal, Optional, Tuple, TypedDict, Union
 
 _AddressInfo = TypedDict(
     "_AddressInfo",
@@ -11,7 +15,18 @@ _AddressInfo = TypedDict(
         "is_test_only": bool,
         "is_bounceable": bool,
         "workchain": int,
-        "hash_part": bytearray,
+        "hash_part": bytes,
+    },
+)
+
+AddressCacheInfo = TypedDict(
+    "AddressCacheInfo",
+    {
+        "hits": int,
+        "misses": int,
+        "maxsize": int,
+        "currsize": int,
+        "hit_rate": float,
     },
 )
 
@@ -31,23 +46,20 @@ def string_to_bytes(string, size=1):  # ?
     return bytes(buf)
 
 
-def crc16(data):
-    POLY = 0x1021
-    reg = 0
-    message = bytes(data) + bytes(2)
+def crc16(data) -> bytearray:
+    """
+    CRC16-XMODEM (polynomial 0x1021, initial value 0) of the data, big endian.
+    binascii.crc_hqx computes the same checksum in C.
+    """
+    return bytearray(binascii.crc_hqx(bytes(data), 0).to_bytes(2, "big"))
 
-    for byte in message:
-        mask = 0x80
-        while mask > 0:
-            reg <<= 1
-            if byte & mask:
-                reg += 1
-            mask >>= 1
-            if reg > 0xFFFF:
-                reg &= 0xFFFF
-                reg ^= POLY
 
-    return bytearray([math.floor(reg / 256), reg % 256])
+def crc16_many(chunks: Iterable[Union[bytes, bytearray, memoryview]]) -> List[bytes]:
+    """
+    crc16_many returns the big endian CRC16-XMODEM of every chunk
+    """
+    crc_hqx = binascii.crc_hqx
+    return [crc_hqx(chunk, 0).to_bytes(2, "big") for chunk in chunks]
 
 
 def parse_friendly_address(addr_str: str) -> _AddressInfo:
@@ -55,15 +67,14 @@ def parse_friendly_address(addr_str: str) -> _AddressInfo:
         raise Exception("User-friendly address should contain strictly 48 characters")
 
     # avoid padding error (https://gist.github.com/perrygeo/ee7c65bb1541ff6ac770)
-    data = string_to_bytes(base64.b64decode(addr_str + "=="))
+    data = base64.b64decode(addr_str + "==")
 
     if len(data) != 36:
         raise Exception("Unknown address type: byte length is not equal to 36")
 
     addr = data[:34]
     crc = data[34:36]
-    calced_crc = crc16(addr)
-    if not (calced_crc[0] == crc[0] and calced_crc[1] == crc[1]):
+    if binascii.crc_hqx(addr, 0).to_bytes(2, "big") != crc:
         raise Exception("Wrong crc16 hashsum")
 
     tag = addr[0]
@@ -84,7 +95,7 @@ def parse_friendly_address(addr_str: str) -> _AddressInfo:
     if workchain != 0 and workchain != -1:
         raise Exception(f"Invalid address wc {workchain}")
 
-    hash_part = bytearray(addr[2:34])
+    hash_part = addr[2:34]
     return {
         "is_test_only": is_test_only,
         "is_bounceable": is_bounceable,
@@ -93,31 +104,42 @@ def parse_friendly_address(addr_str: str) -> _AddressInfo:
     }
 
 
+_USER_FRIENDLY = 1
+_URL_SAFE = 2
+_BOUNCEABLE = 4
+_TEST_ONLY = 8
+
+
 class Address:
+    """
+    Address is an immutable TON address. It keeps the canonical key (workchain and hash part) and the flags of the form it was parsed from,
+    and memoizes every string form on first use, so repeated `to_string` calls with the same flags are dictionary lookups.
+    """
+
     BOUNCEABLE_TAG = 0x11
     NON_BOUNCEABLE_TAG = 0x51
     TEST_FLAG = 0x80
 
+    __slots__ = ("_key", "_wc", "_flags", "_strings")
+
     def __init__(self, any_form: Union[str, Address]):
         if any_form is None:
             raise Exception("Invalid address")
 
+        self._strings: Optional[Dict[int, str]] = None
         if isinstance(any_form, Address):
+            self._key = any_form._key
             self._wc = any_form._wc
-            self._hash_part = any_form._hash_part
-            self._is_test_only = any_form._is_test_only
-            self._is_user_friendly = any_form._is_user_friendly
-            self._is_bounceable = any_form._is_bounceable
-            self._is_url_safe = any_form._is_url_safe
+            self._flags = any_form._flags
+            self._strings = any_form._strings
             return
 
         # base64 with digits, upper and lowercase Latin letters, '/' and '+'
         # base64url with '_' and '-' instead of '/' and '+')
+        flags = 0
         if any_form.find("-") > 0 or any_form.find("_") > 0:
             any_form = any_form.replace("-", "+").replace("_", "/")
-            self._is_url_safe = True
-        else:
-            self._is_url_safe = False
+            flags |= _URL_SAFE
 
         # Check this address is raw address or not
         try:
@@ -139,18 +161,31 @@ class Address:
             if len(address_hex) != 64:
                 raise Exception(f"Invalid address hex {any_form}")
 
-            self._is_user_friendly = False
-            self._wc = wc
-            self._hash_part = bytearray.fromhex(address_hex)
-            self._is_test_only = False
-            self._is_bounceable = False
+            hash_part = bytes.fromhex(address_hex)
+            # fromhex skips whitespace
+            if len(hash_part) != 32:
+                raise Exception(f"Invalid address hex {any_form}")
         else:
-            self._is_user_friendly = True
+            flags |= _USER_FRIENDLY
             parse_result = parse_friendly_address(any_form)
-            self._wc = parse_result["workchain"]
-            self._hash_part = parse_result["hash_part"]
-            self._is_test_only = parse_result["is_test_only"]
-            self._is_bounceable = parse_result["is_bounceable"]
+            wc = parse_result["workchain"]
+            hash_part = parse_result["hash_part"]
+            if parse_result["is_test_only"]:
+                flags |= _TEST_ONLY
+            if parse_result["is_bounceable"]:
+                flags |= _BOUNCEABLE
+        self._wc = wc
+        self._flags = flags
+        self._key = wc.to_bytes(1, "big", signed=True) + hash_part
+
+    @classmethod
+    def _from_key(cls, key: bytes, flags: int) -> Address:
+        address = cls.__new__(cls)
+        address._key = key
+        address._wc = -1 if key[0] == 0xFF else key[0]
+        address._flags = flags
+        address._strings = None
+        return address
 
     @property
     def wc(self) -> int:
@@ -164,24 +199,24 @@ class Address:
         return self._wc
 
     @property
-    def hash_part(self) -> bytearray:
-        return self._hash_part
+    def hash_part(self) -> bytes:
+        return self._key[1:]
 
     @property
     def is_test_only(self) -> bool:
-        return self._is_test_only
+        return bool(self._flags & _TEST_ONLY)
 
     @property
     def is_user_friendly(self) -> bool:
-        return self._is_user_friendly
+        return bool(self._flags & _USER_FRIENDLY)
 
     @property
     def is_bounceable(self) -> bool:
-        return self._is_bounceable
+        return bool(self._flags & _BOUNCEABLE)
 
     @property
     def is_url_safe(self) -> bool:
-        return self._is_url_safe
+        return bool(self._flags & _URL_SAFE)
 
     def to_string(
         self,
@@ -190,49 +225,643 @@ class Address:
         is_bounceable: Optional[bool] = None,
         is_test_only: Optional[bool] = None,
     ) -> str:
-        if is_user_friendly is None:
-            is_user_friendly = self._is_user_friendly
-        if is_url_safe is None:
-            is_url_safe = self._is_url_safe
-        if is_bounceable is None:
-            is_bounceable = self._is_bounceable
-        if is_test_only is None:
-            is_test_only = self._is_test_only
-
-        if not is_user_friendly:
-            return f"{self._wc}:{self._hash_part.hex()}"
+        flags = self._flags
+        if is_user_friendly is not None:
+            flags = flags | _USER_FRIENDLY if is_user_friendly else flags & ~_USER_FRIENDLY
+        if is_url_safe is not None:
+            flags = flags | _URL_SAFE if is_url_safe else flags & ~_URL_SAFE
+        if is_bounceable is not None:
+            flags = flags | _BOUNCEABLE if is_bounceable else flags & ~_BOUNCEABLE
+        if is_test_only is not None:
+            flags = flags | _TEST_ONLY if is_test_only else flags & ~_TEST_ONLY
+        # the raw form does not depend on the other flags
+        if not flags & _USER_FRIENDLY:
+            flags = 0
+
+        strings = self._strings
+        if strings is None:
+            strings = self._strings = {}
         else:
-            tag = Address.BOUNCEABLE_TAG if is_bounceable else Address.NON_BOUNCEABLE_TAG
+            cached = strings.get(flags)
+            if cached is not None:
+                return cached
 
-            if is_test_only:
+        if not flags & _USER_FRIENDLY:
+            result = f"{self._wc}:{self._key[1:].hex()}"
+        else:
+            tag = Address.BOUNCEABLE_TAG if flags & _BOUNCEABLE else Address.NON_BOUNCEABLE_TAG
+            if flags & _TEST_ONLY:
                 tag |= Address.TEST_FLAG
+            addr = bytes((tag, self._key[0])) + self._key[1:]
+            address_with_checksum = addr + binascii.crc_hqx(addr, 0).to_bytes(2, "big")
+            if flags & _URL_SAFE:
+                result = base64.urlsafe_b64encode(address_with_checksum).decode()
+            else:
+                result = base64.b64encode(address_with_checksum).decode()
+        strings[flags] = result
+        return result
 
-            addr = (ctypes.c_int8 * 34)()
-            addr[0] = tag
-            addr[1] = self._wc
-            addr[2:] = self._hash_part
-            address_with_checksum = (ctypes.c_uint8 * 36)()
-            address_with_checksum[:34] = addr
-            address_with_checksum[34:] = crc16(addr)
-
-            address_base_64 = base64.b64encode(address_with_checksum).decode("utf-8")
-            if is_url_safe:
-                address_base_64 = address_base_64.replace("+", "-").replace("/", "_")
-
-            return str(address_base_64)
+    @property
+    def key(self) -> bytes:
+        """
+        The canonical key of the address, the workchain as a signed byte followed by the 32 bytes hash part.
+        Two addresses are equal if and only if their keys are equal, flags like bounceable or testnet are ignored.
+        """
+        return self._key
 
     def __hash__(self) -> int:
-        return hash(self.to_string(True, True, True, is_test_only=False))
+        return hash(self._key)
 
     def __key__(self) -> str:
         return self.to_string(True, True, True, is_test_only=False)
 
     def __eq__(self, __value: object) -> bool:
         if isinstance(__value, Address):
-            return self.to_string(True, True, True, is_test_only=False) == __value.to_string(True, True, True, is_test_only=False)
+            return self._key == __value._key
         if isinstance(__value, str):
-            return self.to_string(True, True, True, is_test_only=False) == Address(__value).to_string(True, True, True, is_test_only=False)
+            return self._key == Address(__value)._key
         return False
 
     def __repr__(self) -> str:
         return self.to_string(True, True, True, is_test_only=False)
+
+
+class AddressCache:
+    """
+    AddressCache interns parsed addresses by their input string, so the same address string is decoded and checksummed only once
+    and every occurrence shares one immutable `Address` instance. The cache holds at most `maxsize` entries and evicts
+    the least recently used one. Invalid strings are never cached, they raise on every lookup.
+
+    Example
+    -------
+    ```python
+    cache = AddressCache(maxsize=4096)
+    a = cache.get("EQBynBO23ywHy_CgarY9NK9FTz0yDsG82PtcbSTQgGoXwiuA")
+    assert cache.get("EQBynBO23ywHy_CgarY9NK9FTz0yDsG82PtcbSTQgGoXwiuA") is a
+    print(cache.cache_info())
+    ```
+    """
+
+    def __init__(self, maxsize: int = 8192) -> None:
+        assert maxsize > 0, "maxsize must be greater than 0"
+        self.maxsize = maxsize
+        self._addresses: OrderedDict[str, Address] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._addresses)
+
+    def __contains__(self, value: str) -> bool:
+        return value in self._addresses
+
+    def get(self, value: Union[str, Address]) -> Address:
+        """
+        get returns the interned address for the string, parsing it on a miss. An `Address` is returned as is.
+        """
+        if isinstance(value, Address):
+            return value
+        addresses = self._addresses
+        address = addresses.get(value)
+        if address is not None:
+            self.hits += 1
+            try:
+                addresses.move_to_end(value)
+            except KeyError:
+                # evicted by a concurrent lookup in between, the instance is still valid
+                pass
+            return address
+        self.misses += 1
+        address = Address(value)
+        addresses[value] = address
+        while len(addresses) > self.maxsize:
+            addresses.popitem(last=False)
+        return address
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def cache_info(self) -> AddressCacheInfo:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "maxsize": self.maxsize,
+            "currsize": len(self._addresses),
+            "hit_rate": self.hit_rate,
+        }
+
+    def clear(self) -> None:
+        """
+        clear drops every interned address and resets the statistics
+        """
+        self._addresses.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+address_cache = AddressCache()
+"""
+The process wide cache used when validating `AddressLike` fields and decoding `Types.Address` results
+"""
+
+
+def parse_address(value: Union[str, Address]) -> Address:
+    """
+    parse_address returns the shared `Address` instance for the string from the process wide `address_cache`
+    """
+    return address_cache.get(value)
+
+
+AddressEncoding = Literal[
+    "raw",
+    "bounceable",
+    "bounceable_url",
+    "non_bounceable",
+    "non_bounceable_url",
+    "bounceable_testnet",
+    "bounceable_url_testnet",
+    "non_bounceable_testnet",
+    "non_bounceable_url_testnet",
+]
+
+_ENCODING_FLAGS: Dict[str, int] = {
+    "raw": 0,
+    "bounceable": _USER_FRIENDLY | _BOUNCEABLE,
+    "bounceable_url": _USER_FRIENDLY | _BOUNCEABLE | _URL_SAFE,
+    "non_bounceable": _USER_FRIENDLY,
+    "non_bounceable_url": _USER_FRIENDLY | _URL_SAFE,
+    "bounceable_testnet": _USER_FRIENDLY | _BOUNCEABLE | _TEST_ONLY,
+    "bounceable_url_testnet": _USER_FRIENDLY | _BOUNCEABLE | _URL_SAFE | _TEST_ONLY,
+    "non_bounceable_testnet": _USER_FRIENDLY | _TEST_ONLY,
+    "non_bounceable_url_testnet": _USER_FRIENDLY | _URL_SAFE | _TEST_ONLY,
+}
+
+_URL_SAFE_TABLE = str.maketrans("-_", "+/")
+
+
+class AddressBatch:
+    """
+    AddressBatch holds many addresses as columns: the 32 bytes hash parts back to back in `hash_parts`, and one signed byte per row in `workchains`.
+    Both columns support the buffer protocol, so they can be shared with numpy without copying, e.g.
+    `numpy.frombuffer(batch.hash_parts, dtype=numpy.uint8).reshape(-1, 32)`.
+
+    Rows that failed to decode are zero filled and their error message is kept in `errors`, keyed by the row index.
+    Encodings are computed for the whole batch at once: the checksums in one pass and base64 / hex over a single buffer.
+
+    Example
+    -------
+    ```python
+    batch = parse_addresses(["0:2b79...4865", "EQAreQ23eabjRO5glLCbhZ4KxQ9SOIjtw2eM2PuEXXhIZVP9", "oops"])
+    print(batch.errors)  # {2: "..."}
+    forms = batch.encode("raw", "bounceable_url")
+    ```
+    """
+
+    def __init__(self, hash_parts: bytearray, workchains: array, flags: Optional[array] = None, errors: Optional[Dict[int, str]] = None) -> None:
+        assert len(hash_parts) == 32 * len(workchains), "hash_parts must hold 32 bytes for every workchain"
+        self.hash_parts = hash_parts
+        self.workchains = workchains
+        self.flags = flags if flags is not None else array("B", bytes(len(workchains)))
+        self.errors: Dict[int, str] = errors if errors is not None else {}
+
+    @classmethod
+    def from_hash_parts(cls, hash_parts, workchains: Union[int, Iterable[int]] = 0) -> AddressBatch:
+        """
+        from_hash_parts builds a batch from N hash parts given as any C contiguous buffer of N * 32 bytes,
+        e.g. bytes, a memoryview or a numpy (N, 32) uint8 array, and a single workchain or one workchain per row
+        """
+        buf = bytearray(memoryview(hash_parts).cast("B"))
+        if len(buf) % 32 != 0:
+            raise ValueError(f"Hash parts should be a multiple of 32 bytes, got {len(buf)}")
+        count = len(buf) // 32
+        if isinstance(workchains, int):
+            wcs = array("b", [workchains]) * count
+        else:
+            wcs = array("b", (int(wc) for wc in workchains))
+        if len(wcs) != count:
+            raise ValueError(f"Expected {count} workchains, got {len(wcs)}")
+        for wc in set(wcs):
+            if wc != 0 and wc != -1:
+                raise ValueError(f"Invalid address wc {wc}")
+        return cls(buf, wcs)
+
+    @classmethod
+    def from_addresses(cls, addresses: Iterable[Union[str, Address]]) -> AddressBatch:
+        """
+        from_addresses decodes raw and user-friendly address strings in bulk. Invalid rows are reported in `errors` instead of raising.
+        """
+        items = list(addresses)
+        count = len(items)
+        hash_parts = bytearray(32 * count)
+        workchains = array("b", bytes(count))
+        flags = array("B", bytes(count))
+        errors: Dict[int, str] = {}
+        friendly: List[int] = []
+        raw: List[int] = []
+        slow: List[int] = []
+        for i, item in enumerate(items):
+            if isinstance(item, Address):
+                hash_parts[32 * i : 32 * i + 32] = item._key[1:]
+                workchains[i] = item._wc
+                flags[i] = item._flags
+            elif isinstance(item, str) and len(item) == 48 and ":" not in item:
+                friendly.append(i)
+            elif isinstance(item, str) and (item.startswith("0:") and len(item) == 66 or item.startswith("-1:") and len(item) == 67):
+                raw.append(i)
+            else:
+                slow.append(i)
+
+        if raw:
+            try:
+                decoded = bytes.fromhex("".join([items[i][-64:] for i in raw]))
+            except ValueError:
+                decoded = b""
+            # fromhex skips whitespace, a padded row decodes to fewer bytes and would shift every following row
+            if len(decoded) != 32 * len(raw):
+                slow.extend(raw)
+            else:
+                if len(raw) == count:
+                    hash_parts[:] = decoded
+                    workchains = array("b", [-1 if item[0] == "-" else 0 for item in items])
+                else:
+                    for n, i in enumerate(raw):
+                        hash_parts[32 * i : 32 * i + 32] = decoded[32 * n : 32 * n + 32]
+                        workchains[i] = -1 if items[i][0] == "-" else 0
+
+        if friendly:
+            try:
+                # every 48 characters block decodes to exactly 36 bytes, so the whole column is decoded at once
+                decoded = base64.b64decode("".join(items[i] for i in friendly).translate(_URL_SAFE_TABLE), validate=True)
+            except binascii.Error:
+                slow.extend(friendly)
+            else:
+                crc_hqx = binascii.crc_hqx
+                view = memoryview(decoded)
+                for n, i in enumerate(friendly):
+                    data = view[36 * n : 36 * n + 36]
+                    tag, wc = data[0], data[1]
+                    if crc_hqx(data[:34], 0) != int.from_bytes(data[34:], "big"):
+                        errors[i] = "Wrong crc16 hashsum"
+                        continue
+                    row_flags = _USER_FRIENDLY
+                    if tag & Address.TEST_FLAG:
+                        row_flags |= _TEST_ONLY
+                        tag ^= Address.TEST_FLAG
+                    if tag == Address.BOUNCEABLE_TAG:
+                        row_flags |= _BOUNCEABLE
+                    elif tag != Address.NON_BOUNCEABLE_TAG:
+                        errors[i] = "Unknown address tag"
+                        continue
+                    if wc != 0 and wc != 0xFF:
+                        errors[i] = f"Invalid address wc {wc}"
+                        continue
+                    item = items[i]
+                    if item.find("-") > 0 or item.find("_") > 0:
+                        row_flags |= _URL_SAFE
+                    hash_parts[32 * i : 32 * i + 32] = data[2:34]
+                    workchains[i] = -1 if wc == 0xFF else 0
+                    flags[i] = row_flags
+
+        for i in slow:
+            try:
+                address = Address(items[i])
+            except Exception as e:
+                errors[i] = str(e) or e.__class__.__name__
+                continue
+            hash_parts[32 * i : 32 * i + 32] = address._key[1:]
+            workchains[i] = address._wc
+            flags[i] = address._flags
+        return cls(hash_parts, workchains, flags, dict(sorted(errors.items())))
+
+    def __len__(self) -> int:
+        return len(self.workchains)
+
+    def __getitem__(self, index: int) -> Optional[Address]:
+        """
+        The address of the row, or None if the row failed to decode
+        """
+        index = range(len(self))[index]
+        if index in self.errors:
+            return None
+        return Address._from_key(self.workchains[index].to_bytes(1, "big", signed=True) + self.hash_parts[32 * index : 32 * index + 32], self.flags[index])
+
+    def crc16(self, encoding: AddressEncoding = "bounceable_url") -> List[int]:
+        """
+        crc16 returns the checksum of the user-friendly form of every row for the encoding
+        """
+        return [int.from_bytes(crc, "big") for crc in crc16_many(self._tagged(_ENCODING_FLAGS[encoding]))]
+
+    def _tagged(self, flags: int) -> List[bytes]:
+        tag = Address.BOUNCEABLE_TAG if flags & _BOUNCEABLE else Address.NON_BOUNCEABLE_TAG
+        if flags & _TEST_ONLY:
+            tag |= Address.TEST_FLAG
+        prefixes = {0: bytes((tag, 0)), -1: bytes((tag, 0xFF))}
+        view = memoryview(self.hash_parts)
+        return [prefixes[wc] + view[32 * i : 32 * i + 32] for i, wc in enumerate(self.workchains)]
+
+    def to_strings(self, encoding: AddressEncoding = "bounceable_url") -> List[Optional[str]]:
+        """
+        to_strings returns every row in the encoding, None for rows that failed to decode
+        """
+        count = len(self)
+        flags = _ENCODING_FLAGS[encoding]
+        if flags & _USER_FRIENDLY:
+            crc_hqx = binascii.crc_hqx
+            buf = b"".join([data + crc_hqx(data, 0).to_bytes(2, "big") for data in self._tagged(flags)])
+            # 36 bytes encode to exactly 48 characters without padding, so the whole buffer is encoded at once
+            encoded = (base64.urlsafe_b64encode(buf) if flags & _URL_SAFE else base64.b64encode(buf)).decode()
+            result: List[Optional[str]] = [encoded[48 * i : 48 * i + 48] for i in range(count)]
+        else:
+            encoded = self.hash_parts.hex()
+            result = [f"{wc}:{encoded[64 * i : 64 * i + 64]}" for i, wc in enumerate(self.workchains)]
+        for i in self.errors:
+            result[i] = None
+        return result
+
+    def encode(self, *encodings: AddressEncoding) -> Dict[str, List[Optional[str]]]:
+        """
+        encode returns every requested encoding of every row, by default the bounceable url-safe form
+        """
+        return {encoding: self.to_strings(encoding) for encoding in encodings or ("bounceable_url",)}
+
+
+def parse_addresses(addresses: Iterable[Union[str, Address]]) -> AddressBatch:
+    """
+    parse_addresses decodes many raw or user-friendly addresses at once, see `AddressBatch.from_addresses`
+    """
+    return AddressBatch.from_addresses(addresses)
+
+
+def convert_addresses(addresses: Iterable[Union[str, Address]], *encodings: AddressEncoding) -> Dict[str, List[Optional[str]]]:
+    """
+    convert_addresses converts many addresses to the requested encodings at once. Rows that failed to decode are None in every encoding,
+    use `parse_addresses` to get the error messages.
+
+    Example
+    -------
+    ```python
+    forms = convert_addresses(raw_addresses, "bounceable_url", "non_bounceable_url")
+    ```
+    """
+    return AddressBatch.from_addresses(addresses).encode(*encodings)
+
+
+_SET_MAGIC = b"PTCADDR1"
+_SET_HEADER = struct.Struct("<8sQQII")
+_RECORD_SIZE = 33
+_BUCKETS = 1 << 16
+
+
+class AddressSet:
+    """
+    AddressSet is a compact membership structure for millions of addresses. Every address is stored as a 33 bytes record,
+    the hash part followed by the workchain byte, in one sorted contiguous buffer. Hash parts are uniformly distributed,
+    so a table of 65536 bucket offsets over the first two bytes narrows every lookup down to a few records, which are searched in C.
+    An optional Bloom filter answers most misses without touching the records.
+
+    2M addresses take about 66 MiB, compared to several hundred MiB for a `set` of `Address`.
+    The set can be saved to a file and opened with `mmap`, so worker processes share one copy through the page cache.
+
+    Example
+    -------
+    ```python
+    customers = AddressSet(customer_addresses, bloom_bits_per_key=10)
+    customers.save("customers.addrs")
+
+    # in every worker
+    customers = AddressSet.load("customers.addrs")
+    hits = customers.contains_many([tx.account for tx in txs])
+    ```
+    """
+
+    def __init__(self, addresses: Iterable[Union[str, Address]] = (), bloom_bits_per_key: int = 0, bloom_hashes: int = 3) -> None:
+        assert bloom_bits_per_key >= 0, "bloom_bits_per_key must not be negative"
+        assert 0 < bloom_hashes <= 7, "bloom_hashes must be between 1 and 7"
+        self._init(_sorted_keys(_as_batch(addresses)), bloom_bits_per_key, bloom_hashes)
+
+    def _init(self, keys: List[bytes], bloom_bits_per_key: int, bloom_hashes: int) -> None:
+        self._records: Union[bytes, mmap.mmap] = b"".join(keys)
+        self._base = 0
+        self._count = len(keys)
+        self._buckets = self._build_buckets(keys)
+        self._bloom_bits = bloom_bits_per_key * len(keys)
+        self._bloom_hashes = bloom_hashes
+        self._bloom: Optional[bytearray] = None
+        bits = self._bloom_bits
+        if bits:
+            bloom = self._bloom = bytearray((bits + 7) // 8)
+            offsets = range(2, 2 + 4 * bloom_hashes, 4)
+            for key in keys:
+                for i in offsets:
+                    probe = int.from_bytes(key[i : i + 4], "little") % bits
+                    bloom[probe >> 3] |= 1 << (probe & 7)
+        self._mmap: Optional[mmap.mmap] = None
+
+    @staticmethod
+    def _build_buckets(keys: List[bytes]) -> array:
+        counts = array("I", bytes(4 * (_BUCKETS + 1)))
+        for key in keys:
+            counts[(key[0] << 8 | key[1]) + 1] += 1
+        for i in range(1, _BUCKETS + 1):
+            counts[i] += counts[i - 1]
+        return counts
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _find(self, key: bytes) -> int:
+        bloom = self._bloom
+        if bloom is not None:
+            # the hash part is already a cryptographic hash, its bytes are used as the bloom hashes
+            bits = self._bloom_bits
+            for i in range(2, 2 + 4 * self._bloom_hashes, 4):
+                probe = int.from_bytes(key[i : i + 4], "little") % bits
+                if not bloom[probe >> 3] & (1 << (probe & 7)):
+                    return -1
+        bucket = key[0] << 8 | key[1]
+        base = self._base
+        start = base + _RECORD_SIZE * self._buckets[bucket]
+        end = base + _RECORD_SIZE * self._buckets[bucket + 1]
+        records = self._records
+        pos = records.find(key, start, end)
+        while pos != -1 and (pos - base) % _RECORD_SIZE:
+            pos = records.find(key, pos + 1, end)
+        return -1 if pos == -1 else (pos - base) // _RECORD_SIZE
+
+    def __contains__(self, address: object) -> bool:
+        if isinstance(address, str):
+            try:
+                address = parse_address(address)
+            except Exception:
+                return False
+        if not isinstance(address, Address):
+            return False
+        return self._find(address._key[1:] + address._key[:1]) != -1
+
+    def contains_many(self, addresses: Union[AddressBatch, Iterable[Union[str, Address]]]) -> List[bool]:
+        """
+        contains_many tests many addresses at once, decoding strings in bulk. Invalid addresses are reported as not contained.
+        """
+        batch = _as_batch(addresses, strict=False)
+        find = self._find
+        result = [find(key) != -1 for key in _batch_keys(batch)]
+        for i in batch.errors:
+            result[i] = False
+        return result
+
+    def __iter__(self):
+        records = self._records
+        base = self._base
+        for i in range(self._count):
+            record = records[base + _RECORD_SIZE * i : base + _RECORD_SIZE * (i + 1)]
+            yield Address._from_key(record[32:] + record[:32], 0)
+
+    def _header(self) -> bytes:
+        return _SET_HEADER.pack(_SET_MAGIC, self._count, self._bloom_bits, self._bloom_hashes, 0)
+
+    def _write_body(self, f) -> None:
+        pass
+
+    def save(self, path: str) -> None:
+        """
+        save writes the set to a file which can be opened with `load`. Offsets are stored in the native byte order,
+        the file is meant to be shared by processes on the same host.
+        """
+        with open(path, "wb") as f:
+            f.write(self._header())
+            f.write(self._buckets.tobytes())
+            if self._bloom is not None:
+                f.write(self._bloom)
+            base = self._base
+            f.write(self._records[base : base + _RECORD_SIZE * self._count])
+            self._write_body(f)
+
+    @classmethod
+    def load(cls, path: str, use_mmap: bool = True):
+        """
+        load opens a set written by `save`. With use_mmap the records are not read into memory but mapped read-only,
+        so every process that loads the same file shares the same physical pages.
+        """
+        with open(path, "rb") as f:
+            if use_mmap:
+                data: Union[bytes, mmap.mmap] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                data = f.read()
+        magic, count, bloom_bits, bloom_hashes, _ = _SET_HEADER.unpack_from(data, 0)
+        if magic != _SET_MAGIC:
+            raise ValueError(f"{path} is not an address set file")
+        self = cls.__new__(cls)
+        offset = _SET_HEADER.size
+        self._buckets = array("I")
+        self._buckets.frombytes(data[offset : offset + 4 * (_BUCKETS + 1)])
+        offset += 4 * (_BUCKETS + 1)
+        self._bloom_bits = bloom_bits
+        self._bloom_hashes = bloom_hashes
+        self._bloom = None
+        if bloom_bits:
+            self._bloom = bytearray(data[offset : offset + (bloom_bits + 7) // 8])
+            offset += (bloom_bits + 7) // 8
+        self._records = data
+        self._base = offset
+        self._count = count
+        self._mmap = data if use_mmap else None
+        self._load_body(data, offset + _RECORD_SIZE * count)
+        return self
+
+    def _load_body(self, data, offset: int) -> None:
+        pass
+
+    def close(self) -> None:
+        """
+        close releases the memory map of a set opened with `load`
+        """
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+
+class AddressIndex(AddressSet):
+    """
+    AddressIndex maps addresses to integers, e.g. customer ids, with the same compact layout as `AddressSet`.
+    The values are kept in an `array('q')` parallel to the sorted records.
+
+    Example
+    -------
+    ```python
+    index = AddressIndex(zip(customer_addresses, customer_ids))
+    ids = index.get_many([tx.account for tx in txs])
+    ```
+    """
+
+    def __init__(self, items: Iterable[Tuple[Union[str, Address], int]] = (), bloom_bits_per_key: int = 0, bloom_hashes: int = 3) -> None:
+        assert bloom_bits_per_key >= 0, "bloom_bits_per_key must not be negative"
+        assert 0 < bloom_hashes <= 7, "bloom_hashes must be between 1 and 7"
+        pairs = list(items)
+        batch = _as_batch([address for address, _ in pairs])
+        # the last value wins for duplicated addresses
+        mapping = dict(zip(_batch_keys(batch), [value for _, value in pairs]))
+        keys = sorted(mapping)
+        self.values: Union[array, memoryview] = array("q", [mapping[key] for key in keys])
+        self._init(keys, bloom_bits_per_key, bloom_hashes)
+
+    def get(self, address: Union[str, Address], default: Optional[int] = None) -> Optional[int]:
+        if isinstance(address, str):
+            try:
+                address = parse_address(address)
+            except Exception:
+                return default
+        if not isinstance(address, Address):
+            return default
+        pos = self._find(address._key[1:] + address._key[:1])
+        return default if pos == -1 else self.values[pos]
+
+    def __getitem__(self, address: Union[str, Address]) -> int:
+        value = self.get(address)
+        if value is None:
+            raise KeyError(address)
+        return value
+
+    def get_many(self, addresses: Union[AddressBatch, Iterable[Union[str, Address]]]) -> List[Optional[int]]:
+        """
+        get_many looks up many addresses at once, None for addresses that are missing or invalid
+        """
+        batch = _as_batch(addresses, strict=False)
+        find, values = self._find, self.values
+        result: List[Optional[int]] = []
+        for key in _batch_keys(batch):
+            pos = find(key)
+            result.append(None if pos == -1 else values[pos])
+        for i in batch.errors:
+            result[i] = None
+        return result
+
+    def _write_body(self, f) -> None:
+        f.write(self.values.tobytes())
+
+    def _load_body(self, data, offset: int) -> None:
+        self.values = memoryview(data)[offset : offset + 8 * self._count].cast("q")
+
+    def close(self) -> None:
+        if isinstance(self.values, memoryview):
+            self.values.release()
+        super().close()
+
+
+def _as_batch(addresses: Union[AddressBatch, Iterable[Union[str, Address]]], strict: bool = True) -> AddressBatch:
+    batch = addresses if isinstance(addresses, AddressBatch) else AddressBatch.from_addresses(addresses)
+    if strict and batch.errors:
+        index, error = next(iter(batch.errors.items()))
+        raise ValueError(f"Invalid address at {index}: {error}")
+    return batch
+
+
+def _sorted_keys(batch: AddressBatch) -> List[bytes]:
+    return sorted(set(_batch_keys(batch)))
+
+
+def _batch_keys(batch: AddressBatch) -> List[bytes]:
+    view = memoryview(batch.hash_parts)
+    wc_bytes = {0: b"\x00", -1: b"\xff"}
+    return [bytes(view[32 * i : 32 * i + 32]) + wc_bytes[wc] for i, wc in enumerate(batch.workchains)]
@@ -1,8 +1,20 @@
 from __future__ import annotations
 
-import warnings
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, OrderedDict, TypedDict, Union
+from array import array
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Literal,
+    Optional,
+    OrderedDict,
+    Sequence,
+    Tuple,
+    TypedDict,
+    Union,
+)
 
 from tonpy import CellSlice
 
@@ -13,10 +25,10 @@ from pytoncenter.v3.models import (
     RunGetMethodResponse,
 )
 
-from .address import Address
+from .address import Address, parse_address
 from .utils import decode_base64
 
-__all__ = ["BaseType", "Types", "BaseDecoder", "Decoder", "JettonDataDecoder"]
+__all__ = ["BaseType", "Types", "BaseDecoder", "Decoder", "DecodeOutput", "JettonDataDecoder"]
 
 
 GetMethodResultType = Union[GetMethodResult, RunGetMethodResponse]
@@ -24,6 +36,10 @@ GetMethodResultType = Union[GetMethodResult, RunGetMethodResponse]
 
 class BaseType:
     type: GetMethodParameterType
+    cacheable = False
+    """
+    cacheable types decode equal values to equal immutable results, so `Decoder.decode_many` decodes every distinct value only once
+    """
 
     def __init__(self, name: str) -> None:
         self._name = name
@@ -51,9 +67,10 @@ class Types:
 
     class Address(BaseType):
         type = "cell"
+        cacheable = True
 
         def decode(self, cell: str) -> Address:
-            return Address(CellSlice(cell).load_address())
+            return parse_address(CellSlice(cell).load_address())
 
     class Bool(BaseType):
         type = "num"
@@ -69,38 +86,158 @@ class Types:
 
     class B64String(BaseType):
         type = "cell"
+        cacheable = True
 
         def decode(self, cell: str) -> str:
             return decode_base64(cell)
 
     class List(BaseType):
+        """
+        List decodes a TVM list whose elements all have the type of the declared child, e.g. `Types.List("prices", Types.Number("price"))`.
+        Without a child the elements are decoded by their stack type. With `as_array` a list of numbers is returned as `array('q')`,
+        or as a plain list if a value does not fit in 64 bits.
+        """
+
         type = "list"
 
-        def __init__(self, name: str, *typs: BaseType) -> None:
+        def __init__(self, name: str, *typs: BaseType, as_array: bool = False) -> None:
             super().__init__(name)
+            assert len(typs) <= 1, "List elements must share a single type"
+            assert not as_array or not typs or isinstance(typs[0], (Types.Number, Types.Bool)), "Only lists of numbers can be decoded as arrays"
             self.typs = typs
+            self.as_array = as_array
+
+        def child(self, index: int) -> Optional[BaseType]:
+            return self.typs[0] if self.typs else None
+
+        def finish(self, values: list):
+            if self.as_array:
+                try:
+                    return array("q", values)
+                except OverflowError:
+                    pass
+            return values
 
         def decode(self, data: Any):
-            warnings.warn("List type is not supported yet, return raw data", RuntimeWarning)
-            return data
+            return _decode_nested(self, data)
 
     class Tuple(BaseType):
+        """
+        Tuple decodes a TVM tuple with the declared child types into a dict keyed by the child names,
+        e.g. `Types.Tuple("reserves", Types.Number("reserve0"), Types.Number("reserve1"))`.
+        Without children the elements are decoded by their stack type into a list.
+        """
+
         type = "tuple"
 
         def __init__(self, name: str, *typs: BaseType) -> None:
             super().__init__(name)
+            assert len(typs) == len(set(typ.name for typ in typs)), "Field names must be unique"
             self.typs = typs
 
+        def child(self, index: int) -> Optional[BaseType]:
+            if not self.typs:
+                return None
+            assert index < len(self.typs), f"Tuple {self.name} has more than {len(self.typs)} elements"
+            return self.typs[index]
+
+        def finish(self, values: list):
+            if not self.typs:
+                return values
+            assert len(values) == len(self.typs), f"Tuple {self.name} must have {len(self.typs)} elements, but got {len(values)}"
+            return dict(zip([typ.name for typ in self.typs], values))
+
         def decode(self, data: Any):
-            warnings.warn("Tuple type is not supported yet, return raw data", RuntimeWarning)
-            return data
+            return _decode_nested(self, data)
 
     class Slice(BaseType):
         type = "slice"
 
-        def decode(self, data: Any):
-            warnings.warn("Slice type is not supported yet, return raw data", RuntimeWarning)
-            return data
+        def decode(self, data: Any) -> CellSlice:
+            if isinstance(data, dict):
+                data = data.get("bytes", "")
+            return CellSlice(data)
+
+
+_V2_ENTRIES = {
+    "tvm.stackEntryCell": ("cell", "cell"),
+    "tvm.stackEntrySlice": ("slice", "slice"),
+    "tvm.stackEntryTuple": ("tuple", "tuple"),
+    "tvm.stackEntryList": ("list", "list"),
+}
+
+
+def _entry(entry: Any) -> Tuple[str, Any]:
+    """
+    _entry returns the (stack type, value) of an element of a tuple or list, either a v3 `GetMethodParameterOutput`
+    or a v2 `tvm.stackEntry*` object. Numbers are returned in hex like top level stack entries.
+    """
+    if isinstance(entry, GetMethodParameterOutput):
+        return entry.type, entry.value
+    kind = entry.get("@type")
+    if kind is None:
+        return entry["type"], entry["value"]
+    if kind == "tvm.stackEntryNumber":
+        return "num", hex(int(entry["number"]["number"]))
+    typ, key = _V2_ENTRIES.get(kind, ("unsupported_type", None))
+    if key is None:
+        return typ, entry
+    value = entry[key]
+    return typ, value["bytes"] if typ in ("cell", "slice") else value
+
+
+def _elements(value: Any) -> list:
+    # v3 tuples are lists of entries, v2 tuples are tvm.tuple / tvm.list objects
+    if isinstance(value, dict):
+        return value.get("elements", [])
+    assert isinstance(value, list), "Tuple value must be a list"
+    return value
+
+
+def _decode_generic(typ: str, value: Any) -> Any:
+    if typ == "num":
+        return int(value, 16)
+    if typ == "cell" or typ == "slice":
+        return CellSlice(value)
+    return value
+
+
+def _decode_nested(root: Union[Types.List, Types.Tuple], value: Any) -> Any:
+    """
+    _decode_nested decodes nested tuples and lists with an explicit stack, so the nesting depth is not limited by the recursion limit
+    """
+    # a frame is [type, elements, next element index, decoded values]
+    frames: List[list] = [[root, _elements(value), 0, []]]
+    while True:
+        frame = frames[-1]
+        typ, elements, index, values = frame
+        if index == len(elements):
+            frames.pop()
+            result = typ.finish(values)
+            if not frames:
+                return result
+            frames[-1][3].append(result)
+            continue
+        if index == 0 and isinstance(typ, Types.List) and typ.as_array:
+            # numbers only, decode the whole list at once
+            frame[2] = len(elements)
+            values.extend(int(_entry(entry)[1], 16) for entry in elements)
+            if typ.typs and isinstance(typ.typs[0], Types.Bool):
+                values[:] = [int(bool(v)) for v in values]
+            continue
+        frame[2] = index + 1
+        child = typ.child(index)
+        stack_type, child_value = _entry(elements[index])
+        if isinstance(child, (Types.List, Types.Tuple)):
+            frames.append([child, _elements(child_value), 0, []])
+        elif child is not None:
+            values.append(child.decode(child_value))
+        elif stack_type == "tuple":
+            frames.append([Types.Tuple(f"{typ.name}_{index}"), _elements(child_value), 0, []])
+        elif stack_type == "list":
+            frames.append([Types.List(f"{typ.name}_{index}"), _elements(child_value), 0, []])
+        else:
+            values.append(_decode_generic(stack_type, child_value))
 
 
 class BaseDecoder(ABC):
@@ -113,10 +250,29 @@ class BaseDecoder(ABC):
         raise NotImplementedError
 
 
+DecodeOutput = Literal["dict", "tuple", "columns"]
+
+
 class Decoder(BaseDecoder):
+    """
+    Decoder decodes get method results with a fixed stack layout. The decoding plan, field names, expected stack types and decode functions,
+    is compiled once when the decoder is created, so decoding a result is a single pass over its stack.
+
+    Example
+    -------
+    ```python
+    decoder = Decoder(Types.Number("balance"), Types.Address("owner"), Types.Address("jetton"), Types.Cell("jetton_wallet_code"))
+    output = decoder.decode(result)
+    outputs = decoder.decode_many(results, output="columns")
+    ```
+    """
+
     def __init__(self, *typ: BaseType) -> None:
         self.types = typ
         assert len(self.types) == len(set(field.name for field in self.types)), "Field names must be unique"
+        self.field_names: Tuple[str, ...] = tuple(field.name for field in typ)
+        self._stack_types: Tuple[str, ...] = tuple(field.type for field in typ)
+        self._decoders: Tuple[Callable[[Any], Any], ...] = tuple(field.decode for field in typ)
 
     def _validate(self, data: GetMethodResultType) -> List[GetMethodParameterOutput]:
         if isinstance(data, RunGetMethodResponse):
@@ -138,12 +294,160 @@ class Decoder(BaseDecoder):
             return new_data
         raise ValueError("Data must be a RunGetMethodResponse(v3) or a list of GetMethodResult(v2)")
 
+    def _values(self, data: GetMethodResultType) -> List[Any]:
+        """
+        _values returns the raw value of every stack entry without building `GetMethodParameterOutput` for v2 results
+        """
+        if isinstance(data, RunGetMethodResponse):
+            stack = data.stack
+            assert len(self._decoders) == len(stack), "Fields count must be equal to data count"
+            return [entry.value for entry in stack]
+        if not isinstance(data, list):
+            raise ValueError("Data must be a RunGetMethodResponse(v3) or a list of GetMethodResult(v2)")
+        assert len(self._decoders) == len(data), "Fields count must be equal to data count"
+        try:
+            types = tuple(entry["type"] for entry in data)
+        except (TypeError, KeyError):
+            raise ValueError("Data must be a RunGetMethodResponse(v3) or a list of GetMethodResult(v2)")
+        if types != self._stack_types:
+            for i, (expected, got) in enumerate(zip(self._stack_types, types)):
+                assert expected == got, f"Field {i} type must be {expected}, but got {got}"
+        return [entry["value"].get("bytes", "") if entry["type"] == "cell" else entry["value"] for entry in data]
+
     def decode(self, data: GetMethodResultType) -> Dict[str, Any]:
-        _data = self._validate(data)
-        return OrderedDict((field.name, field.decode(_data[i].value)) for i, field in enumerate(self.types))
+        return OrderedDict(zip(self.field_names, [decode(value) for decode, value in zip(self._decoders, self._values(data))]))
+
+    def decode_many(self, results: Sequence[GetMethodResultType], output: DecodeOutput = "dict") -> Union[List[Dict[str, Any]], List[Tuple[Any, ...]], Dict[str, Union[list, array]]]:
+        """
+        decode_many decodes a batch of v2 or v3 results of the same get method in one pass.
+        Values of cacheable fields, e.g. the jetton master address shared by every wallet, are decoded once per batch.
+
+        Parameters
+        ----------
+        results : Sequence[GetMethodResultType]
+            The results to decode, v2 and v3 results can be mixed.
+        output : Literal["dict", "tuple", "columns"], optional
+            - "dict": a list with one dict per result, in the order of `field_names` like `decode`
+            - "tuple": a list with one tuple per result, values in the order of `field_names`
+            - "columns": a dict mapping every field name to the list of its values. Number and Bool columns are `array('q')`
+              when every value fits in 64 bits, so they can be shared with numpy without copying.
+
+        Returns
+        -------
+        Union[List[Dict[str, Any]], List[Tuple[Any, ...]], Dict[str, Union[list, array]]]
+        """
+        assert output in ("dict", "tuple", "columns"), f"Invalid output {output}"
+        decoders = []
+        for field, decode in zip(self.types, self._decoders):
+            if field.cacheable:
+                decoders.append(_memoize(decode))
+            else:
+                decoders.append(decode)
+        rows = [tuple([decode(value) for decode, value in zip(decoders, self._values(data))]) for data in results]
+        if output == "tuple":
+            return rows
+        if output == "dict":
+            names = self.field_names
+            return [dict(zip(names, row)) for row in rows]
+        columns: Dict[str, Union[list, array]] = {}
+        for i, field in enumerate(self.types):
+            column = [row[i] for row in rows]
+            if isinstance(field, (Types.Number, Types.Bool)):
+                try:
+                    column = array("q", column)
+                except OverflowError:
+                    pass
+            columns[field.name] = column
+        return columns
+
+
+def _memoize(decode: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    memo: Dict[Any, Any] = {}
+
+    def wrapper(value: Any) -> Any:
+        try:
+            return memo[value]
+        except KeyError:
+            result = memo[value] = decode(value)
+            return result
+
+    return wrapper
+
+
+def _is_addr_none(cell: str) -> bool:
+    try:
+        cs = CellSlice(cell)
+        return cs.bits == 2 and cs.refs == 0 and cs.preload_uint(2) == 0
+    except Exception:
+        return False
+
+
+class _AutoNested(BaseType):
+    """
+    A list or tuple whose elements are decoded by trial, like `AutoDecoder` does without a schema
+    """
+
+    def __init__(self, name: str, type: GetMethodParameterType) -> None:
+        super().__init__(name)
+        self.type = type
+
+    def decode(self, data: Any):
+        return [_infer(*_entry(entry), f"{self.name}_{i}")[1] for i, entry in enumerate(_elements(data))]
+
+
+def _infer(stack_type: str, value: Any, name: str) -> Tuple[Optional[BaseType], Any]:
+    """
+    _infer decodes a stack entry by trial and returns the type that decoded it along with the value.
+    The type is None when the value is ambiguous, e.g. an empty address (addr_none) could also be a plain cell.
+    """
+    if stack_type == "cell":
+        assert isinstance(value, str), "Cell value must be a string"
+        t: BaseType = Types.Address(name)
+        try:
+            return t, t.decode(value)
+        except Exception:
+            t = Types.B64String(name)
+            return (None if _is_addr_none(value) else t), t.decode(value)
+    if stack_type == "slice":
+        t = Types.Slice(name)
+        return t, t.decode(value)
+    if stack_type == "list" or stack_type == "tuple":
+        t = _AutoNested(name, stack_type)
+        return t, t.decode(value)
+    if stack_type == "num":
+        assert isinstance(value, str), "Number value must be a string"
+        t = Types.Number(name)
+        return t, t.decode(value)
+    t = Types.Raw(name)
+    return t, t.decode(value)
 
 
 class AutoDecoder(BaseDecoder):
+    """
+    AutoDecoder decodes get method results without a declared layout, cells are tried as addresses first and fall back to base64 strings.
+
+    The stack layout of a get method of a given contract code never changes, so when the code hash and the method name are passed to `decode`,
+    the inferred field types are cached as a `Decoder` and later results of the same contract and method are decoded without trial parsing.
+    A schema is cached only once every field is unambiguous, and dropped again if a later result does not match it.
+
+    Example
+    -------
+    ```python
+    decoder = AutoDecoder()
+    account = await client.get_account(GetAccountRequest(address=wallet))
+    code_hash = Cell(account.code).get_hash()
+    output = decoder.decode(result, code_hash=code_hash, method="get_wallet_data")
+    wallet_data_decoder = decoder.export(code_hash, "get_wallet_data")
+    ```
+    """
+
+    def __init__(self, maxsize: int = 1024) -> None:
+        assert maxsize > 0, "maxsize must be greater than 0"
+        self.maxsize = maxsize
+        self._schemas: OrderedDict[Tuple[str, str], Decoder] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
     def _transform(self, data: GetMethodResultType) -> List[GetMethodParameterOutput]:
         if isinstance(data, RunGetMethodResponse):
             return data.stack
@@ -156,49 +460,57 @@ class AutoDecoder(BaseDecoder):
                 if type == "cell":
                     new_data.append(GetMethodParameterOutput(type=type, value=value.get("bytes", "")))
                 else:
-                    new_data.append(GetMethodParameterOutput(type=type, value=value))
+                    # v2 tuples and lists are tvm.tuple / tvm.list objects, they are kept as is
+                    new_data.append(GetMethodParameterOutput.model_construct(type=type, value=value))
             return new_data
         raise ValueError("Data must be a RunGetMethodResponse(v3) or a list of GetMethodResult(v2)")
 
-    def decode(self, data: GetMethodResultType) -> Dict[str, Any]:
-        _data = self._transform(data)
-        output = {}
+    def decode(self, data: GetMethodResultType, code_hash: Optional[str] = None, method: Optional[str] = None) -> Dict[str, Any]:
+        """
+        decode decodes the result. With both code_hash and method, the inferred schema is cached and reused for the same contract and method.
+        """
+        key = (code_hash, method) if code_hash is not None and method is not None else None
+        if key is not None:
+            decoder = self._schemas.get(key)
+            if decoder is not None:
+                try:
+                    output = decoder.decode(data)
+                except Exception:
+                    # the result does not match the cached schema, e.g. an address field is empty this time
+                    del self._schemas[key]
+                else:
+                    self.hits += 1
+                    self._schemas.move_to_end(key)
+                    return output
+            self.misses += 1
 
-        def _recursive_decode(data: GetMethodParameterOutput, prefix: str = "idx_", idx: int = 0, depth: int = 0):
-            field_name = f"{prefix}{idx}"
+        output = {}
+        types: List[Optional[BaseType]] = []
+        for idx, field in enumerate(self._transform(data)):
+            t, value = _infer(field.type, field.value, f"idx_{idx}")
+            output[f"idx_{idx}"] = value
+            types.append(t)
+
+        if key is not None and all(t is not None for t in types):
+            self._schemas[key] = Decoder(*types)  # type: ignore
+            while len(self._schemas) > self.maxsize:
+                self._schemas.popitem(last=False)
+        return output
 
-            if data.type == "cell":
-                assert isinstance(data.value, str), "Cell value must be a string"
-                try:
-                    t = Types.Address(field_name)
-                    return t.name, t.decode(data.value)
-                except:
-                    t = Types.B64String(field_name)
-                    return t.name, t.decode(data.value)
-            if data.type == "slice":
-                assert isinstance(data.value, list), "Slice value must be a list"
-                t = Types.Slice(field_name)
-                return t.name, t.decode(data.value)
-            if data.type == "list" or data.type == "tuple":
-                assert isinstance(data.value, list), "List value must be a list"
-                results = []
-                for i, t in enumerate(data.value):
-                    result, _ = _recursive_decode(t, f"{field_name}_", i, depth + 1)
-                    results.append(result)
-                return field_name, results
-            elif data.type == "num":
-                assert isinstance(data.value, str), "Number value must be a string"
-                t = Types.Number(field_name)
-                return t.name, t.decode(data.value)
-            else:
-                t = Types.Raw(field_name)
-                return t.name, t.decode(data.value)
+    def export(self, code_hash: str, method: str) -> Decoder:
+        """
+        export returns the schema inferred for the contract and method as a reusable `Decoder`, e.g. to run `decode_many` on a batch
+        """
+        decoder = self._schemas.get((code_hash, method))
+        if decoder is None:
+            raise KeyError(f"No schema inferred for method {method} of code {code_hash}")
+        return decoder
 
-        for idx, field in enumerate(_data):
-            name, value = _recursive_decode(field, idx=idx)
-            output[name] = value
+    def schemas(self) -> Dict[Tuple[str, str], Decoder]:
+        return dict(self._schemas)
 
-        return output
+    def clear(self) -> None:
+        self._schemas.clear()
 
 
 JettonDataDict = TypedDict(
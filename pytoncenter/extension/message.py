@@ -1,18 +1,125 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import Generic, Optional, TypeVar
-
-from tonpy import CellSlice
-
-from pytoncenter.address import Address
+from collections import OrderedDict
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    TypedDict,
+    TypeVar,
+    Union,
+)
+
+from tonpy import Cell, CellBuilder, CellSlice, begin_cell
+
+from pytoncenter.address import Address, parse_address
 from pytoncenter.utils import get_opcode
+from pytoncenter.v3.trace import iter_trace_nodes
+
+if TYPE_CHECKING:
+    from pytoncenter.v3.models import Message, Transaction, TransactionTrace
 
 T = TypeVar("T", bound="BaseMessage")
 
+FieldLoader = Callable[[CellSlice], Any]
+
+
+def _load_query_id(cs: CellSlice) -> int:
+    return cs.load_uint(64)
+
+
+def _load_uint64(cs: CellSlice) -> int:
+    return cs.load_uint(64)
+
+
+def _load_coins(cs: CellSlice) -> int:
+    return cs.load_var_uint(16)
+
+
+def _load_address(cs: CellSlice) -> Optional[Address]:
+    # addr_none$00, e.g. the previous owner of a freshly minted NFT, is rejected by tonpy
+    if cs.preload_uint(2) == 0:
+        cs.skip_bits(2)
+        return None
+    return Address(cs.load_address())
+
+
+def _load_uint256(cs: CellSlice) -> int:
+    return cs.load_uint(256)
+
+
+def _load_ref(cs: CellSlice) -> CellSlice:
+    return cs.load_ref(as_cs=True)
+
+
+def _load_bool(cs: CellSlice) -> bool:
+    return cs.load_bool()
+
+
+def _load_maybe_ref(cs: CellSlice) -> Optional[CellSlice]:
+    return cs.load_ref(as_cs=True) if cs.load_bool() else None
+
+
+def _load_either_ref(cs: CellSlice) -> Optional[CellSlice]:
+    """
+    _load_either_ref loads a trailing (Either Cell ^Cell), the referenced cell or the rest of the body, None if it is empty.
+    A body ending with a bare reference, as sent by some wallets without the Either bit, gives the referenced cell.
+    """
+    if cs.bits == 0:
+        return cs.load_ref(as_cs=True) if cs.refs else None
+    if cs.load_bool():
+        return cs.load_ref(as_cs=True)
+    return None if cs.empty_ext() else cs
+
+
+class _LazyField:
+    """
+    _LazyField is the class attribute of a field of a lazily parsed message. It is only reached while the field is not decoded,
+    the decoded value is stored in the instance and shadows it.
+    """
+
+    __slots__ = ("index",)
+
+    def __init__(self, index: int) -> None:
+        self.index = index
+
+    def __get__(self, obj: Optional[BaseMessage], owner: type) -> Any:
+        if obj is None:
+            return self
+        return obj._decode_field(self.index)
+
 
 class BaseMessage(ABC, Generic[T]):
+    """
+    BaseMessage is the base of the message body parsers. Every subclass with an `OPCODE` is registered in `message_registry`,
+    unless it is declared with `register=False`, e.g. `class MyTransfer(BaseMessage["MyTransfer"], register=False)`.
+    """
+
     OPCODE = ""
+    OPCODE_INT: Optional[int] = None
+    FIELDS: Tuple[Tuple[str, FieldLoader], ...] = ()
+    """
+    The fields of the body after the opcode, in order, with the function loading each of them. A parser declaring its fields
+    supports `parse(cs, lazy=True)`.
+    """
+
+    def __init_subclass__(cls, register: bool = True, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        cls.OPCODE_INT = int(cls.OPCODE, 16) if cls.OPCODE else None
+        for index, (name, _) in enumerate(cls.__dict__.get("FIELDS", ())):
+            setattr(cls, name, _LazyField(index))
+        if register and cls.OPCODE_INT is not None:
+            # the first parser of an opcode wins, use message_registry.register(cls, replace=True) to override it
+            if message_registry.get(cls.OPCODE_INT) is None:
+                message_registry.register(cls)
 
     @property
     def name(self) -> str:
@@ -20,8 +127,8 @@ class BaseMessage(ABC, Generic[T]):
 
     @classmethod
     def _preparse(cls, cs: CellSlice) -> CellSlice:
-        opcode = get_opcode(cs.load_uint(32))
-        assert opcode == cls.OPCODE, f"opcode {opcode} is not {cls.OPCODE}"
+        opcode = cs.load_uint(32)
+        assert opcode == cls.OPCODE_INT, f"opcode {get_opcode(opcode)} is not {cls.OPCODE}"
         return cs
 
     @classmethod
@@ -33,20 +140,437 @@ class BaseMessage(ABC, Generic[T]):
         raise NotImplementedError
 
     @classmethod
-    def parse(cls, cs: CellSlice) -> T:
+    def _parse_fields(cls, body: CellSlice) -> T:
+        return cls(*[load(body) for _, load in cls.FIELDS])
+
+    @classmethod
+    def _parse_lazy(cls, body: CellSlice) -> T:
+        """
+        _parse_lazy keeps the cellslice after the opcode and decodes the fields in order on first access, up to the field which is read.
+        Reading `query_id` or `amount` of a transfer never builds an Address or loads a payload reference.
+        """
+        if not cls.FIELDS:
+            return cls._parse(body)
+        msg = cls.__new__(cls)
+        msg.__dict__.update(_cs=body, _decoded=0)
+        return msg
+
+    def _decode_field(self, index: int) -> Any:
+        state = self.__dict__
+        cs = state["_cs"]
+        decoded = state["_decoded"]
+        try:
+            for name, load in self.FIELDS[decoded : index + 1]:
+                state[name] = load(cs)
+                decoded += 1
+        finally:
+            state["_decoded"] = decoded
+        if decoded == len(self.FIELDS):
+            del state["_cs"], state["_decoded"]
+        return state[self.FIELDS[index][0]]
+
+    @property
+    def is_lazy(self) -> bool:
+        """
+        is_lazy is True while some fields of a lazily parsed message are not decoded yet
+        """
+        return "_cs" in self.__dict__
+
+    def copy(self: T) -> T:
+        """
+        copy returns a message whose payload slices can be loaded without consuming the slices of this message
+        """
+        msg = self.__class__.__new__(self.__class__)
+        msg.__dict__.update({name: value.copy() if isinstance(value, CellSlice) else value for name, value in self.__dict__.items()})
+        return msg
+
+    def fields(self) -> Dict[str, Any]:
+        """
+        fields returns the fields of the message by name, decoding the remaining ones of a lazy message
+        """
+        if self.FIELDS:
+            return {name: getattr(self, name) for name, _ in self.FIELDS}
+        return dict(vars(self))
+
+    @classmethod
+    def parse(cls, cs: CellSlice, lazy: bool = False) -> T:
+        """
+        parse parses the body with its opcode. With `lazy`, a parser with `FIELDS` keeps the cellslice and decodes the fields on first access,
+        a malformed body then raises when the broken field is read.
+        """
         body = cls._preparse(cs)
-        return cls._parse(body)
+        return cls._parse_lazy(body) if lazy else cls._parse(body)
+
+    def to_cell(self) -> Cell:
+        """
+        to_cell serializes the message with its opcode, see `MessageBuilder` to build many messages
+        """
+        return MessageBuilder().to_cell(self)
 
     def to_boc(self) -> str:
-        raise NotImplementedError
+        return self.to_cell().to_boc()
 
     def __repr__(self) -> str:
         return f"{self.name}({self.OPCODE})"
 
 
+class RawMessage(BaseMessage["RawMessage"]):
+    """
+    RawMessage is returned by `MessageRegistry` for a body whose opcode has no registered parser, or which failed to parse.
+    The body is kept as it was given, a base64 boc is only parsed on `cell_slice`.
+    """
+
+    def __init__(self, opcode: Optional[int], body: Union[str, CellSlice], error: Optional[str] = None):
+        self.opcode = opcode
+        self.body = body
+        self.error = error
+
+    @property
+    def cell_slice(self) -> CellSlice:
+        return self.body if isinstance(self.body, CellSlice) else CellSlice(self.body)
+
+    @classmethod
+    def _parse(cls, body: CellSlice) -> RawMessage:
+        return cls(body.preload_uint(32) if body.bits >= 32 else None, body)
+
+    @classmethod
+    def parse(cls, cs: CellSlice, lazy: bool = False) -> RawMessage:
+        return cls._parse(cs)
+
+    def __repr__(self) -> str:
+        opcode = get_opcode(self.opcode) if self.opcode is not None else None
+        return f"{self.name}({opcode})" if self.error is None else f"{self.name}({opcode}, error={self.error!r})"
+
+
+TransactionMessages = TypedDict(
+    "TransactionMessages",
+    {
+        "transaction": "Transaction",
+        "in_msg": Optional[BaseMessage],
+        "out_msgs": List[Optional[BaseMessage]],
+    },
+)
+
+
+ParsedMessageCacheInfo = TypedDict(
+    "ParsedMessageCacheInfo",
+    {
+        "hits": int,
+        "misses": int,
+        "maxsize": int,
+        "currsize": int,
+        "hit_rate": float,
+    },
+)
+
+
+class ParsedMessageCache:
+    """
+    ParsedMessageCache keeps parsed message bodies by the body hash of `MessageContent`, so a body seen many times,
+    e.g. as the out message of a transaction and the in message of the next one in a trace, is parsed by tonpy only once.
+    It holds at most `maxsize` entries and evicts the least recently used one.
+
+    The cache keeps its own copy of a message and every hit returns a new copy, so loading from the payload slices of a parsed message
+    never consumes them for the next lookup of the body.
+    """
+
+    def __init__(self, maxsize: int = 65536) -> None:
+        assert maxsize > 0, "maxsize must be greater than 0"
+        self.maxsize = maxsize
+        self._messages: OrderedDict[str, BaseMessage] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def __contains__(self, body_hash: str) -> bool:
+        return body_hash in self._messages
+
+    def get(self, body_hash: str) -> Optional[BaseMessage]:
+        msg = self._messages.get(body_hash)
+        if msg is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._messages.move_to_end(body_hash)
+        return msg.copy()
+
+    def put(self, body_hash: str, msg: BaseMessage) -> None:
+        self._messages[body_hash] = msg.copy()
+        self._messages.move_to_end(body_hash)
+        while len(self._messages) > self.maxsize:
+            self._messages.popitem(last=False)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def cache_info(self) -> ParsedMessageCacheInfo:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "maxsize": self.maxsize,
+            "currsize": len(self._messages),
+            "hit_rate": self.hit_rate,
+        }
+
+    def clear(self) -> None:
+        self._messages.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+class MessageRegistry:
+    """
+    MessageRegistry maps opcodes to `BaseMessage` parsers and parses a body with the parser of its first 32 bits in one step.
+    Bodies with an unknown opcode, shorter than 32 bits or which fail to parse are returned as `RawMessage`, so bulk parsing never raises.
+    With a `ParsedMessageCache`, messages are looked up by their body hash before being parsed. With `lazy`, messages are parsed lazily,
+    see `BaseMessage.parse`, so a pipeline filtering on cheap fields like `amount` only decodes the addresses of the messages it keeps.
+
+    Example
+    -------
+    ```python
+    message_registry.cache = ParsedMessageCache()
+    for item in message_registry.parse_transactions(txs):
+        if isinstance(item["in_msg"], JettonMessage.Transfer):
+            print(item["transaction"].hash, item["in_msg"].amount)
+    ```
+    """
+
+    def __init__(self, *classes: Type[BaseMessage], cache: Optional[ParsedMessageCache] = None, lazy: bool = False) -> None:
+        self._classes: Dict[int, Type[BaseMessage]] = {}
+        self.cache = cache
+        self.lazy = lazy
+        for cls in classes:
+            self.register(cls)
+
+    def __len__(self) -> int:
+        return len(self._classes)
+
+    def __contains__(self, opcode: int) -> bool:
+        return opcode in self._classes
+
+    def get(self, opcode: int) -> Optional[Type[BaseMessage]]:
+        return self._classes.get(opcode)
+
+    def register(self, cls: Type[T], replace: bool = False) -> Type[T]:
+        """
+        register adds the parser of `cls.OPCODE`, it can be used as a class decorator. An opcode registered by another class raises
+        a ValueError unless `replace` is set.
+        """
+        assert cls.OPCODE_INT is not None, f"{cls.__qualname__} has no OPCODE"
+        existing = self._classes.get(cls.OPCODE_INT)
+        if existing is not None and existing is not cls and not replace:
+            raise ValueError(f"opcode {cls.OPCODE} is already registered by {existing.__qualname__}")
+        self._classes[cls.OPCODE_INT] = cls
+        if self.cache is not None:
+            self.cache.clear()
+        return cls
+
+    def unregister(self, cls: Type[BaseMessage]) -> None:
+        if self._classes.get(cls.OPCODE_INT) is cls:  # type: ignore
+            del self._classes[cls.OPCODE_INT]  # type: ignore
+            if self.cache is not None:
+                self.cache.clear()
+
+    def parse(self, body: Union[str, CellSlice], lazy: Optional[bool] = None) -> BaseMessage:
+        """
+        parse parses a body, given as a base64 boc or a CellSlice, with the parser registered for its opcode.
+        `lazy` overrides the mode of the registry, errors of a lazy message are raised on access instead of returning a RawMessage.
+        """
+        cs = CellSlice(body) if isinstance(body, str) else body.copy()
+        if cs.bits < 32:
+            return RawMessage(None, body)
+        opcode = cs.preload_uint(32)
+        cls = self._classes.get(opcode)
+        if cls is None:
+            return RawMessage(opcode, body)
+        cs.skip_bits(32)
+        if self.lazy if lazy is None else lazy:
+            return cls._parse_lazy(cs)
+        try:
+            return cls._parse(cs)
+        except Exception as e:
+            return RawMessage(opcode, body, str(e) or e.__class__.__name__)
+
+    def parse_message(self, msg: Message) -> Optional[BaseMessage]:
+        """
+        parse_message parses the body of a v3 message, None if the message has no body. The opcode reported by the API is checked first,
+        so the boc of a message without a registered parser is never parsed.
+        """
+        content = msg.message_content
+        if content is None or not content.body:
+            return None
+        if msg.opcode is not None:
+            opcode = int(msg.opcode, 16) & 0xFFFFFFFF
+            if opcode not in self._classes:
+                return RawMessage(opcode, content.body)
+        cache = self.cache
+        if cache is None or not content.hash:
+            return self.parse(content.body)
+        parsed = cache.get(content.hash)
+        if parsed is None:
+            parsed = self.parse(content.body)
+            cache.put(content.hash, parsed)
+        return parsed
+
+    def parse_messages(self, msgs: Iterable[Message]) -> List[Optional[BaseMessage]]:
+        return [self.parse_message(msg) for msg in msgs]
+
+    def parse_transactions(self, txs: Iterable[Transaction]) -> List[TransactionMessages]:
+        """
+        parse_transactions parses the inbound and outbound messages of every transaction
+        """
+        parse_message = self.parse_message
+        return [{"transaction": tx, "in_msg": parse_message(tx.in_msg) if tx.in_msg is not None else None, "out_msgs": [parse_message(msg) for msg in tx.out_msgs]} for tx in txs]
+
+    def parse_trace(self, trace: TransactionTrace) -> List[TransactionMessages]:
+        """
+        parse_trace parses the messages of every transaction of the trace in depth-first pre-order. With a cache, every internal message
+        is parsed once, although it is both an out message of the parent and the in message of the child.
+        """
+        return self.parse_transactions(node.transaction for node in iter_trace_nodes(trace))
+
+
+message_registry = MessageRegistry()
+"""
+The registry of every BaseMessage subclass declared with an OPCODE
+"""
+
+Payload = Union[Cell, CellSlice, str]
+
+
+class MessageBuilder:
+    """
+    MessageBuilder serializes messages whose parser declares `FIELDS`, every field is stored with the counterpart of its loader.
+    The serialized addresses and payload cells are cached, so a batch of transfers to known destinations with the same forward payload
+    stores each address and converts each payload only once. Payloads are given as a Cell, a CellSlice or a base64 boc,
+    a (Either Cell ^Cell) payload is always stored as a reference.
+
+    Example
+    -------
+    ```python
+    builder = MessageBuilder()
+    comment = begin_cell().store_uint(0, 32).store_string("payout").end_cell()
+    transfers = [JettonMessage.Transfer(i, amount, owner, response, None, 1, comment) for i, (owner, amount) in enumerate(payouts)]
+    bodies = builder.build_many(transfers)
+    ```
+    """
+
+    def __init__(self, maxsize: int = 4096) -> None:
+        assert maxsize > 0, "maxsize must be greater than 0"
+        self.maxsize = maxsize
+        self._addresses: OrderedDict[bytes, CellBuilder] = OrderedDict()
+        # payloads are kept with their cell, so the id of a cached object is never reused
+        self._payloads: OrderedDict[Union[int, str], Tuple[Payload, Cell]] = OrderedDict()
+        self._plans: Dict[type, List[Tuple[str, Callable[[MessageBuilder, CellBuilder, Any], CellBuilder]]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._addresses) + len(self._payloads)
+
+    def _put(self, cache: OrderedDict, key: Any, value: Any) -> None:
+        cache[key] = value
+        while len(cache) > self.maxsize:
+            cache.popitem(last=False)
+
+    def _store_address(self, b: CellBuilder, value: Optional[Union[str, Address]]) -> CellBuilder:
+        if value is None:
+            return b.store_uint(0, 2)
+        address = value if isinstance(value, Address) else parse_address(value)
+        fragment = self._addresses.get(address.key)
+        if fragment is None:
+            fragment = begin_cell().store_address(address.to_string(False))
+            self._put(self._addresses, address.key, fragment)
+        else:
+            self._addresses.move_to_end(address.key)
+        return b.store_builder(fragment)
+
+    def cell(self, payload: Payload) -> Cell:
+        """
+        cell returns the payload as a Cell, converting a CellSlice or a boc once
+        """
+        if isinstance(payload, Cell):
+            return payload
+        key = payload if isinstance(payload, str) else id(payload)
+        cached = self._payloads.get(key)
+        if cached is not None:
+            self._payloads.move_to_end(key)
+            return cached[1]
+        cell = Cell(payload) if isinstance(payload, str) else begin_cell().store_slice(payload.copy()).end_cell()
+        self._put(self._payloads, key, (payload, cell))
+        return cell
+
+    def _store_maybe_ref(self, b: CellBuilder, value: Optional[Payload]) -> CellBuilder:
+        return b.store_uint(0, 1) if value is None else b.store_uint(1, 1).store_ref(self.cell(value))
+
+    def _plan(self, cls: Type[BaseMessage]) -> List[Tuple[str, Callable[[MessageBuilder, CellBuilder, Any], CellBuilder]]]:
+        plan = self._plans.get(cls)
+        if plan is not None:
+            return plan
+        if not cls.FIELDS or cls.OPCODE_INT is None:
+            raise NotImplementedError(f"{cls.__qualname__} does not declare its FIELDS")
+        plan = []
+        for name, load in cls.FIELDS:
+            store = _STORERS.get(load)
+            if store is None:
+                raise NotImplementedError(f"field {name} of {cls.__qualname__} can not be stored")
+            plan.append((name, store))
+        self._plans[cls] = plan
+        return plan
+
+    def to_cell(self, msg: BaseMessage) -> Cell:
+        """
+        to_cell serializes the message with its opcode
+        """
+        b = begin_cell().store_uint(msg.OPCODE_INT, 32) if msg.OPCODE_INT is not None else None
+        for name, store in self._plan(type(msg)):
+            b = store(self, b, getattr(msg, name))
+        return b.end_cell()
+
+    def to_boc(self, msg: BaseMessage) -> str:
+        return self.to_cell(msg).to_boc()
+
+    def build_many(self, msgs: Iterable[BaseMessage]) -> List[str]:
+        """
+        build_many returns the base64 bocs of the messages in order
+        """
+        to_cell = self.to_cell
+        return [to_cell(msg).to_boc() for msg in msgs]
+
+    def clear(self) -> None:
+        self._addresses.clear()
+        self._payloads.clear()
+
+
+_STORERS: Dict[FieldLoader, Callable[[MessageBuilder, CellBuilder, Any], CellBuilder]] = {
+    _load_query_id: lambda builder, b, value: b.store_uint(value, 64),
+    _load_uint64: lambda builder, b, value: b.store_uint(value, 64),
+    _load_uint256: lambda builder, b, value: b.store_uint(value, 256),
+    _load_coins: lambda builder, b, value: b.store_var_uint(value, 16),
+    _load_bool: lambda builder, b, value: b.store_bool(value),
+    _load_address: MessageBuilder._store_address,
+    _load_ref: lambda builder, b, value: b.store_ref(builder.cell(value)),
+    _load_maybe_ref: MessageBuilder._store_maybe_ref,
+    _load_either_ref: MessageBuilder._store_maybe_ref,
+}
+"""
+The storer of every field loader, the Maybe and Either references share the layout when the payload is a reference
+"""
+
+
 class JettonMessage:
     class InternalTransfer(BaseMessage["InternalTransfer"]):
         OPCODE = "0x178d4519"
+        FIELDS = (
+            ("query_id", _load_query_id),
+            ("amount", _load_coins),
+            ("sender", _load_address),
+            ("response_address", _load_address),
+            ("forward_ton_amount", _load_coins),
+            ("forward_payload", _load_either_ref),
+        )
 
         def __init__(
             self,
@@ -72,23 +596,19 @@ class JettonMessage:
                         forward_ton_amount:(VarUInteger 16)
                         forward_payload:(Either Cell ^Cell)
             """
-            query_id = body.load_uint(64)
-            amount = body.load_var_int(16)
-            sender = Address(body.load_address())
-            response_address = Address(body.load_address())
-            forward_ton_amount = body.load_var_uint(16)
-            forward_payload = None if body.empty_ext() else body.load_ref(as_cs=True)
-            return cls(
-                query_id=query_id,
-                amount=amount,
-                sender=sender,
-                response_address=response_address,
-                forward_ton_amount=forward_ton_amount,
-                forward_payload=forward_payload,
-            )
+            return cls._parse_fields(body)
 
     class Transfer(BaseMessage["Transfer"]):
         OPCODE = "0x0f8a7ea5"
+        FIELDS = (
+            ("query_id", _load_query_id),
+            ("amount", _load_coins),
+            ("destination", _load_address),
+            ("response_destination", _load_address),
+            ("custom_payload", _load_maybe_ref),
+            ("forward_ton_amount", _load_coins),
+            ("forward_payload", _load_either_ref),
+        )
 
         def __init__(
             self,
@@ -115,40 +635,30 @@ class JettonMessage:
             response_destination:MsgAddress custom_payload:(Maybe ^Cell)
             forward_ton_amount:(VarUInteger 16) forward_payload:(Either Cell ^Cell)
             """
-            query_id = body.load_uint(64)
-            amount = body.load_var_uint(16)
-            destination = Address(body.load_address())
-            response_destination = Address(body.load_address())
-
-            custom_payload = None
-            custom_payload_exists = body.load_bool()
-            if custom_payload_exists:
-                custom_payload = body.load_ref(as_cs=True)
-
-            forward_ton_amount = body.load_var_uint(16)
-
-            forward_payload = None
-            if not body.empty_ext():
-                forward_payload = body.load_ref(as_cs=True)
-
-            return cls(query_id, amount, destination, response_destination, custom_payload, forward_ton_amount, forward_payload)
+            return cls._parse_fields(body)
 
     class Excess(BaseMessage["Excess"]):
         OPCODE = "0xd53276db"
+        FIELDS = (("query_id", _load_query_id),)
 
         def __init__(self, query_id: int):
             self.query_id = query_id
 
-        @staticmethod
-        def _parse(cs: CellSlice) -> JettonMessage.Excess:
+        @classmethod
+        def _parse(cls, body: CellSlice) -> JettonMessage.Excess:
             """
-            excess query_id:uint64 amount:(VarUInteger 16)
+            excesses query_id:uint64
             """
-            query_id = cs.load_uint(64)
-            return JettonMessage.Excess(query_id)
+            return cls._parse_fields(body)
 
     class TransferNotification(BaseMessage["TransferNotification"]):
         OPCODE = "0x7362d09c"
+        FIELDS = (
+            ("query_id", _load_query_id),
+            ("amount", _load_coins),
+            ("sender", _load_address),
+            ("forward_payload", _load_either_ref),
+        )
 
         def __init__(self, query_id: int, amount: int, sender: Address, forward_payload: Optional[CellSlice]):
             self.query_id = query_id
@@ -162,16 +672,16 @@ class JettonMessage:
             transfer_notification query_id:uint64 amount:(VarUInteger 16)
             sender:MsgAddress forward_payload:(Either Cell ^Cell)
             """
-            query_id = body.load_uint(64)
-            amount = body.load_var_uint(16)
-            sender = Address(body.load_address())
-            forward_payload = None
-            if not body.empty_ext():
-                forward_payload = body.load_ref(as_cs=True)
-            return cls(query_id, amount, sender, forward_payload)
+            return cls._parse_fields(body)
 
     class Burn(BaseMessage["Burn"]):
         OPCODE = "0x595f07bc"
+        FIELDS = (
+            ("query_id", _load_query_id),
+            ("amount", _load_coins),
+            ("response_destination", _load_address),
+            ("custom_payload", _load_maybe_ref),
+        )
 
         def __init__(
             self,
@@ -191,17 +701,16 @@ class JettonMessage:
             burn query_id:uint64 amount:(VarUInteger 16)
                 response_destination:MsgAddress custom_payload:(Maybe ^Cell)
             """
-            query_id = body.load_uint(64)
-            amount = body.load_var_uint(16)
-            response_destination = Address(body.load_address())
-            custom_payload = None
-            custom_payload_exists = body.load_bool()
-            if custom_payload_exists:
-                custom_payload = body.load_ref(as_cs=True)
-            return cls(query_id, amount, response_destination, custom_payload)
+            return cls._parse_fields(body)
 
     class BurnNotification(BaseMessage["BurnNotification"]):
         OPCODE = "0x7bdd97de"
+        FIELDS = (
+            ("query_id", _load_query_id),
+            ("amount", _load_coins),
+            ("sender", _load_address),
+            ("response_destination", _load_address),
+        )
 
         def __init__(self, query_id: int, amount: int, sender: Address, response_destination: Address):
             self.query_id = query_id
@@ -215,12 +724,249 @@ class JettonMessage:
             burn_notification query_id:uint64 amount:(VarUInteger 16)
                 sender:MsgAddress response_destination:MsgAddress
             """
-            query_id = body.load_uint(64)
-            amount = body.load_var_uint(16)
-            sender = Address(body.load_address())
-            response_destination = Address(body.load_address())
-            return cls(query_id, amount, sender, response_destination)
+            return cls._parse_fields(body)
 
 
 class NFTMessage:
-    pass
+    """
+    The messages of NFT items and collections of TEP-62. The item answers with `excesses`, the opcode of `JettonMessage.Excess`,
+    so `NFTMessage.Excess` is not in `message_registry`, register it with `replace=True` in a registry of NFT messages only.
+    """
+
+    class Transfer(BaseMessage["Transfer"]):
+        OPCODE = "0x5fcc3d14"
+        FIELDS = (
+            ("query_id", _load_query_id),
+            ("new_owner", _load_address),
+            ("response_destination", _load_address),
+            ("custom_payload", _load_maybe_ref),
+            ("forward_amount", _load_coins),
+            ("forward_payload", _load_either_ref),
+        )
+
+        def __init__(
+            self,
+            query_id: int,
+            new_owner: Address,
+            response_destination: Optional[Address],
+            custom_payload: Optional[CellSlice],
+            forward_amount: int,
+            forward_payload: Optional[CellSlice],
+        ):
+            self.query_id = query_id
+            self.new_owner = new_owner
+            self.response_destination = response_destination
+            self.custom_payload = custom_payload
+            self.forward_amount = forward_amount
+            self.forward_payload = forward_payload
+
+        @classmethod
+        def _parse(cls, body: CellSlice) -> NFTMessage.Transfer:
+            """
+            transfer query_id:uint64 new_owner:MsgAddress response_destination:MsgAddress
+                custom_payload:(Maybe ^Cell) forward_amount:(VarUInteger 16)
+                forward_payload:(Either Cell ^Cell)
+            """
+            return cls._parse_fields(body)
+
+    class OwnershipAssigned(BaseMessage["OwnershipAssigned"]):
+        OPCODE = "0x05138d91"
+        FIELDS = (
+            ("query_id", _load_query_id),
+            ("prev_owner", _load_address),
+            ("forward_payload", _load_either_ref),
+        )
+
+        def __init__(self, query_id: int, prev_owner: Optional[Address], forward_payload: Optional[CellSlice]):
+            self.query_id = query_id
+            self.prev_owner = prev_owner
+            self.forward_payload = forward_payload
+
+        @classmethod
+        def _parse(cls, body: CellSlice) -> NFTMessage.OwnershipAssigned:
+            """
+            ownership_assigned query_id:uint64 prev_owner:MsgAddress forward_payload:(Either Cell ^Cell)
+            """
+            return cls._parse_fields(body)
+
+    class Excess(BaseMessage["Excess"], register=False):
+        OPCODE = "0xd53276db"
+        FIELDS = (("query_id", _load_query_id),)
+
+        def __init__(self, query_id: int):
+            self.query_id = query_id
+
+        @classmethod
+        def _parse(cls, body: CellSlice) -> NFTMessage.Excess:
+            """
+            excesses query_id:uint64
+            """
+            return cls._parse_fields(body)
+
+    class GetStaticData(BaseMessage["GetStaticData"]):
+        OPCODE = "0x2fcb26a2"
+        FIELDS = (("query_id", _load_query_id),)
+
+        def __init__(self, query_id: int):
+            self.query_id = query_id
+
+        @classmethod
+        def _parse(cls, body: CellSlice) -> NFTMessage.GetStaticData:
+            """
+            get_static_data query_id:uint64
+            """
+            return cls._parse_fields(body)
+
+    class ReportStaticData(BaseMessage["ReportStaticData"]):
+        OPCODE = "0x8b771735"
+        FIELDS = (
+            ("query_id", _load_query_id),
+            ("index", _load_uint256),
+            ("collection", _load_address),
+        )
+
+        def __init__(self, query_id: int, index: int, collection: Optional[Address]):
+            self.query_id = query_id
+            self.index = index
+            self.collection = collection
+
+        @classmethod
+        def _parse(cls, body: CellSlice) -> NFTMessage.ReportStaticData:
+            """
+            report_static_data query_id:uint64 index:uint256 collection:MsgAddress
+            """
+            return cls._parse_fields(body)
+
+
+class SBTMessage:
+    """
+    The messages of soulbound NFT items of TEP-85
+    """
+
+    class ProveOwnership(BaseMessage["ProveOwnership"]):
+        OPCODE = "0x04ded148"
+        FIELDS = (
+            ("query_id", _load_query_id),
+            ("dest", _load_address),
+            ("forward_payload", _load_ref),
+            ("with_content", _load_bool),
+        )
+
+        def __init__(self, query_id: int, dest: Address, forward_payload: CellSlice, with_content: bool):
+            self.query_id = query_id
+            self.dest = dest
+            self.forward_payload = forward_payload
+            self.with_content = with_content
+
+        @classmethod
+        def _parse(cls, body: CellSlice) -> SBTMessage.ProveOwnership:
+            """
+            prove_ownership query_id:uint64 dest:MsgAddress forward_payload:^Cell with_content:Bool
+            """
+            return cls._parse_fields(body)
+
+    class OwnershipProof(BaseMessage["OwnershipProof"]):
+        OPCODE = "0x0524c7ae"
+        FIELDS = (
+            ("query_id", _load_query_id),
+            ("item_id", _load_uint256),
+            ("owner", _load_address),
+            ("data", _load_ref),
+            ("revoked_at", _load_uint64),
+            ("content", _load_maybe_ref),
+        )
+
+        def __init__(self, query_id: int, item_id: int, owner: Address, data: CellSlice, revoked_at: int, content: Optional[CellSlice]):
+            self.query_id = query_id
+            self.item_id = item_id
+            self.owner = owner
+            self.data = data
+            self.revoked_at = revoked_at
+            self.content = content
+
+        @classmethod
+        def _parse(cls, body: CellSlice) -> SBTMessage.OwnershipProof:
+            """
+            ownership_proof query_id:uint64 item_id:uint256 owner:MsgAddress data:^Cell
+                revoked_at:uint64 content:(Maybe ^Cell)
+            """
+            return cls._parse_fields(body)
+
+    class RequestOwner(BaseMessage["RequestOwner"]):
+        OPCODE = "0xd0c3bfea"
+        FIELDS = (
+            ("query_id", _load_query_id),
+            ("dest", _load_address),
+            ("forward_payload", _load_ref),
+            ("with_content", _load_bool),
+        )
+
+        def __init__(self, query_id: int, dest: Address, forward_payload: CellSlice, with_content: bool):
+            self.query_id = query_id
+            self.dest = dest
+            self.forward_payload = forward_payload
+            self.with_content = with_content
+
+        @classmethod
+        def _parse(cls, body: CellSlice) -> SBTMessage.RequestOwner:
+            """
+            request_owner query_id:uint64 dest:MsgAddress forward_payload:^Cell with_content:Bool
+            """
+            return cls._parse_fields(body)
+
+    class OwnerInfo(BaseMessage["OwnerInfo"]):
+        OPCODE = "0x0dd607e3"
+        FIELDS = (
+            ("query_id", _load_query_id),
+            ("item_id", _load_uint256),
+            ("initiator", _load_address),
+            ("owner", _load_address),
+            ("data", _load_ref),
+            ("revoked_at", _load_uint64),
+            ("content", _load_maybe_ref),
+        )
+
+        def __init__(self, query_id: int, item_id: int, initiator: Address, owner: Address, data: CellSlice, revoked_at: int, content: Optional[CellSlice]):
+            self.query_id = query_id
+            self.item_id = item_id
+            self.initiator = initiator
+            self.owner = owner
+            self.data = data
+            self.revoked_at = revoked_at
+            self.content = content
+
+        @classmethod
+        def _parse(cls, body: CellSlice) -> SBTMessage.OwnerInfo:
+            """
+            owner_info query_id:uint64 item_id:uint256 initiator:MsgAddress owner:MsgAddress
+                data:^Cell revoked_at:uint64 content:(Maybe ^Cell)
+            """
+            return cls._parse_fields(body)
+
+    class Destroy(BaseMessage["Destroy"]):
+        OPCODE = "0x1f04537a"
+        FIELDS = (("query_id", _load_query_id),)
+
+        def __init__(self, query_id: int):
+            self.query_id = query_id
+
+        @classmethod
+        def _parse(cls, body: CellSlice) -> SBTMessage.Destroy:
+            """
+            destroy query_id:uint64
+            """
+            return cls._parse_fields(body)
+
+    class Revoke(BaseMessage["Revoke"]):
+        OPCODE = "0x6f89f5e3"
+        FIELDS = (("query_id", _load_query_id),)
+
+        def __init__(self, query_id: int):
+            self.query_id = query_id
+
+        @classmethod
+        def _parse(cls, body: CellSlice) -> SBTMessage.Revoke:
+            """
+            revoke query_id:uint64
+            """
+            return cls._parse_fields(body)
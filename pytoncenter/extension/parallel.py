@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import asyncio
+import os
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterable,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    TypedDict,
+    TypeVar,
+    Union,
+)
+
+from tonpy import Cell, CellSlice
+
+from pytoncenter.address import Address
+from pytoncenter.extension.message import BaseMessage, RawMessage, message_registry
+
+__all__ = [
+    "ParsedBody",
+    "compact_message",
+    "ParallelMessageDecoder",
+]
+
+I = TypeVar("I")
+
+ParsedBody = TypedDict(
+    "ParsedBody",
+    {
+        "type": str,
+        "opcode": Optional[int],
+        "fields": Dict[str, Any],
+        "error": Optional[str],
+    },
+)
+"""
+A parsed message body which can be pickled. `type` is the qualified name of the parser, e.g. "JettonMessage.Transfer" or "RawMessage",
+addresses are in the raw form and slices or cells are base64 bocs.
+"""
+
+
+def _compact(value: Any) -> Any:
+    if isinstance(value, Address):
+        return value.to_string(False)
+    if isinstance(value, (CellSlice, Cell)):
+        return value.to_boc()
+    return value
+
+
+def compact_message(msg: BaseMessage) -> ParsedBody:
+    """
+    compact_message converts a parsed message to a `ParsedBody`, without any tonpy object
+    """
+    if isinstance(msg, RawMessage):
+        return {"type": "RawMessage", "opcode": msg.opcode, "fields": {"body": _compact(msg.body)}, "error": msg.error}
+    fields = {name: _compact(value) for name, value in msg.fields().items()}
+    return {"type": msg.__class__.__qualname__, "opcode": msg.OPCODE_INT, "fields": fields, "error": None}
+
+
+def _decode_chunk(bodies: List[Optional[str]]) -> List[Optional[ParsedBody]]:
+    """
+    _decode_chunk runs in the worker processes with the registry of the worker, parsers registered after the pool started
+    are only known to workers created by fork
+    """
+    parse = message_registry.parse
+    return [compact_message(parse(body)) if body else None for body in bodies]
+
+
+async def _aiter(source: Union[AsyncIterable[I], Iterable[I]]) -> AsyncGenerator[I, None]:
+    if isinstance(source, AsyncIterable):
+        async for item in source:
+            yield item
+    else:
+        for item in source:
+            yield item
+
+
+class ParallelMessageDecoder:
+    """
+    ParallelMessageDecoder parses base64 message bodies in a process pool, so decoding a backfill scales with the cores
+    instead of holding the GIL of the event loop. Bodies are sent in chunks of `chunksize` and come back as picklable `ParsedBody`,
+    in the order of the source.
+
+    At most `max_pending` chunks are in the pool, by default twice `max_workers` or the number of CPUs. When they are all busy, the stream stops pulling from the source,
+    so a fetch stage written as an async generator is paused until the decoding catches up.
+    A partially filled chunk is sent when the source ends, the decoder is meant for backfills rather than live streams.
+
+    Example
+    -------
+    ```python
+    decoder = ParallelMessageDecoder(max_workers=4)
+    async for tx, parsed in decoder.stream(fetch_transactions(), body=lambda tx: tx.in_msg.message_content.body if tx.in_msg.message_content else None):
+        if parsed is not None and parsed["type"] == "JettonMessage.Transfer":
+            print(tx.hash, parsed["fields"]["amount"])
+    decoder.close()
+    ```
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, executor: Optional[Executor] = None, chunksize: int = 512, max_pending: Optional[int] = None) -> None:
+        assert chunksize > 0, "chunksize must be greater than 0"
+        self.max_workers = max_workers
+        self.chunksize = chunksize
+        self._executor = executor
+        self._own_executor = False
+        self.max_pending = max_pending or 2 * (max_workers or os.cpu_count() or 1)
+        assert self.max_pending > 0, "max_pending must be greater than 0"
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            self._own_executor = True
+        return self._executor
+
+    async def stream(self, source: Union[AsyncIterable[I], Iterable[I]], body: Optional[Callable[[I], Optional[str]]] = None) -> AsyncGenerator[Tuple[I, Optional[ParsedBody]], None]:
+        """
+        stream yields (item, parsed body) for every item of the source in order, `body` extracts the base64 body of an item,
+        by default the items are the bodies. Items without a body are yielded with None.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        pending: Deque[Tuple[List[I], asyncio.Future]] = deque()
+        chunk: List[I] = []
+
+        def _submit(items: List[I]) -> None:
+            bodies = [body(item) for item in items] if body is not None else items
+            pending.append((items, loop.run_in_executor(executor, _decode_chunk, bodies)))
+
+        try:
+            async for item in _aiter(source):
+                chunk.append(item)
+                if len(chunk) < self.chunksize:
+                    continue
+                _submit(chunk)
+                chunk = []
+                # the source is not pulled while the pool is full, and finished chunks are yielded as soon as possible
+                while pending and (len(pending) >= self.max_pending or pending[0][1].done()):
+                    items, future = pending.popleft()
+                    for pair in zip(items, await future):
+                        yield pair
+            if chunk:
+                _submit(chunk)
+            while pending:
+                items, future = pending.popleft()
+                for pair in zip(items, await future):
+                    yield pair
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+    async def decode(self, bodies: Iterable[Optional[str]]) -> List[Optional[ParsedBody]]:
+        """
+        decode parses a batch of base64 bodies in the pool
+        """
+        return [parsed async for _, parsed in self.stream(bodies)]
+
+    def close(self) -> None:
+        """
+        close shuts down the process pool created by the decoder
+        """
+        if self._own_executor and self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+            self._own_executor = False
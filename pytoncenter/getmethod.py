@@ -0,0 +1,572 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncGenerator,
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypedDict,
+    TypeVar,
+    Union,
+)
+
+import aiohttp
+from pydantic import BaseModel
+from tonpy import Cell, CellSlice, begin_cell
+from tonpy.tvm.tvm import C7, TVM, method_name_to_id
+
+from pytoncenter.address import Address, parse_address
+from pytoncenter.exception import TonCenterException, TonException
+from pytoncenter.v3.models import (
+    GetAccountRequest,
+    RunGetMethodRequest,
+    RunGetMethodResponse,
+)
+
+if TYPE_CHECKING:
+    from pytoncenter.decoder import BaseDecoder, Decoder
+    from pytoncenter.v3.api import AsyncTonCenterClientV3
+
+__all__ = [
+    "GetMethodCache",
+    "BulkGetMethodResult",
+    "BulkProgress",
+    "LocalGetMethodRunner",
+]
+
+T = TypeVar("T")
+
+GetMethodCacheKey = Tuple[bytes, str, str]
+
+
+def _serialize_stack(stack: Any) -> str:
+    items = [item.model_dump() if isinstance(item, BaseModel) else item for item in stack or []]
+    return json.dumps(items, sort_keys=True, default=str)
+
+
+class _AccountState:
+    __slots__ = ("address", "lt", "validated_at", "keys")
+
+    def __init__(self, address: Address) -> None:
+        self.address = address
+        self.lt: Optional[int] = None
+        self.validated_at = float("-inf")
+        self.keys: Set[GetMethodCacheKey] = set()
+
+
+class GetMethodCache(Generic[T]):
+    """
+    GetMethodCache caches get method results by (address, method, stack). A result only depends on the code and data of the account,
+    so every cached result is tagged with the `last_transaction_lt` of the account and stays valid until the account has a new transaction.
+
+    An account is fresh for `ttl` seconds after its lt was checked, and its results are served without any request during that time.
+    Once it is stale, one lt lookup revalidates every cached result of the account, whatever the method or stack,
+    and `refresh_get_method_cache` of the clients revalidates every stale account at once.
+    Get methods that read the current time or the balance, which are not part of the account data, should not be cached.
+
+    Example
+    -------
+    ```python
+    cache = GetMethodCache(ttl=5)
+    client = get_client(version="v3", network="mainnet", get_method_cache=cache)
+    result = await client.run_get_method(RunGetMethodRequest(address=pool, method="get_pool_data", stack=[]))
+    # once per block, drop the results of every pool that had a transaction
+    await client.refresh_get_method_cache()
+    ```
+    """
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 5.0) -> None:
+        assert maxsize > 0, "maxsize must be greater than 0"
+        assert ttl >= 0, "ttl must not be negative"
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[GetMethodCacheKey, T] = OrderedDict()
+        self._accounts: Dict[bytes, _AccountState] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(address: Union[str, Address], method: str, stack: Any = None) -> GetMethodCacheKey:
+        return parse_address(address).key, method, _serialize_stack(stack)
+
+    def is_fresh(self, address: Union[str, Address]) -> bool:
+        """
+        is_fresh returns whether the lt of the account was checked less than `ttl` seconds ago
+        """
+        account = self._accounts.get(parse_address(address).key)
+        return account is not None and account.lt is not None and time.monotonic() - account.validated_at < self.ttl
+
+    def lt(self, address: Union[str, Address]) -> Optional[int]:
+        """
+        lt returns the last known `last_transaction_lt` of the account
+        """
+        account = self._accounts.get(parse_address(address).key)
+        return account.lt if account is not None else None
+
+    def get(self, address: Union[str, Address], method: str, stack: Any = None) -> Optional[T]:
+        """
+        get returns the cached result if the account is fresh, otherwise None. Revalidate stale accounts with `validate` first.
+        """
+        if not self.is_fresh(address):
+            self.misses += 1
+            return None
+        key = self.key(address, method, stack)
+        result = self._entries.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return result
+
+    def put(self, address: Union[str, Address], method: str, stack: Any, result: T, lt: Optional[int] = None) -> None:
+        """
+        put caches the result of a get method which was run on the state with the lt, by default the last validated lt of the account.
+        The lt must have been read before the get method was run, so that a newer state is never hidden behind an older lt.
+        """
+        key = self.key(address, method, stack)
+        account = self._account(address)
+        if lt is not None and lt != account.lt:
+            if account.lt is not None and lt < account.lt:
+                # the account had a new transaction while the get method was running, the result may be stale
+                return
+            self._drop(account)
+            account.lt = lt
+            account.validated_at = time.monotonic()
+        if account.lt is None:
+            return
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        account.keys.add(key)
+        while len(self._entries) > self.maxsize:
+            oldest, _ = self._entries.popitem(last=False)
+            owner = self._accounts.get(oldest[0])
+            if owner is not None:
+                owner.keys.discard(oldest)
+                if not owner.keys:
+                    del self._accounts[oldest[0]]
+
+    def validate(self, address: Union[str, Address], lt: int) -> int:
+        """
+        validate records the current lt of the account, dropping its cached results if the account had a new transaction,
+        and marks the account fresh. It returns the number of dropped results.
+        """
+        account = self._account(address)
+        dropped = 0
+        if account.lt != lt:
+            dropped = self._drop(account)
+            account.lt = lt
+        account.validated_at = time.monotonic()
+        return dropped
+
+    def invalidate(self, address: Union[str, Address]) -> int:
+        """
+        invalidate drops every cached result of the account, e.g. when a transaction of the account was seen in a block
+        """
+        account = self._accounts.get(parse_address(address).key)
+        if account is None:
+            return 0
+        account.lt = None
+        account.validated_at = float("-inf")
+        return self._drop(account)
+
+    def stale_addresses(self) -> List[Address]:
+        """
+        stale_addresses returns the accounts which have cached results but were not validated in the last `ttl` seconds
+        """
+        deadline = time.monotonic() - self.ttl
+        return [account.address for account in self._accounts.values() if account.keys and account.validated_at <= deadline]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._accounts.clear()
+
+    def _account(self, address: Union[str, Address]) -> _AccountState:
+        address = parse_address(address)
+        account = self._accounts.get(address.key)
+        if account is None:
+            account = self._accounts[address.key] = _AccountState(address)
+        return account
+
+    def _drop(self, account: _AccountState) -> int:
+        dropped = 0
+        for key in account.keys:
+            if self._entries.pop(key, None) is not None:
+                dropped += 1
+        account.keys.clear()
+        self.invalidations += dropped
+        return dropped
+
+
+def _is_transient_error(e: Exception) -> bool:
+    """
+    Rate limits, server side errors, timeouts and broken connections are worth retrying
+    """
+    if isinstance(e, (TonException, TonCenterException)):
+        return e.code == 429 or e.code >= 500
+    if isinstance(e, aiohttp.ClientResponseError):
+        return e.status == 429 or e.status >= 500
+    return isinstance(e, (aiohttp.ClientConnectionError, asyncio.TimeoutError))
+
+
+GetMethodCall = Tuple[Union[str, Address], str, Any]
+"""
+(address, method, stack) of a get method to run in bulk
+"""
+
+BulkGetMethodResult = TypedDict(
+    "BulkGetMethodResult",
+    {
+        "index": int,
+        "address": Union[str, Address],
+        "method": str,
+        "result": Any,
+        "error": Optional[Exception],
+        "attempts": int,
+    },
+)
+
+
+class BulkProgress:
+    """
+    BulkProgress counts the get methods of a bulk run, it is updated in place while the results are streamed
+
+    Example
+    -------
+    ```python
+    progress = BulkProgress()
+    async for item in client.iter_get_methods(calls, decoder=decoder, progress=progress):
+        ...
+        if progress.completed % 1000 == 0:
+            print(progress)
+    ```
+    """
+
+    __slots__ = ("submitted", "completed", "failed", "retries", "started_at", "finished_at")
+
+    def __init__(self) -> None:
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.retries = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def in_flight(self) -> int:
+        return self.submitted - self.completed
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at if self.finished_at is not None else time.monotonic()) - self.started_at
+
+    @property
+    def rate(self) -> float:
+        """
+        rate returns the completed get methods per second
+        """
+        elapsed = self.elapsed
+        return self.completed / elapsed if elapsed > 0 else 0.0
+
+    def __repr__(self) -> str:
+        return f"BulkProgress(completed={self.completed}, failed={self.failed}, retries={self.retries}, in_flight={self.in_flight}, rate={self.rate:.1f}/s)"
+
+
+async def iter_bulk_get_methods(
+    run: Callable[[Union[str, Address], str, Any], Awaitable[Any]],
+    calls: Iterable[GetMethodCall],
+    decoder: Optional[Union[Decoder, BaseDecoder]] = None,
+    exit_code: Optional[Callable[[Any], int]] = None,
+    max_concurrency: int = 16,
+    max_retries: int = 3,
+    backoff: float = 0.5,
+    progress: Optional[BulkProgress] = None,
+) -> AsyncGenerator[BulkGetMethodResult, None]:
+    """
+    iter_bulk_get_methods runs the calls with `run`, at most `max_concurrency` at a time, and yields the results as they finish.
+    The calls are pulled from the iterable only when a slot is free and nothing is kept once a result is yielded,
+    so a generator of 100k calls runs in constant memory. It is the engine of `iter_get_methods` of both clients.
+
+    Transient errors are retried up to `max_retries` times with exponential backoff. Other errors, an exit code other than 0 and 1
+    reported by `exit_code` (as a `TonException`), or a failed decoding do not stop the run, they are yielded in the `error` of the result.
+    """
+    assert max_concurrency > 0, "max_concurrency must be greater than 0"
+    progress = progress if progress is not None else BulkProgress()
+    progress.started_at = time.monotonic()
+    progress.finished_at = None
+
+    async def _run(index: int, address: Union[str, Address], method: str, stack: Any) -> BulkGetMethodResult:
+        attempt = 0
+        while True:
+            try:
+                result = await run(address, method, stack)
+                break
+            except Exception as e:
+                if not _is_transient_error(e) or attempt >= max_retries:
+                    return {"index": index, "address": address, "method": method, "result": None, "error": e, "attempts": attempt + 1}
+                progress.retries += 1
+                await asyncio.sleep(backoff * 2**attempt)
+                attempt += 1
+        error: Optional[Exception] = None
+        code = exit_code(result) if exit_code is not None else 0
+        if code not in (0, 1):
+            error = TonException(code)
+        elif decoder is not None:
+            try:
+                result = decoder.decode(result)
+            except Exception as e:
+                error = e
+        return {"index": index, "address": address, "method": method, "result": result, "error": error, "attempts": attempt + 1}
+
+    pending = enumerate(calls)
+    exhausted = False
+    running: Set[asyncio.Future] = set()
+    try:
+        while True:
+            while not exhausted and len(running) < max_concurrency:
+                item = next(pending, None)
+                if item is None:
+                    exhausted = True
+                    break
+                index, (address, method, stack) = item
+                running.add(asyncio.ensure_future(_run(index, address, method, stack)))
+                progress.submitted += 1
+            if not running:
+                break
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                running.discard(task)
+                result = task.result()
+                progress.completed += 1
+                if result["error"] is not None:
+                    progress.failed += 1
+                yield result
+    finally:
+        for task in running:
+            task.cancel()
+        progress.finished_at = time.monotonic()
+
+
+_cells: OrderedDict[str, Cell] = OrderedDict()
+
+
+def _cell(boc: str) -> Cell:
+    """
+    _cell parses a boc once per process, code and data of the same account are run many times
+    """
+    cell = _cells.get(boc)
+    if cell is None:
+        cell = _cells[boc] = Cell(boc)
+        if len(_cells) > 256:
+            _cells.popitem(last=False)
+    else:
+        _cells.move_to_end(boc)
+    return cell
+
+
+def _to_tvm(entry: Dict[str, Any]) -> Any:
+    typ, value = entry["type"], entry["value"]
+    if typ == "num":
+        if isinstance(value, str):
+            return int(value, 16) if value.lstrip("-").startswith("0x") else int(value)
+        return int(value)
+    if typ == "cell":
+        return Cell(value)
+    if typ == "slice":
+        if not isinstance(value, Address):
+            try:
+                return CellSlice(value)
+            except Exception:
+                value = Address(value)
+        return begin_cell().store_address(value.to_string(True)).end_cell().begin_parse()
+    if typ in ("tuple", "list"):
+        return [_to_tvm(item) for item in value]
+    raise ValueError(f"Unsupported stack entry type {typ}")
+
+
+def _from_tvm(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"type": "num", "value": hex(-int(value))}
+    if isinstance(value, int):
+        return {"type": "num", "value": hex(value)}
+    if isinstance(value, Cell):
+        return {"type": "cell", "value": value.to_boc()}
+    if isinstance(value, CellSlice):
+        return {"type": "slice", "value": value.to_boc()}
+    if isinstance(value, list):
+        return {"type": "tuple", "value": [_from_tvm(item) for item in value]}
+    return {"type": "unsupported_type", "value": None}
+
+
+_LocalCall = Tuple[str, str, str, int, str, List[Dict[str, Any]], int]
+"""
+A picklable get method call, (code boc, data boc, raw address, balance, method, stack, unixtime)
+"""
+
+
+def _execute(call: _LocalCall) -> Dict[str, Any]:
+    code, data, address, balance, method, stack, now = call
+    tvm = TVM(code=_cell(code), data=_cell(data), enable_stack_dump=False)
+    method_id = int(method) if method.isdigit() else method_name_to_id(method)
+    tvm.set_stack([_to_tvm(entry) for entry in stack] + [method_id])
+    myself = begin_cell().store_address(Address(address).to_string(True)).end_cell().begin_parse()
+    c7 = C7(time=now, rand_seed=0).to_data()
+    # tonpy builds myself as a cell and the extra currencies as an empty cell, get methods expect a slice and null
+    c7[7], c7[8] = [balance, None], myself
+    tvm.set_c7(c7)
+    result = tvm.run(unpack_stack=True)
+    # tvm reports the bitwise complement of the exit code, 0 and 1 are success
+    return {"gas_used": tvm.gas_used, "exit_code": ~tvm.exit_code, "stack": [_from_tvm(value) for value in result]}
+
+
+def _execute_batch(calls: List[_LocalCall]) -> List[Dict[str, Any]]:
+    return [_execute(call) for call in calls]
+
+
+class _LocalState:
+    __slots__ = ("address", "code", "data", "balance", "lt")
+
+    def __init__(self, address: str, code: str, data: str, balance: int, lt: int) -> None:
+        self.address = address
+        self.code = code
+        self.data = data
+        self.balance = balance
+        self.lt = lt
+
+
+class LocalGetMethodRunner:
+    """
+    LocalGetMethodRunner runs get methods locally in the TVM of tonpy on the code and data of the account, fetched once with `get_account`
+    and kept until the account has a new transaction. The results are `RunGetMethodResponse`, so the existing decoders keep working.
+    Batches are spread over a process pool, polling thousands of pools costs one `get_account` per changed pool instead of one request per get method.
+    The batches are split by `max_workers`, which defaults to the number of CPUs, also when an `executor` is given.
+
+    The c7 of the run holds the current time, the balance and the address of the account but no blockchain config,
+    get methods which read the config, or accounts whose code is a library cell, are not supported.
+
+    Example
+    -------
+    ```python
+    runner = LocalGetMethodRunner(client, max_workers=4)
+    results = await runner.run_many([RunGetMethodRequest(address=pool, method="get_pool_data", stack=[]) for pool in pools])
+    # once per block, refetch the accounts which had a new transaction
+    await runner.refresh()
+    runner.close()
+    ```
+    """
+
+    def __init__(self, client: AsyncTonCenterClientV3, max_workers: Optional[int] = None, executor: Optional[Executor] = None, maxsize: int = 4096) -> None:
+        assert maxsize > 0, "maxsize must be greater than 0"
+        self.client = client
+        self.maxsize = maxsize
+        self.max_workers = max_workers
+        self._executor = executor
+        self._own_executor = False
+        self._states: OrderedDict[bytes, _LocalState] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    async def load(self, address: Union[str, Address]) -> _LocalState:
+        """
+        load fetches the code and data of the account, the parsed state is reused if the lt did not change
+        """
+        address = parse_address(address)
+        account = await self.client.get_account(GetAccountRequest(address=address))
+        if account.code is None or account.data is None:
+            raise ValueError(f"Account {address} has no code or data, status {account.status}")
+        lt = account.last_transaction_lt or 0
+        state = self._states.get(address.key)
+        if state is None or state.lt != lt:
+            state = _LocalState(address.to_string(False), account.code, account.data, account.balance, lt)
+        self._states[address.key] = state
+        self._states.move_to_end(address.key)
+        while len(self._states) > self.maxsize:
+            self._states.popitem(last=False)
+        return state
+
+    async def refresh(self, addresses: Optional[Sequence[Union[str, Address]]] = None) -> int:
+        """
+        refresh refetches the accounts, all loaded accounts by default, and returns the number of accounts which changed
+        """
+        targets = [parse_address(address) for address in addresses] if addresses is not None else [Address(state.address) for state in self._states.values()]
+        before = {address.key: self._states[address.key].lt if address.key in self._states else None for address in targets}
+        await asyncio.gather(*[self.load(address) for address in targets])
+        return sum(1 for address in targets if self._states[address.key].lt != before[address.key])
+
+    def invalidate(self, address: Union[str, Address]) -> None:
+        self._states.pop(parse_address(address).key, None)
+
+    async def _state(self, address: Union[str, Address]) -> _LocalState:
+        state = self._states.get(parse_address(address).key)
+        if state is None:
+            state = await self.load(address)
+        return state
+
+    @staticmethod
+    def _call(state: _LocalState, req: RunGetMethodRequest, now: int) -> _LocalCall:
+        stack = [{"type": entry.type, "value": entry.value} if isinstance(entry, BaseModel) else entry for entry in req.stack]
+        return state.code, state.data, state.address, state.balance, req.method, stack, now
+
+    async def run_get_method(self, req: RunGetMethodRequest, now: Optional[int] = None) -> RunGetMethodResponse:
+        """
+        run_get_method runs one get method in the current process
+        """
+        state = await self._state(req.address)
+        result = _execute(self._call(state, req, int(time.time()) if now is None else now))
+        return RunGetMethodResponse(**result)
+
+    async def run_many(self, reqs: Sequence[RunGetMethodRequest], now: Optional[int] = None, chunksize: Optional[int] = None) -> List[RunGetMethodResponse]:
+        """
+        run_many runs a batch of get methods over the process pool and returns the results in the order of the requests.
+        The accounts which are not loaded yet are fetched concurrently first.
+        """
+        unique = {parse_address(req.address).key: req.address for req in reqs}
+        states = dict(zip(unique, await asyncio.gather(*[self._state(address) for address in unique.values()])))
+        now = int(time.time()) if now is None else now
+        calls = [self._call(states[parse_address(req.address).key], req, now) for req in reqs]
+        if not calls:
+            return []
+
+        executor = self._get_executor()
+        workers = self.max_workers or os.cpu_count() or 1
+        chunksize = chunksize or max(1, len(calls) // (workers * 4))
+        loop = asyncio.get_running_loop()
+        chunks = await asyncio.gather(*[loop.run_in_executor(executor, _execute_batch, calls[i : i + chunksize]) for i in range(0, len(calls), chunksize)])
+        return [RunGetMethodResponse(**result) for chunk in chunks for result in chunk]
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            self._own_executor = True
+        return self._executor
+
+    def close(self) -> None:
+        """
+        close shuts down the process pool created by the runner
+        """
+        if self._own_executor and self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+            self._own_executor = False
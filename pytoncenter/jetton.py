@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import random
+from collections import OrderedDict
+from hashlib import sha256
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Literal,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from tonpy import Cell, begin_cell
+
+from pytoncenter.address import Address, AddressBatch, _as_batch, parse_address
+from pytoncenter.decoder import Decoder, JettonDataDecoder, Types
+from pytoncenter.v3.models import GetMethodParameterInput, RunGetMethodRequest
+
+if TYPE_CHECKING:
+    from pytoncenter.v3.api import AsyncTonCenterClientV3
+
+__all__ = [
+    "JettonWalletLayout",
+    "JettonWalletDeriver",
+]
+
+JettonWalletLayout = Literal["standard", "stablecoin"]
+"""
+The data layout of a freshly deployed jetton wallet.
+
+standard : balance:Coins owner:MsgAddress master:MsgAddress wallet_code:^Cell, the reference jetton of TEP-74
+stablecoin : status:uint4 balance:Coins owner:MsgAddress master:MsgAddress, the wallets of USDT and other stablecoin-contract jettons
+"""
+
+CustomLayout = Callable[[Address, Address, Cell], Cell]
+
+# bits before the owner address and whether the wallet code is referenced from the data
+_LAYOUTS: Dict[str, Tuple[int, bool]] = {
+    "standard": (4, True),
+    "stablecoin": (8, False),
+}
+
+_ADDR_BITS = 267
+
+_wallet_address_decoder = Decoder(Types.Address("jetton_wallet_address"))
+
+
+def _addr_std(key: bytes) -> int:
+    """
+    _addr_std returns the 267 bits of addr_std$10 anycast:nothing workchain_id:int8 address:bits256 as an integer
+    """
+    return (0b100 << 264) | int.from_bytes(key, "big")
+
+
+def _cell_depth(cell: Cell) -> int:
+    """
+    _cell_depth returns the depth of the cell tree, walked iteratively with every shared subtree visited once
+    """
+    depths: Dict[str, int] = {}
+    stack: List[Tuple[Cell, bool]] = [(cell, False)]
+    while stack:
+        node, expanded = stack.pop()
+        key = node.get_hash()
+        if key in depths and not expanded:
+            continue
+        cs = node.begin_parse()
+        children = [cs.preload_ref(i) for i in range(cs.refs)]
+        if expanded:
+            depths[key] = 1 + max(depths[child.get_hash()] for child in children) if children else 0
+            continue
+        stack.append((node, True))
+        stack.extend((child, False) for child in children if child.get_hash() not in depths)
+    return depths[cell.get_hash()]
+
+
+def _to_cell(code: Union[str, Cell]) -> Cell:
+    if isinstance(code, Cell):
+        return code
+    try:
+        raw = bytes.fromhex(code)
+    except ValueError:
+        return Cell(code)
+    # the hex form is what JettonDataDecoder returns for jetton_wallet_code
+    return Cell(base64.b64encode(raw).decode())
+
+
+class _WalletCode:
+    __slots__ = ("cell", "hash", "depth", "layout")
+
+    def __init__(self, cell: Cell, layout: Union[JettonWalletLayout, CustomLayout]) -> None:
+        self.cell = cell
+        self.hash = bytes.fromhex(cell.get_hash())
+        self.depth = _cell_depth(cell)
+        self.layout = layout
+
+
+class JettonWalletDeriver:
+    """
+    JettonWalletDeriver computes jetton wallet addresses offline. A wallet address is the hash of its StateInit, which only depends on the
+    `jetton_wallet_code` of the master and the initial data built from the owner and the master. The code cell, its hash and depth are cached
+    per master, and for the built-in layouts the data and StateInit cells are hashed directly with hashlib, without building any cell.
+
+    Parameters
+    ----------
+    layout : JettonWalletLayout or Callable[[Address, Address, Cell], Cell], default "standard"
+        The initial data of the wallets, or a function building it from the owner, the master and the wallet code for other implementations.
+    workchain : int, default 0
+        The workchain the wallets are deployed in.
+    maxsize : int, default 1024
+        The number of masters whose wallet code is kept.
+
+    Example
+    -------
+    ```python
+    deriver = JettonWalletDeriver()
+    await deriver.load(client, master)
+    wallets = deriver.derive_many(master, owners).to_strings("bounceable_url")
+    # compare a sample with get_wallet_address of the master
+    assert not await deriver.verify(client, master, owners, sample=8)
+    ```
+    """
+
+    def __init__(self, layout: Union[JettonWalletLayout, CustomLayout] = "standard", workchain: int = 0, maxsize: int = 1024) -> None:
+        assert callable(layout) or layout in _LAYOUTS, f"Unknown layout {layout}"
+        assert workchain in (0, -1), "workchain must be 0 or -1"
+        assert maxsize > 0, "maxsize must be greater than 0"
+        self.layout = layout
+        self.workchain = workchain
+        self.maxsize = maxsize
+        self._codes: OrderedDict[bytes, _WalletCode] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def __contains__(self, master: Union[str, Address]) -> bool:
+        return parse_address(master).key in self._codes
+
+    def register(self, master: Union[str, Address], jetton_wallet_code: Union[str, Cell], layout: Optional[Union[JettonWalletLayout, CustomLayout]] = None) -> None:
+        """
+        register caches the wallet code of the master, as a Cell, a base64 boc or the hex boc returned by `JettonDataDecoder`.
+        The layout overrides the default layout of the deriver for this master.
+        """
+        layout = layout or self.layout
+        assert callable(layout) or layout in _LAYOUTS, f"Unknown layout {layout}"
+        key = parse_address(master).key
+        self._codes[key] = _WalletCode(_to_cell(jetton_wallet_code), layout)
+        self._codes.move_to_end(key)
+        while len(self._codes) > self.maxsize:
+            self._codes.popitem(last=False)
+
+    async def load(self, client: AsyncTonCenterClientV3, master: Union[str, Address], layout: Optional[Union[JettonWalletLayout, CustomLayout]] = None) -> None:
+        """
+        load fetches the wallet code with `get_jetton_data` of the master and registers it, unless it is registered already
+        """
+        if master in self:
+            return
+        result = await client.run_get_method(RunGetMethodRequest(address=master, method="get_jetton_data", stack=[]))
+        self.register(master, JettonDataDecoder().decode(result)["jetton_wallet_code"], layout)
+
+    def _code(self, master: Address) -> _WalletCode:
+        code = self._codes.get(master.key)
+        if code is None:
+            raise KeyError(f"No wallet code registered for master {master}, call register or load first")
+        self._codes.move_to_end(master.key)
+        return code
+
+    def _hasher(self, code: _WalletCode, master: Address) -> Callable[[bytes], bytes]:
+        """
+        _hasher returns a function from the key of an owner to the hash part of its wallet, with every part of the data and StateInit cells
+        that does not depend on the owner computed once. A cell hash is sha256 of the descriptors, the data bits padded with 10*,
+        then the depths and the hashes of the references.
+        """
+        # split_depth:nothing special:nothing code:just data:just library:empty, 5 bits padded to one byte, and the depth of the code
+        state_init = bytes((2, 1, 0b00110100)) + code.depth.to_bytes(2, "big")
+        if callable(code.layout):
+
+            def custom(owner_key: bytes) -> bytes:
+                data = code.layout(Address._from_key(owner_key, 0), master, code.cell)
+                return sha256(state_init + _cell_depth(data).to_bytes(2, "big") + code.hash + bytes.fromhex(data.get_hash())).digest()
+
+            return custom
+
+        prefix, with_code = _LAYOUTS[code.layout]
+        bits = prefix + 2 * _ADDR_BITS
+        pad = -bits % 8
+        size = (bits + 7) // 8
+        shift = _ADDR_BITS + pad
+        master_part = (_addr_std(master.key) << pad) | (1 << (pad - 1) if pad else 0)
+        data_head = bytes((1 if with_code else 0, bits // 8 + size))
+        data_tail = code.depth.to_bytes(2, "big") + code.hash if with_code else b""
+        head = state_init + (code.depth + 1 if with_code else 0).to_bytes(2, "big") + code.hash
+
+        def standard(owner_key: bytes) -> bytes:
+            data = data_head + ((_addr_std(owner_key) << shift) | master_part).to_bytes(size, "big") + data_tail
+            return sha256(head + sha256(data).digest()).digest()
+
+        return standard
+
+    def derive(self, master: Union[str, Address], owner: Union[str, Address]) -> Address:
+        """
+        derive returns the jetton wallet address of the owner
+        """
+        master = parse_address(master)
+        hash_part = self._hasher(self._code(master), master)(parse_address(owner).key)
+        return Address._from_key(self.workchain.to_bytes(1, "big", signed=True) + hash_part, 0)
+
+    def derive_many(self, master: Union[str, Address], owners: Union[AddressBatch, Iterable[Union[str, Address]]]) -> AddressBatch:
+        """
+        derive_many returns the jetton wallet addresses of many owners, in the order of the owners, as an `AddressBatch`
+        """
+        master = parse_address(master)
+        hasher = self._hasher(self._code(master), master)
+        batch = _as_batch(owners)
+        view = memoryview(batch.hash_parts)
+        wc_bytes = {0: b"\x00", -1: b"\xff"}
+        hash_parts = b"".join(hasher(wc_bytes[wc] + view[32 * i : 32 * i + 32]) for i, wc in enumerate(batch.workchains))
+        return AddressBatch.from_hash_parts(hash_parts, self.workchain)
+
+    async def verify(self, client: AsyncTonCenterClientV3, master: Union[str, Address], owners: Iterable[Union[str, Address]], sample: int = 8) -> List[Tuple[Address, Address, Address]]:
+        """
+        verify compares the derived addresses of a random sample of owners with `get_wallet_address` of the master,
+        and returns the (owner, derived, expected) triples which differ, so an empty list means the layout matches the jetton.
+        """
+        owners = [parse_address(owner) for owner in owners]
+        picked = random.sample(owners, min(sample, len(owners)))
+
+        async def expected(owner: Address) -> Address:
+            owner_slice = begin_cell().store_address(owner.to_string(True)).end_cell().to_boc()
+            req = RunGetMethodRequest(address=master, method="get_wallet_address", stack=[GetMethodParameterInput(type="slice", value=owner_slice)])
+            return _wallet_address_decoder.decode(await client.run_get_method(req))["jetton_wallet_address"]
+
+        results = await asyncio.gather(*[expected(owner) for owner in picked])
+        derived = [self.derive(master, owner) for owner in picked]
+        return [(owner, wallet, result) for owner, wallet, result in zip(picked, derived, results) if wallet != result]
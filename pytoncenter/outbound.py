@@ -0,0 +1,354 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncGenerator,
+    AsyncIterable,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Literal,
+    Optional,
+    Tuple,
+    TypedDict,
+    Union,
+)
+
+from tonpy import Cell
+
+from pytoncenter.exception import TonCenterException
+from pytoncenter.getmethod import _is_transient_error
+from pytoncenter.v3.models import (
+    ExternalMessage,
+    GetTransactionByMessageRequest,
+    Transaction,
+)
+
+if TYPE_CHECKING:
+    from pytoncenter.v2.api import AsyncTonCenterClientV2
+    from pytoncenter.v3.api import AsyncTonCenterClientV3
+
+__all__ = [
+    "OutboundStatus",
+    "OutboundResult",
+    "message_hash",
+    "OutboundPipeline",
+]
+
+OutboundStatus = Literal["confirmed", "failed", "expired"]
+"""
+confirmed : the message was processed by a transaction which was not aborted
+failed : the transaction of the message was aborted, or the API answered the send or the lookup with a non transient error
+expired : the message was not processed before its `valid_until`, `error` is set when the last lookup failed with a transient error
+"""
+
+OutboundResult = TypedDict(
+    "OutboundResult",
+    {
+        "hash": str,
+        "status": OutboundStatus,
+        "transaction": Optional[Transaction],
+        "error": Optional[Exception],
+        "attempts": int,
+        "sent_at": Optional[float],
+        "finished_at": float,
+        "valid_until": int,
+    },
+)
+
+OutboundItem = Union[str, Tuple[str, int]]
+"""
+A base64 boc of an external message, or (boc, valid_until)
+"""
+
+
+def message_hash(boc: str) -> str:
+    """
+    message_hash returns the hash of an external message in hex, the hash used by `transactionsByMessage`
+    """
+    return Cell(boc).get_hash()
+
+
+class _Outbound:
+    __slots__ = ("hash", "boc", "valid_until", "attempts", "sent_at", "resent_at")
+
+    def __init__(self, hash: str, boc: str, valid_until: int) -> None:
+        self.hash = hash
+        self.boc = boc
+        self.valid_until = valid_until
+        self.attempts = 0
+        self.sent_at: Optional[float] = None
+        self.resent_at: Optional[float] = None
+
+
+class OutboundPipeline:
+    """
+    OutboundPipeline sends external messages as fast as the rate limiter of the client allows and tracks their confirmation in batch.
+    The hash of every message is computed locally when it is queued, so a message queued twice is only sent once, and a send which failed
+    with a transient error is only retried after `transactionsByMessage` confirmed that the message did not land.
+    Every `poll_interval` seconds the messages waiting for confirmation are looked up concurrently, and a result is emitted when
+    the transaction of a message is found, or when the message is past its `valid_until`.
+
+    Parameters
+    ----------
+    client : AsyncTonCenterClientV3 or AsyncTonCenterClientV2
+        The client sending the messages, with `send_message` for v3 and `send_boc` for v2.
+    confirm_client : AsyncTonCenterClientV3, optional
+        The client looking up the transactions, required with a v2 client which has no `transactionsByMessage`.
+    ttl : int, default 60
+        The lifetime in seconds of a message queued without `valid_until`, it should match the expiry of the signed message.
+    poll_interval : float, default 2.0
+        Seconds between two confirmation rounds.
+    max_concurrency : int, default 8
+        The number of concurrent sends and lookups, the QPS is enforced by the clients.
+    max_retries : int, default 3
+        Retries of a send failing with a transient error.
+    backoff : float, default 0.5
+        The base delay in seconds of the exponential backoff between retries.
+    resend_after : float, optional
+        Seconds after which an unconfirmed message is broadcast again, the message hash does not change so it can not be processed twice.
+
+    Example
+    -------
+    ```python
+    pipeline = OutboundPipeline(client, ttl=60)
+    async for result in pipeline.send_many(signed_bocs):
+        if result["status"] != "confirmed":
+            print(result["hash"], result["status"], result["error"])
+    ```
+    """
+
+    def __init__(
+        self,
+        client: Union[AsyncTonCenterClientV3, AsyncTonCenterClientV2],
+        confirm_client: Optional[AsyncTonCenterClientV3] = None,
+        ttl: int = 60,
+        poll_interval: float = 2.0,
+        max_concurrency: int = 8,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        resend_after: Optional[float] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        confirm_client = confirm_client or client  # type: ignore
+        assert hasattr(confirm_client, "get_transaction_by_message"), "A v2 client needs a v3 confirm_client for transactionsByMessage"
+        assert ttl > 0 and poll_interval > 0 and max_concurrency > 0 and max_retries >= 0
+        self.client = client
+        self.confirm_client: AsyncTonCenterClientV3 = confirm_client  # type: ignore
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.resend_after = resend_after
+        self.clock = clock
+        self._messages: Dict[str, _Outbound] = {}
+        self._queue: Deque[_Outbound] = deque()
+        self._unconfirmed: Dict[str, _Outbound] = {}
+        self._done: Dict[str, OutboundResult] = {}
+        self._closed = False
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def __len__(self) -> int:
+        """
+        The number of messages queued or waiting for confirmation
+        """
+        return len(self._messages)
+
+    def __contains__(self, hash: str) -> bool:
+        return hash.upper() in self._messages or hash.upper() in self._done
+
+    def put(self, boc: str, valid_until: Optional[int] = None) -> str:
+        """
+        put queues an external message and returns its hash. A message already queued, pending or finished is ignored,
+        the results of finished messages are kept until their `valid_until`.
+        """
+        assert not self._closed, "The pipeline is closed"
+        hash = message_hash(boc)
+        if hash in self._messages or hash in self._done:
+            return hash
+        msg = _Outbound(hash, boc, valid_until if valid_until is not None else int(self.clock()) + self.ttl)
+        self._messages[hash] = msg
+        self._queue.append(msg)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return hash
+
+    def close(self) -> None:
+        """
+        close marks the end of the messages, `results` returns once every queued message has a result
+        """
+        self._closed = True
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def result(self, hash: str) -> Optional[OutboundResult]:
+        return self._done.get(hash.upper())
+
+    async def _send(self, boc: str) -> None:
+        if hasattr(self.client, "send_message"):
+            await self.client.send_message(ExternalMessage(boc=boc))  # type: ignore
+        else:
+            await self.client.send_boc(boc)  # type: ignore
+
+    async def _lookup(self, hash: str) -> Optional[Transaction]:
+        try:
+            txs, _ = await self.confirm_client.get_transaction_by_message(GetTransactionByMessageRequest(direction="in", msg_hash=hash, limit=1))
+        except TonCenterException as e:
+            # toncenter answers 404 or 503 for a message which is not indexed yet
+            if e.code in (404, 503):
+                return None
+            raise
+        return txs[0] if txs else None
+
+    def _finish(self, msg: _Outbound, status: OutboundStatus, transaction: Optional[Transaction] = None, error: Optional[Exception] = None) -> OutboundResult:
+        self._messages.pop(msg.hash, None)
+        self._unconfirmed.pop(msg.hash, None)
+        result: OutboundResult = {
+            "hash": msg.hash,
+            "status": status,
+            "transaction": transaction,
+            "error": error,
+            "attempts": msg.attempts,
+            "sent_at": msg.sent_at,
+            "finished_at": self.clock(),
+            "valid_until": msg.valid_until,
+        }
+        self._done[msg.hash] = result
+        return result
+
+    def _confirmed(self, msg: _Outbound, tx: Transaction) -> OutboundResult:
+        aborted = isinstance(tx.description, dict) and bool(tx.description.get("aborted"))
+        return self._finish(msg, "failed" if aborted else "confirmed", tx)
+
+    async def _submit(self, msg: _Outbound) -> Optional[OutboundResult]:
+        """
+        _submit sends a message with retries. A retry first looks the message up, as a timed out send may have been accepted.
+        """
+        retries = 0
+        while True:
+            if retries > 0:
+                try:
+                    tx = await self._lookup(msg.hash)
+                except Exception:
+                    # without knowing whether the message landed it is not sent again, the confirmation rounds decide
+                    break
+                if tx is not None:
+                    return self._confirmed(msg, tx)
+            msg.attempts += 1
+            try:
+                await self._send(msg.boc)
+            except Exception as e:
+                if not _is_transient_error(e):
+                    return self._finish(msg, "failed", error=e)
+                if retries >= self.max_retries or self.clock() > msg.valid_until:
+                    # the message may have been accepted, the confirmation rounds decide
+                    break
+                await asyncio.sleep(self.backoff * 2**retries)
+                retries += 1
+                continue
+            break
+        now = self.clock()
+        msg.sent_at = msg.sent_at or now
+        msg.resent_at = now
+        self._unconfirmed[msg.hash] = msg
+        return None
+
+    def _prune(self) -> None:
+        """
+        _prune forgets the results of messages past their valid_until, which can not be processed anymore
+        """
+        now = self.clock()
+        for hash in [hash for hash, result in self._done.items() if result["valid_until"] < now]:
+            del self._done[hash]
+
+    async def _confirm_round(self, semaphore: asyncio.Semaphore) -> List[OutboundResult]:
+        async def _check(msg: _Outbound) -> Optional[OutboundResult]:
+            error: Optional[Exception] = None
+            async with semaphore:
+                try:
+                    tx = await self._lookup(msg.hash)
+                except Exception as e:
+                    # one bad answer must not stop the stream, the message gets a result with the error
+                    if not _is_transient_error(e):
+                        return self._finish(msg, "failed", error=e)
+                    tx, error = None, e
+            if tx is not None:
+                return self._confirmed(msg, tx)
+            now = self.clock()
+            if now > msg.valid_until:
+                return self._finish(msg, "expired", error=error)
+            if self.resend_after is not None and now - (msg.resent_at or now) >= self.resend_after:
+                del self._unconfirmed[msg.hash]
+                self._queue.append(msg)
+            return None
+
+        results = await asyncio.gather(*[_check(msg) for msg in list(self._unconfirmed.values())])
+        self._prune()
+        return [result for result in results if result is not None]
+
+    async def results(self) -> AsyncGenerator[OutboundResult, None]:
+        """
+        results sends the queued messages and yields their results in the order they finish, until the pipeline is closed and drained.
+        Messages can be queued with `put` while the results are consumed.
+        """
+        self._wakeup = asyncio.Event()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        sending: Dict[asyncio.Task, _Outbound] = {}
+        next_round = self.clock() + self.poll_interval
+        try:
+            while self._queue or sending or self._unconfirmed or not self._closed:
+                while self._queue and len(sending) < self.max_concurrency:
+                    msg = self._queue.popleft()
+                    sending[asyncio.ensure_future(self._submit(msg))] = msg
+                self._wakeup.clear()
+                timeout = max(0.0, next_round - self.clock()) if self._unconfirmed else None
+                waiters: List[Any] = [*sending, asyncio.ensure_future(self._wakeup.wait())]
+                done, _ = await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                waiters[-1].cancel()
+                for task in done:
+                    if task in sending:
+                        del sending[task]
+                        result = task.result()
+                        if result is not None:
+                            yield result
+                if self._unconfirmed and self.clock() >= next_round:
+                    for result in await self._confirm_round(semaphore):
+                        yield result
+                    next_round = self.clock() + self.poll_interval
+                elif not self._unconfirmed:
+                    next_round = self.clock() + self.poll_interval
+        finally:
+            for task in sending:
+                task.cancel()
+            self._wakeup = None
+
+    async def send_many(self, items: Union[Iterable[OutboundItem], AsyncIterable[OutboundItem]]) -> AsyncGenerator[OutboundResult, None]:
+        """
+        send_many queues every message of `items`, closes the pipeline and yields the results in the order they finish
+        """
+
+        async def _feed():
+            try:
+                if isinstance(items, AsyncIterable):
+                    async for item in items:
+                        self.put(*((item,) if isinstance(item, str) else item))
+                else:
+                    for item in items:
+                        self.put(*((item,) if isinstance(item, str) else item))
+            finally:
+                self.close()
+
+        feeder = asyncio.ensure_future(_feed())
+        try:
+            async for result in self.results():
+                yield result
+            await feeder
+        finally:
+            feeder.cancel()
@@ -1,7 +1,6 @@
 import base64
-from typing import Callable, Dict, Optional
-
-from treelib import Node, Tree
+import sys
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
 from pytoncenter.address import Address
 from pytoncenter.v3.models import Transaction, TransactionTrace
@@ -13,6 +12,8 @@ __all__ = [
     "AddressMapping",
     "format_tx",
     "format_trace",
+    "iter_trace_lines",
+    "write_trace",
     "truncate_address",
     "create_address_mapping",
 ]
@@ -77,10 +78,12 @@ def truncate_address(address: Address, prefix: int = 6, suffix: int = 6) -> str:
     return addr[:prefix] + "..." + addr[-suffix:] if len(addr) > prefix + suffix else addr
 
 
-def format_tx(tx: Transaction, address_mapping: AddressMapping = _default_address_mapping) -> str:
-    tmpl = "\033[95m{src}\033[0m ➡️ \033[92m{dest}\033[0m \033[93m({msg})\033[0m \033[94m[💎 {value} TON]\033[0m"
-    src = address_mapping(Address(tx.in_msg.source)) if tx.in_msg.source else "External"
-    dst = address_mapping(Address(tx.in_msg.destination)) if tx.in_msg.destination else ""
+_TX_TEMPLATE = "\033[95m{src}\033[0m ➡️ \033[92m{dest}\033[0m \033[93m({msg})\033[0m \033[94m[💎 {value} TON]\033[0m"
+
+
+def _format_tx(tx: Transaction, label: Callable[[str], str]) -> str:
+    src = label(tx.in_msg.source) if tx.in_msg.source else "External"
+    dst = label(tx.in_msg.destination) if tx.in_msg.destination else ""
     value = round((tx.in_msg.value or 0) / 1e9, 5)
     msg = tx.in_msg.opcode
     if (msg is None or msg == "0x00000000") and tx.in_msg.message_content is not None and tx.in_msg.message_content.decoded is not None:
@@ -89,7 +92,44 @@ def format_tx(tx: Transaction, address_mapping: AddressMapping = _default_addres
         else:
             msg = "<Binary message>"
 
-    return tmpl.format(src=src, dest=dst, msg=msg, value=value)
+    return _TX_TEMPLATE.format(src=src, dest=dst, msg=msg, value=value)
+
+
+def format_tx(tx: Transaction, address_mapping: AddressMapping = _default_address_mapping) -> str:
+    return _format_tx(tx, lambda addr: address_mapping(Address(addr)))
+
+
+def iter_trace_lines(root: TransactionTrace, address_mapping: AddressMapping = _default_address_mapping) -> Iterator[str]:
+    """
+    iter_trace_lines yields the lines of the pretty printed transaction trace one by one, without the trailing newline.
+    The trace is walked iteratively in its own order, and every unique address is labelled by address_mapping only once.
+    """
+    labels: Dict[str, str] = {}
+
+    def _label(addr: str) -> str:
+        label = labels.get(addr)
+        if label is None:
+            label = labels[addr] = address_mapping(Address(addr))
+        return label
+
+    yield _format_tx(root.transaction, _label)
+    stack: List[Tuple[TransactionTrace, str, bool]] = [(child, "", i == len(root.children) - 1) for i, child in reversed(list(enumerate(root.children)))]
+    while stack:
+        node, prefix, is_last = stack.pop()
+        yield prefix + ("└── " if is_last else "├── ") + _format_tx(node.transaction, _label)
+        child_prefix = prefix + ("    " if is_last else "│   ")
+        last = len(node.children) - 1
+        for i in range(last, -1, -1):
+            stack.append((node.children[i], child_prefix, i == last))
+
+
+def write_trace(root: TransactionTrace, writer: Optional[Callable[[str], Any]] = None, address_mapping: AddressMapping = _default_address_mapping) -> None:
+    """
+    write_trace streams the pretty printed transaction trace to the writer line by line, e.g. `file.write`. Defaults to `sys.stdout.write`.
+    """
+    writer = writer if writer is not None else sys.stdout.write
+    for line in iter_trace_lines(root, address_mapping):
+        writer(line + "\n")
 
 
 def format_trace(root: TransactionTrace, address_mapping: AddressMapping = _default_address_mapping) -> str:
@@ -101,19 +141,4 @@ def format_trace(root: TransactionTrace, address_mapping: AddressMapping = _defa
     str
         The pretty printed transaction trace in tree format
     """
-
-    def recursive_add_node(tree: Tree, trace: TransactionTrace, parent: Optional[Node] = None):
-        """
-        Recursively add node to the tree
-        """
-        node = tree.create_node(
-            identifier=trace.transaction.hash,
-            tag=format_tx(trace.transaction, address_mapping),
-            parent=parent,
-        )
-        for child in trace.children:
-            recursive_add_node(tree, child, node)
-
-    tree = Tree()
-    recursive_add_node(tree, root)
-    return tree.show(stdout=False)  # type: ignore
+    return "".join(line + "\n" for line in iter_trace_lines(root, address_mapping))
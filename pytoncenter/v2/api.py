@@ -2,13 +2,33 @@ import asyncio
 import os
 import uuid
 import warnings
-from typing import Any, Dict, List, Literal, Optional, Tuple, Union
+from collections import deque
+from typing import (
+    Any,
+    AsyncGenerator,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Literal,
+    Optional,
+    Tuple,
+    Union,
+)
 
 import aiohttp
 from tonpy import Cell
 
+from pytoncenter.decoder import BaseDecoder, Decoder
 from pytoncenter.dispatcher import RoundRobinKeyRotator
 from pytoncenter.exception import TonException
+from pytoncenter.getmethod import (
+    BulkGetMethodResult,
+    BulkProgress,
+    GetMethodCache,
+    _is_transient_error,
+    iter_bulk_get_methods,
+)
 from pytoncenter.multicall import Multicallable
 from pytoncenter.requestor import AsyncRequestor
 
@@ -24,6 +44,7 @@ class AsyncTonCenterClientV2(Multicallable, AsyncRequestor):
         strategy: Union[Literal["round_robin"], None] = None,
         custom_endpoint: Optional[str] = None,
         qps: Optional[float] = None,
+        get_method_cache: Optional[GetMethodCache[GetMethodResult]] = None,
         **kwargs,
     ) -> None:
 
@@ -69,6 +90,8 @@ class AsyncTonCenterClientV2(Multicallable, AsyncRequestor):
             qps = 9.5 * len(self.api_keys) if self.api_keys else 1
         super().__init__(qps)
 
+        self.get_method_cache = get_method_cache
+
     def _get_request_headers(self) -> Dict[str, Any]:
         headers = {
             "Content-Type": "application/json",
@@ -294,12 +317,77 @@ class AsyncTonCenterClientV2(Multicallable, AsyncRequestor):
         return await self._async_get("getConfigParam", {"config_id": config_id, "seqno": seqno})
 
     async def run_get_method(self, address: str, method_name: str, stack: List[Tuple[str, Any]] = []) -> GetMethodResult:
+        """
+        run_get_method runs the get method of the address. If the client has a get method cache, results are reused until the account has a new transaction.
+        """
+        cache = self.get_method_cache
+        if cache is not None:
+            if not cache.is_fresh(address):
+                # read the lt before running the get method, so a newer state is never cached under an older lt
+                cache.validate(address, await self._last_transaction_lt(address))
+            cached = cache.get(address, method_name, stack)
+            if cached is not None:
+                return cached
+            lt = cache.lt(address)
         result = await self._async_post("runGetMethod", {"address": address, "method": method_name, "stack": stack})
         if result.get("@type") == "smc.runResult" and "stack" in result:
             r: Dict[str, Any] = result["stack"]
-            return [{"type": r[i][0], "value": r[i][1]} for i in range(len(r))]
+            output: GetMethodResult = [{"type": r[i][0], "value": r[i][1]} for i in range(len(r))]
+            if cache is not None and result.get("exit_code", 0) in (0, 1):
+                cache.put(address, method_name, stack, output, lt)
+            return output
         raise ValueError(f"Invalid get method result: {result}")
 
+    async def _last_transaction_lt(self, address: str) -> int:
+        info = await self.get_wallet_information(address)
+        return int(info["last_transaction_id"]["lt"])
+
+    async def refresh_get_method_cache(self, addresses: Optional[List[str]] = None) -> int:
+        """
+        refresh_get_method_cache checks the lt of every stale account of the get method cache, or of the given accounts, with one request per account
+        whatever the number of cached methods and stacks, and drops the results of the accounts which had a new transaction.
+
+        Returns
+        -------
+        int
+            The number of dropped results
+        """
+        cache = self.get_method_cache
+        assert cache is not None, "get_method_cache is not configured"
+        targets = [address.to_string(False) for address in cache.stale_addresses()] if addresses is None else addresses
+        lts = await asyncio.gather(*[self._last_transaction_lt(address) for address in targets])
+        return sum(cache.validate(address, lt) for address, lt in zip(targets, lts))
+
+    async def iter_get_methods(
+        self,
+        calls: Iterable[Union[Tuple[str, str], Tuple[str, str, List[Tuple[str, Any]]]]],
+        decoder: Optional[Union[Decoder, BaseDecoder]] = None,
+        max_concurrency: int = 16,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        progress: Optional[BulkProgress] = None,
+    ) -> AsyncGenerator[BulkGetMethodResult, None]:
+        """
+        iter_get_methods runs many get methods with at most `max_concurrency` requests in flight and yields the results as they finish,
+        in completion order with the `index` of the call. The calls are consumed lazily, so a generator over 100k addresses runs in constant memory.
+        Transient errors are retried up to `max_retries` times with exponential backoff, other errors are yielded in the `error` of the result.
+
+        Example
+        -------
+        ```python
+        decoder = Decoder(Types.Number("balance"), Types.Address("owner"), Types.Address("jetton"), Types.Cell("jetton_wallet_code"))
+        progress = BulkProgress()
+        calls = ((wallet, "get_wallet_data") for wallet in wallets)
+        async for item in client.iter_get_methods(calls, decoder=decoder, max_concurrency=32, progress=progress):
+            if item["error"] is None:
+                balances[item["address"]] = item["result"]["balance"]
+        print(progress)
+        ```
+        """
+        normalized = ((call[0], call[1], call[2] if len(call) > 2 else []) for call in calls)
+        async for item in iter_bulk_get_methods(self.run_get_method, normalized, decoder, None, max_concurrency, max_retries, backoff, progress):
+            yield item
+
     async def send_boc(self, boc: str):
         return await self._async_post("sendBoc", {"boc": boc})
 
@@ -395,10 +483,44 @@ class AsyncTonCenterClientV2(Multicallable, AsyncRequestor):
             except Exception as e:
                 print(e)
 
-    async def trace_tx(self, root_tx: Tx) -> TraceTx:
+    async def _locate_trace_child(self, msg: Message, max_retries: int, backoff: float) -> Optional[Tx]:
+        """
+        Locate the transaction caused by the message. Transient errors are retried with exponential backoff,
+        a TonException with a non transient code means the transaction does not exist.
+        """
+        attempt = 0
+        while True:
+            try:
+                return await self.try_locate_tx(source=msg["source"], destination=msg["destination"], created_lt=int(msg["created_lt"]))
+            except Exception as e:
+                if not _is_transient_error(e):
+                    if isinstance(e, TonException):
+                        return None
+                    raise e
+                if attempt >= max_retries:
+                    raise e
+                await asyncio.sleep(backoff * 2**attempt)
+                attempt += 1
+
+    async def trace_tx(self, root_tx: Tx, max_concurrency: int = 8, max_retries: int = 3, backoff: float = 0.5) -> TraceTx:
         """
         trace_tx traces the transaction and its children transactions
 
+        The trace is walked iteratively with at most `max_concurrency` lookups in flight, messages are deduplicated by
+        (source, destination, created_lt) and transient errors are retried up to `max_retries` times before being raised.
+        The transactions returned by the API are reused as the trace nodes, only the root transaction is shallow copied.
+
+        Parameters
+        ----------
+        root_tx : Tx
+            The transaction to trace from
+        max_concurrency : int
+            The maximum number of lookups in flight, by default 8
+        max_retries : int
+            The maximum retries of a lookup which failed with a transient error, by default 3
+        backoff : float
+            The delay in seconds before the first retry, doubled on every retry, by default 0.5
+
         Example
         -------
         ```
@@ -407,56 +529,48 @@ class AsyncTonCenterClientV2(Multicallable, AsyncRequestor):
         trace = await client.trace_tx(txs[0])
         pprint(trace)
         """
-
-        async def get_children_tx(source: str, destination: str, created_lt: int) -> Optional[TraceTx]:
-            try:
-                _tx = await self.try_locate_tx(source=source, destination=destination, created_lt=created_lt)
-                _trace: TraceTx = {
-                    "@type": _tx["@type"],
-                    "address": _tx["address"],
-                    "data": _tx["data"],
-                    "fee": _tx["fee"],
-                    "other_fee": _tx["other_fee"],
-                    "storage_fee": _tx["storage_fee"],
-                    "transaction_id": _tx["transaction_id"],
-                    "utime": _tx["utime"],
-                    "in_msg": _tx["in_msg"],
-                    "children": [],
-                }
-                tasks = [
-                    get_children_tx(
-                        source=msg["source"],
-                        destination=msg["destination"],
-                        created_lt=int(msg["created_lt"]),
-                    )
-                    for msg in _tx["out_msgs"]
-                ]
-                _trace["children"] = [child_tx for child_tx in await asyncio.gather(*tasks) if child_tx is not None]
-                return _trace
-            except TonException:
-                return None
-
-        output: TraceTx = {
-            "@type": root_tx["@type"],
-            "address": root_tx["address"],
-            "data": root_tx["data"],
-            "fee": root_tx["fee"],
-            "other_fee": root_tx["other_fee"],
-            "storage_fee": root_tx["storage_fee"],
-            "transaction_id": root_tx["transaction_id"],
-            "utime": root_tx["utime"],
-            "in_msg": root_tx["in_msg"],
-            "children": [],
-        }
-
-        tasks = [
-            get_children_tx(
-                source=msg["source"],
-                destination=msg["destination"],
-                created_lt=int(msg["created_lt"]),
-            )
-            for msg in root_tx["out_msgs"]
-        ]
-        output["children"] = [child_tx for child_tx in await asyncio.gather(*tasks) if child_tx is not None]
-
-        return output
+        assert max_concurrency > 0, "max_concurrency must be greater than 0"
+        root: TraceTx = {**root_tx, "children": []}  # type: ignore
+        seen = set()
+        queue: Deque[Tuple[List[Optional[TraceTx]], int, Message]] = deque()
+        slots: List[Tuple[TraceTx, List[Optional[TraceTx]]]] = []
+
+        def _enqueue(node: TraceTx):
+            out_msgs: List[Message] = node.get("out_msgs", [])  # type: ignore
+            children: List[Optional[TraceTx]] = [None] * len(out_msgs)
+            slots.append((node, children))
+            for i, msg in enumerate(out_msgs):
+                # external out messages do not create transactions
+                if not msg["destination"]:
+                    continue
+                key = (msg["source"], msg["destination"], msg["created_lt"])
+                if key in seen:
+                    continue
+                seen.add(key)
+                queue.append((children, i, msg))
+
+        _enqueue(root)
+        running: Dict[asyncio.Future, Tuple[List[Optional[TraceTx]], int]] = {}
+        try:
+            while queue or running:
+                while queue and len(running) < max_concurrency:
+                    children, i, msg = queue.popleft()
+                    task = asyncio.ensure_future(self._locate_trace_child(msg, max_retries, backoff))
+                    running[task] = (children, i)
+                done, _ = await asyncio.wait(running.keys(), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    children, i = running.pop(task)
+                    tx = task.result()
+                    if tx is None:
+                        continue
+                    node: TraceTx = tx  # type: ignore
+                    node["children"] = []
+                    children[i] = node
+                    _enqueue(node)
+        finally:
+            for task in running:
+                task.cancel()
+
+        for node, children in slots:
+            node["children"] = [child for child in children if child is not None]
+        return root
@@ -98,6 +98,7 @@ TraceTx = TypedDict(
         "storage_fee": str,
         "other_fee": str,
         "in_msg": Message,
+        "out_msgs": List[Message],
         "children": List["TraceTx"],
     },
 )
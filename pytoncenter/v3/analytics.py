@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple, TypedDict
+
+from pytoncenter.address import Address
+from pytoncenter.v3.models import TransactionTrace
+
+__all__ = [
+    "AccountFlow",
+    "TraceSummary",
+    "FlatTraces",
+    "flatten_traces",
+]
+
+AccountFlow = TypedDict(
+    "AccountFlow",
+    {
+        "received": int,
+        "sent": int,
+        "fees": int,
+    },
+)
+
+TraceSummary = TypedDict(
+    "TraceSummary",
+    {
+        "id": str,
+        "transactions": int,
+        "total_fees": int,
+        "total_value": int,
+        "depth": int,
+        "bounced": int,
+    },
+)
+
+
+class FlatTraces:
+    """
+    FlatTraces stores one or many transaction traces as parallel columns, one row per transaction in depth-first pre-order.
+    Every column is an `array.array`, so it can be shared with numpy without copying, e.g. `numpy.frombuffer(flat.fees, dtype=numpy.int64)`.
+
+    Columns
+    -------
+    parent : index of the parent row, -1 for the root of a trace
+    depth : distance from the root of the trace, 0 for the root
+    account : index into `accounts`, the raw form of the account of the transaction
+    value : value of the inbound message in nanoton
+    fees : total fees of the transaction in nanoton
+    opcode : opcode of the inbound message, -1 if there is none
+    lt : logical time of the transaction
+    bounced : 1 if the inbound message is bounced, otherwise 0
+
+    Rows of the i-th trace are `offsets[i]:offsets[i + 1]`.
+    """
+
+    def __init__(self) -> None:
+        self.ids: List[str] = []
+        self.hashes: List[str] = []
+        self.offsets = array("q", [0])
+        self.parent = array("q")
+        self.depth = array("q")
+        self.account = array("q")
+        self.value = array("q")
+        self.fees = array("q")
+        self.opcode = array("q")
+        self.lt = array("q")
+        self.bounced = array("b")
+        self.accounts: List[str] = []
+        self._account_index: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def rows(self) -> int:
+        return len(self.hashes)
+
+    def _intern_account(self, account: Address) -> int:
+        raw = account.to_string(False)
+        idx = self._account_index.get(raw)
+        if idx is None:
+            idx = self._account_index[raw] = len(self.accounts)
+            self.accounts.append(raw)
+        return idx
+
+    def append(self, trace: TransactionTrace) -> None:
+        """
+        append flattens the trace into the columns in a single iterative pass
+        """
+        stack: List[Tuple[TransactionTrace, int, int]] = [(trace, -1, 0)]
+        while stack:
+            node, parent, depth = stack.pop()
+            tx = node.transaction
+            msg = tx.in_msg
+            self.hashes.append(tx.hash)
+            self.parent.append(parent)
+            self.depth.append(depth)
+            self.account.append(self._intern_account(tx.account))
+            self.value.append(msg.value or 0)
+            self.fees.append(tx.total_fees)
+            self.opcode.append(int(msg.opcode, 16) if msg.opcode else -1)
+            self.lt.append(tx.lt)
+            self.bounced.append(1 if msg.bounced else 0)
+            row = len(self.hashes) - 1
+            for child in reversed(node.children):
+                stack.append((child, row, depth + 1))
+        self.ids.append(trace.id)
+        self.offsets.append(len(self.hashes))
+
+    def extend(self, traces: Iterable[TransactionTrace]) -> None:
+        for trace in traces:
+            self.append(trace)
+
+    def _segments(self) -> Iterable[Tuple[int, int]]:
+        offsets = self.offsets
+        return zip(offsets[:-1], offsets[1:])
+
+    def total_fees(self) -> List[int]:
+        fees = self.fees
+        return [sum(fees[start:end]) for start, end in self._segments()]
+
+    def total_value(self) -> List[int]:
+        value = self.value
+        return [sum(value[start:end]) for start, end in self._segments()]
+
+    def max_depth(self) -> List[int]:
+        """
+        max_depth returns the depth of the critical path of every trace, the number of hops from the root to the deepest transaction
+        """
+        depth = self.depth
+        return [max(depth[start:end]) for start, end in self._segments()]
+
+    def bounced_count(self) -> List[int]:
+        bounced = self.bounced
+        return [sum(bounced[start:end]) for start, end in self._segments()]
+
+    def bounced_rows(self) -> List[int]:
+        """
+        bounced_rows returns the rows whose inbound message is bounced, each of them is the root of a bounced branch
+        """
+        return [row for row, bounced in enumerate(self.bounced) if bounced]
+
+    def critical_path(self, index: int = 0) -> List[int]:
+        """
+        critical_path returns the rows from the root to the deepest transaction of the index-th trace, the latest one wins on ties
+        """
+        start, end = self.offsets[index], self.offsets[index + 1]
+        depth, lt = self.depth, self.lt
+        row = max(range(start, end), key=lambda i: (depth[i], lt[i]))
+        path = []
+        while row != -1:
+            path.append(row)
+            row = self.parent[row]
+        path.reverse()
+        return path
+
+    def account_flows(self, index: Optional[int] = None) -> Dict[str, AccountFlow]:
+        """
+        account_flows returns the TON received, sent and paid as fees by every account, over all traces or the index-th one.
+        The sender of an internal message is the account of the parent transaction, so no address needs to be parsed.
+        """
+        start, end = (0, self.rows) if index is None else (self.offsets[index], self.offsets[index + 1])
+        account_count = len(self.accounts)
+        received = [0] * account_count
+        sent = [0] * account_count
+        fees = [0] * account_count
+        account, parent, value, fee = self.account, self.parent, self.value, self.fees
+        for row in range(start, end):
+            acc = account[row]
+            received[acc] += value[row]
+            fees[acc] += fee[row]
+            p = parent[row]
+            if p != -1:
+                sent[account[p]] += value[row]
+        return {self.accounts[i]: {"received": received[i], "sent": sent[i], "fees": fees[i]} for i in range(account_count) if received[i] or sent[i] or fees[i]}
+
+    def opcode_counts(self) -> Dict[int, int]:
+        counts: Dict[int, int] = {}
+        for op in self.opcode:
+            counts[op] = counts.get(op, 0) + 1
+        return counts
+
+    def summary(self) -> List[TraceSummary]:
+        return [
+            {"id": trace_id, "transactions": end - start, "total_fees": fees, "total_value": value, "depth": depth, "bounced": bounced}
+            for trace_id, (start, end), fees, value, depth, bounced in zip(self.ids, self._segments(), self.total_fees(), self.total_value(), self.max_depth(), self.bounced_count())
+        ]
+
+
+def flatten_traces(*traces: TransactionTrace) -> FlatTraces:
+    """
+    flatten_traces flattens one or many traces into a `FlatTraces` for offline analytics
+
+    Example
+    -------
+    ```python
+    trace = await client.get_trace_alternative(GetTransactionTraceRequest(hash=tx_hash))
+    flat = flatten_traces(trace)
+    print(flat.summary()[0], flat.account_flows())
+    ```
+    """
+    flat = FlatTraces()
+    flat.extend(traces)
+    return flat
@@ -3,17 +3,43 @@ import hashlib
 import os
 import time
 import warnings
-from typing import Any, Dict, List, Literal, Optional, Tuple, Union, overload
+from typing import (
+    Any,
+    AsyncGenerator,
+    Dict,
+    Iterable,
+    List,
+    Literal,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+    overload,
+)
 
 import aiohttp
 from tonpy import CellSlice, begin_cell
 
 from pytoncenter.address import Address
+from pytoncenter.decoder import BaseDecoder, Decoder
 from pytoncenter.dispatcher import RoundRobinKeyRotator
 from pytoncenter.exception import TonCenterException, TonCenterValidationException
+from pytoncenter.getmethod import (
+    BulkGetMethodResult,
+    BulkProgress,
+    GetMethodCache,
+    iter_bulk_get_methods,
+)
 from pytoncenter.multicall import Multicallable
 from pytoncenter.requestor import AsyncRequestor
 from pytoncenter.v3.models import *
+from pytoncenter.v3.trace import (
+    TraceEdge,
+    TraceStore,
+    is_pending,
+    iter_trace_nodes,
+    normalize_hash,
+)
 
 
 class AsyncTonCenterClientV3(Multicallable, AsyncRequestor):
@@ -25,6 +51,8 @@ class AsyncTonCenterClientV3(Multicallable, AsyncRequestor):
         strategy: Union[Literal["round_robin"], None] = None,
         custom_endpoint: Optional[str] = None,
         qps: Optional[float] = None,
+        trace_store: Optional[TraceStore] = None,
+        get_method_cache: Optional[GetMethodCache[RunGetMethodResponse]] = None,
         **kwargs,
     ) -> None:
         """
@@ -45,6 +73,10 @@ class AsyncTonCenterClientV3(Multicallable, AsyncRequestor):
             The custom endpoint to use. If provided, it will override the network parameter.
         qps: Optional[float], optional
             The maximum queries per second to use. If not provided, it will use 9.5 * len(api keys) if api_key is provided, otherwise 1.
+        trace_store: Optional[TraceStore], optional
+            The store used to cache transaction traces. If provided, looking up any transaction of a known trace will not rebuild the trace.
+        get_method_cache: Optional[GetMethodCache], optional
+            The cache of get method results. If provided, `run_get_method` reuses results until the account has a new transaction.
         """
         self._network = network
         # API KEY
@@ -90,6 +122,9 @@ class AsyncTonCenterClientV3(Multicallable, AsyncRequestor):
             qps = 9.5 * len(self.api_keys) if self.api_keys else 1
         super().__init__(qps)
 
+        self.trace_store = trace_store
+        self.get_method_cache = get_method_cache
+
     def _get_request_headers(self) -> Dict[str, Any]:
         headers = {
             "Content-Type": "application/json",
@@ -340,8 +375,97 @@ class AsyncTonCenterClientV3(Multicallable, AsyncRequestor):
         return SentMessage(**resp)
 
     async def run_get_method(self, req: RunGetMethodRequest) -> RunGetMethodResponse:
-        resp = await self._async_post("runGetMethod", req.model_dump(exclude_none=True))
-        return RunGetMethodResponse(**resp)
+        cache = self.get_method_cache
+        if cache is None:
+            resp = await self._async_post("runGetMethod", req.model_dump(exclude_none=True))
+            return RunGetMethodResponse(**resp)
+
+        address = Address(req.address)
+        if not cache.is_fresh(address):
+            # read the lt before running the get method, so a newer state is never cached under an older lt
+            cache.validate(address, await self._last_transaction_lt(address))
+        result = cache.get(address, req.method, req.stack)
+        if result is None:
+            lt = cache.lt(address)
+            resp = await self._async_post("runGetMethod", req.model_dump(exclude_none=True))
+            result = RunGetMethodResponse(**resp)
+            if result.exit_code in (0, 1):
+                cache.put(address, req.method, req.stack, result, lt)
+        return result
+
+    async def _last_transaction_lt(self, address: AddressLike) -> int:
+        account = await self.get_account(GetAccountRequest(address=address))
+        return account.last_transaction_lt or 0
+
+    async def refresh_get_method_cache(self, addresses: Optional[List[AddressLike]] = None) -> int:
+        """
+        refresh_get_method_cache checks the lt of every stale account of the get method cache, or of the given accounts, with one request per account
+        whatever the number of cached methods and stacks, and drops the results of the accounts which had a new transaction.
+
+        Returns
+        -------
+        int
+            The number of dropped results
+        """
+        cache = self.get_method_cache
+        assert cache is not None, "get_method_cache is not configured"
+        targets = cache.stale_addresses() if addresses is None else [Address(address) for address in addresses]
+        lts = await asyncio.gather(*[self._last_transaction_lt(address) for address in targets])
+        return sum(cache.validate(address, lt) for address, lt in zip(targets, lts))
+
+    async def iter_get_methods(
+        self,
+        calls: Iterable[Union[RunGetMethodRequest, Tuple[AddressLike, str], Tuple[AddressLike, str, List[GetMethodParameterInput]]]],
+        decoder: Optional[Union[Decoder, BaseDecoder]] = None,
+        max_concurrency: int = 16,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        progress: Optional[BulkProgress] = None,
+    ) -> AsyncGenerator[BulkGetMethodResult, None]:
+        """
+        iter_get_methods runs many get methods with at most `max_concurrency` requests in flight and yields the results as they finish,
+        in completion order with the `index` of the call. The calls are consumed lazily, so a generator over 100k addresses runs in constant memory.
+
+        Parameters
+        ----------
+        calls : Iterable[Union[RunGetMethodRequest, Tuple[AddressLike, str], Tuple[AddressLike, str, List[GetMethodParameterInput]]]]
+            The get methods to run, as requests or (address, method, stack) tuples
+        decoder : Optional[Union[Decoder, BaseDecoder]]
+            The decoder applied to every successful result, by default the raw `RunGetMethodResponse` is returned
+        max_concurrency : int
+            The maximum number of get methods in flight, by default 16. The QPS limit of the client still applies.
+        max_retries : int
+            The maximum retries of a get method which failed with a transient error, by default 3
+        backoff : float
+            The delay in seconds before the first retry, doubled on every retry, by default 0.5
+        progress : Optional[BulkProgress]
+            Updated in place with the completed, failed and retried get methods and the throughput
+
+        Example
+        -------
+        ```python
+        decoder = Decoder(Types.Number("balance"), Types.Address("owner"), Types.Address("jetton"), Types.Cell("jetton_wallet_code"))
+        progress = BulkProgress()
+        calls = ((wallet, "get_wallet_data") for wallet in wallets)
+        async for item in client.iter_get_methods(calls, decoder=decoder, max_concurrency=32, progress=progress):
+            if item["error"] is None:
+                balances[item["address"]] = item["result"]["balance"]
+        print(progress)
+        ```
+        """
+
+        def _calls():
+            for call in calls:
+                if isinstance(call, RunGetMethodRequest):
+                    yield call.address, call.method, call.stack
+                else:
+                    yield call[0], call[1], call[2] if len(call) > 2 else []
+
+        async def _run(address: AddressLike, method: str, stack: List[GetMethodParameterInput]) -> RunGetMethodResponse:
+            return await self.run_get_method(RunGetMethodRequest(address=address, method=method, stack=stack))
+
+        async for item in iter_bulk_get_methods(_run, _calls(), decoder, lambda result: result.exit_code, max_concurrency, max_retries, backoff, progress):
+            yield item
 
     async def estimate_fee(self, req: EstimateFeeRequest) -> EstimateFeeResponse:
         resp = await self._async_post("estimateFee", req.model_dump(exclude_none=True))
@@ -448,25 +572,60 @@ class AsyncTonCenterClientV3(Multicallable, AsyncRequestor):
             sleep_time = max(0, req.interval - elapse)
             await asyncio.sleep(sleep_time)
 
+    async def _trace_children(self, root: Transaction, sort: Literal["none", "asc", "desc"]) -> List[TransactionTrace]:
+        next_txs, _ = await self.get_adjacent_transactions(GetAdjacentTransactionsRequest(hash=root.hash, direction="out", limit=256, sort=sort, full=True))
+        results = await self.multicall([self._trace_children(tx, sort) for tx in next_txs])
+        return [TransactionTrace(id=tx.hash, transaction=tx, children=results[i]) for i, tx in enumerate(next_txs)]
+
+    async def _extend_trace(self, trace: TransactionTrace, sort: Literal["none", "asc", "desc"]) -> None:
+        """
+        Fetch the missing children of the pending nodes of a partial trace, the subtrees we already have are reused.
+        """
+
+        async def _extend_node(node: TransactionTrace):
+            next_txs, _ = await self.get_adjacent_transactions(GetAdjacentTransactionsRequest(hash=node.transaction.hash, direction="out", limit=256, sort=sort, full=True))
+            known = {normalize_hash(child.transaction.hash): child for child in node.children}
+            missing = [tx for tx in next_txs if normalize_hash(tx.hash) not in known]
+            results = await self.multicall([self._trace_children(tx, sort) for tx in missing])
+            subtrees = {tx.hash: results[i] for i, tx in enumerate(missing)}
+            node.children = [known.get(normalize_hash(tx.hash)) or TransactionTrace(id=tx.hash, transaction=tx, children=subtrees[tx.hash]) for tx in next_txs]
+
+        pending = [node for node in iter_trace_nodes(trace) if is_pending(node)]
+        await self.multicall([_extend_node(node) for node in pending])
+
     async def get_trace_alternative(self, req: GetTransactionTraceRequest) -> TransactionTrace:
         """
         get_trace_alternatives takes a transaction hash as input and returns the transaction trace.
+        If the client has a trace store, traces are cached in it and partial traces are extended instead of rebuilt.
 
         # Note
         This is an alternative method to get the transaction trace. It is not recommended to use this method in production unless the
         original method does not work. It is compatible with the original method, but it may not be as efficient as it.
         """
+        store = self.trace_store
+
+        async def _cached(trace: TransactionTrace) -> TransactionTrace:
+            if any(is_pending(node) for node in iter_trace_nodes(trace)):
+                await self._extend_trace(trace, req.sort)
+                store.put(trace)  # type: ignore
+            return trace
+
+        if store is not None:
+            cached = store.get(req.hash)
+            if cached is not None:
+                return await _cached(cached)
 
         # Trace source of the transaction
-        async def _trace_source(orig_tx: Transaction) -> Transaction:
+        async def _trace_source(orig_tx: Transaction) -> Union[Transaction, TransactionTrace]:
             """
             Find the source of the transaction, and return all the transaction that we found.
             External message are always the source of the transaction.
+            If a transaction on the way belongs to a stored trace, the stored trace is returned instead.
 
             Returns
             -------
-            Transaction
-                The source transaction
+            Union[Transaction, TransactionTrace]
+                The source transaction or the stored trace
             """
             current_tx = orig_tx
             while current_tx.in_msg.source is not None:
@@ -480,15 +639,105 @@ class AsyncTonCenterClientV3(Multicallable, AsyncRequestor):
                 assert len(candidates) == 1, f"Expecting to find one transaction by message hash {current_tx.in_msg.hash}, but found {len(candidates)}"
                 prev_tx = candidates[0]
                 current_tx = prev_tx
+                if store is not None and current_tx.hash in store:
+                    return store.get(current_tx.hash)  # type: ignore
             return current_tx
 
-        async def _dfs_trace(root: Transaction, trace_id: str) -> List[TransactionTrace]:
-            next_txs, _ = await self.get_adjacent_transactions(GetAdjacentTransactionsRequest(hash=root.hash, direction="out", limit=256, sort=req.sort, full=True))
-            results = await self.multicall([_dfs_trace(tx, trace_id) for tx in next_txs])
-            return [TransactionTrace(id=tx.hash, transaction=tx, children=results[i]) for i, tx in enumerate(next_txs)]
+        orig_tx, _ = await self.get_transactions(GetTransactionByHashRequest(hash=req.hash))
+        assert orig_tx is not None, f"The original transaction {req.hash} does not exist"
+        source = await _trace_source(orig_tx=orig_tx)
+        if isinstance(source, TransactionTrace):
+            return await _cached(source)
+        children = await self._trace_children(source, req.sort)
+        trace = TransactionTrace(id=source.hash, transaction=source, children=children)
+        if store is not None:
+            store.put(trace)
+        return trace
+
+    async def iter_trace(self, req: GetTransactionTraceRequest) -> AsyncGenerator[TraceEdge, None]:
+        """
+        iter_trace takes a transaction hash as input and yields the edges (parent transaction hash, transaction) of its trace
+        as soon as each hop resolves, instead of waiting for the whole tree like `get_trace_alternative`.
+        The root transaction is yielded with None as the parent hash. Use `pytoncenter.v3.trace.build_trace` to assemble the trace.
+
+        The trace is explored from the given transaction in both directions at the same time, so the first edges arrive
+        right after the first adjacent transactions are resolved, and edges are not guaranteed to arrive in tree order.
+
+        Example
+        -------
+        ```python
+        builder = TraceBuilder()
+        async for parent_hash, tx in client.iter_trace(GetTransactionTraceRequest(hash=tx_hash)):
+            builder.add(parent_hash, tx)
+        trace = builder.build(sort="asc")
+        ```
+        """
+        store = self.trace_store
+        if store is not None:
+            cached = store.get(req.hash)
+            if cached is not None and not any(is_pending(node) for node in iter_trace_nodes(cached)):
+                parents: Dict[str, Optional[str]] = {cached.transaction.hash: None}
+                for node in iter_trace_nodes(cached):
+                    for child in node.children:
+                        parents[child.transaction.hash] = node.transaction.hash
+                    yield parents[node.transaction.hash], node.transaction
+                return
+
+        queue: asyncio.Queue = asyncio.Queue()
+        tasks: Set[asyncio.Future] = set()
+        done = object()
+        running = 0
+
+        def _on_done(task: asyncio.Future):
+            tasks.discard(task)
+            if task.cancelled():
+                return
+            exc = task.exception()
+            queue.put_nowait(exc if exc is not None else done)
+
+        def _spawn(coro):
+            nonlocal running
+            running += 1
+            task = asyncio.ensure_future(coro)
+            tasks.add(task)
+            task.add_done_callback(_on_done)
+
+        async def _descend(tx: Transaction, skip: Optional[str] = None):
+            next_txs, _ = await self.get_adjacent_transactions(GetAdjacentTransactionsRequest(hash=tx.hash, direction="out", limit=256, sort=req.sort, full=True))
+            for next_tx in next_txs:
+                if next_tx.hash == skip:
+                    continue
+                queue.put_nowait((tx.hash, next_tx))
+                _spawn(_descend(next_tx))
+
+        async def _ascend(tx: Transaction):
+            candidates, _ = await self.get_adjacent_transactions(GetAdjacentTransactionsRequest(hash=tx.hash, direction="in", limit=1))
+            assert len(candidates) == 1, f"Expecting to find one transaction by message hash {tx.in_msg.hash}, but found {len(candidates)}"
+            prev_tx = candidates[0]
+            queue.put_nowait((prev_tx.hash, tx))
+            _spawn(_descend(prev_tx, skip=tx.hash))
+            if prev_tx.in_msg.source is None:
+                queue.put_nowait((None, prev_tx))
+            else:
+                _spawn(_ascend(prev_tx))
 
         orig_tx, _ = await self.get_transactions(GetTransactionByHashRequest(hash=req.hash))
         assert orig_tx is not None, f"The original transaction {req.hash} does not exist"
-        source_tx = await _trace_source(orig_tx=orig_tx)
-        children = await _dfs_trace(source_tx, source_tx.hash)
-        return TransactionTrace(id=source_tx.hash, transaction=source_tx, children=children)
+        if orig_tx.in_msg.source is None:
+            yield None, orig_tx
+        else:
+            _spawn(_ascend(orig_tx))
+        _spawn(_descend(orig_tx))
+
+        try:
+            while running > 0:
+                item = await queue.get()
+                if item is done:
+                    running -= 1
+                elif isinstance(item, BaseException):
+                    raise item
+                else:
+                    yield item
+        finally:
+            for task in list(tasks):
+                task.cancel()
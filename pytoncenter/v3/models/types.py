@@ -6,7 +6,7 @@ from pydantic.json_schema import JsonSchemaValue
 from pydantic_core import core_schema
 from typing_extensions import Annotated
 
-from pytoncenter.address import Address
+from pytoncenter.address import Address, parse_address
 
 PyDatetime = Annotated[
     datetime,
@@ -23,14 +23,14 @@ class _AddressTypeAnnotation:
         _handler: Callable[[Any], core_schema.CoreSchema],
     ) -> core_schema.CoreSchema:
         """
-        - str will be parsed as Address
+        - str will be parsed as Address, interned by the process wide address cache
         - Address type will be parsed as Address without any changes
         - Nothing else will pass validation
         - Serialization will always return just an str
         """
 
         def validate_from_str(value: str) -> Address:
-            return Address(value)
+            return parse_address(value)
 
         from_str_schema = core_schema.chain_schema(
             [
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import base64
+import binascii
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Literal, Optional, Tuple
+
+from pytoncenter.v3.models import Transaction, TransactionTrace
+
+__all__ = [
+    "normalize_hash",
+    "iter_trace_nodes",
+    "is_pending",
+    "pending_nodes",
+    "TraceStore",
+    "TraceEdge",
+    "TraceBuilder",
+    "build_trace",
+]
+
+TraceEdge = Tuple[Optional[str], Transaction]
+"""
+An edge of a transaction trace, (parent transaction hash, transaction). The parent hash of the root transaction is None.
+"""
+
+
+def normalize_hash(tx_hash: str) -> str:
+    """
+    Normalize a transaction hash in hex, base64 or base64url form to the base64 form used by `Transaction.hash`
+    """
+    if len(tx_hash) == 64:
+        try:
+            return base64.b64encode(bytes.fromhex(tx_hash)).decode()
+        except ValueError:
+            pass
+    _hash = tx_hash.replace("-", "+").replace("_", "/")
+    try:
+        return base64.b64encode(base64.b64decode(_hash + "=" * (-len(_hash) % 4))).decode()
+    except binascii.Error:
+        raise ValueError(f"Invalid transaction hash {tx_hash}")
+
+
+def iter_trace_nodes(trace: TransactionTrace) -> Iterator[TransactionTrace]:
+    """
+    Iterate over every node of the trace in depth-first pre-order without recursion
+    """
+    stack = [trace]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(node.children))
+
+
+def is_pending(node: TransactionTrace) -> bool:
+    """
+    A node is pending when it sent more internal messages than the children we have found for it,
+    which means the rest of the trace was not indexed yet when the node was fetched.
+    """
+    expected = sum(1 for msg in node.transaction.out_msgs if msg.destination is not None)
+    return len(node.children) < expected
+
+
+def pending_nodes(trace: TransactionTrace) -> List[TransactionTrace]:
+    return [node for node in iter_trace_nodes(trace) if is_pending(node)]
+
+
+class TraceStore:
+    """
+    TraceStore caches built transaction traces and indexes the hash of every member transaction to the trace id,
+    so that looking up any transaction of an already known trace is a local hit.
+    Traces are evicted in least recently used order once `maxsize` traces are stored.
+
+    Example
+    -------
+    ```python
+    store = TraceStore(maxsize=1024)
+    client = get_client(version="v3", network="mainnet", trace_store=store)
+    trace = await client.get_trace_alternative(GetTransactionTraceRequest(hash=tx_hash))
+    ```
+    """
+
+    def __init__(self, maxsize: int = 128) -> None:
+        assert maxsize > 0, "maxsize must be greater than 0"
+        self.maxsize = maxsize
+        self._traces: OrderedDict[str, TransactionTrace] = OrderedDict()
+        self._members: Dict[str, List[str]] = {}
+        self._index: Dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._traces)
+
+    def __contains__(self, tx_hash: str) -> bool:
+        return normalize_hash(tx_hash) in self._index
+
+    def trace_id(self, tx_hash: str) -> Optional[str]:
+        """
+        trace_id returns the id of the trace that contains the transaction, or None if it is unknown
+        """
+        return self._index.get(normalize_hash(tx_hash))
+
+    def get(self, tx_hash: str) -> Optional[TransactionTrace]:
+        """
+        get returns the whole trace that contains the transaction, or None if it is unknown
+        """
+        trace_id = self.trace_id(tx_hash)
+        if trace_id is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._traces.move_to_end(trace_id)
+        return self._traces[trace_id]
+
+    def put(self, trace: TransactionTrace) -> None:
+        """
+        put stores the trace and indexes all of its member transactions. Storing a trace with a known id replaces the old one,
+        which is how extended partial traces are written back.
+        """
+        trace_id = normalize_hash(trace.id)
+        self.discard(trace_id)
+        members = [normalize_hash(node.transaction.hash) for node in iter_trace_nodes(trace)]
+        for member in members:
+            self._index[member] = trace_id
+        self._members[trace_id] = members
+        self._traces[trace_id] = trace
+        while len(self._traces) > self.maxsize:
+            oldest, _ = self._traces.popitem(last=False)
+            self._unindex(oldest)
+
+    def discard(self, trace_id: str) -> None:
+        trace_id = normalize_hash(trace_id)
+        if self._traces.pop(trace_id, None) is not None:
+            self._unindex(trace_id)
+
+    def clear(self) -> None:
+        self._traces.clear()
+        self._members.clear()
+        self._index.clear()
+
+    def _unindex(self, trace_id: str) -> None:
+        for member in self._members.pop(trace_id, []):
+            if self._index.get(member) == trace_id:
+                del self._index[member]
+
+
+class TraceBuilder:
+    """
+    TraceBuilder assembles a `TransactionTrace` from edges that arrive in any order, e.g. the edges yielded by `iter_trace`.
+    A child may be added before its parent, the tree is linked when `build` is called.
+    """
+
+    def __init__(self) -> None:
+        self._txs: Dict[str, Transaction] = {}
+        self._children: Dict[str, List[str]] = {}
+        self._root: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self._txs)
+
+    def add(self, parent_hash: Optional[str], tx: Transaction) -> None:
+        if tx.hash in self._txs:
+            return
+        self._txs[tx.hash] = tx
+        if parent_hash is None:
+            self._root = tx.hash
+        else:
+            self._children.setdefault(parent_hash, []).append(tx.hash)
+
+    def build(self, sort: Literal["none", "asc", "desc"] = "none") -> TransactionTrace:
+        """
+        build links the received edges into a trace. Siblings keep their arrival order unless sort is "asc" or "desc",
+        in which case they are ordered by lt like `get_trace_alternative` does.
+        """
+        assert self._root is not None, "The root transaction has not been received yet"
+        nodes = {h: TransactionTrace(id=h, transaction=tx) for h, tx in self._txs.items()}
+        for parent_hash, child_hashes in self._children.items():
+            parent = nodes.get(parent_hash)
+            if parent is None:
+                continue
+            children = [nodes[h] for h in child_hashes]
+            if sort != "none":
+                children.sort(key=lambda node: node.transaction.lt, reverse=sort == "desc")
+            parent.children = children
+        return nodes[self._root]
+
+
+def build_trace(edges: Iterable[TraceEdge], sort: Literal["none", "asc", "desc"] = "none") -> TransactionTrace:
+    """
+    build_trace assembles a `TransactionTrace` from a collection of trace edges
+    """
+    builder = TraceBuilder()
+    for parent_hash, tx in edges:
+        builder.add(parent_hash, tx)
+    return builder.build(sort)
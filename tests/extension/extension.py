@@ -1,8 +1,29 @@
-from tonpy import CellSlice
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+from tonpy import CellSlice, begin_cell
 
 from pytoncenter.address import Address
-from pytoncenter.extension.message import JettonMessage
+from pytoncenter.extension.message import (
+    BaseMessage,
+    JettonMessage,
+    MessageBuilder,
+    MessageRegistry,
+    NFTMessage,
+    ParsedMessageCache,
+    RawMessage,
+    SBTMessage,
+    message_registry,
+)
+from pytoncenter.extension.parallel import ParallelMessageDecoder, compact_message
 from pytoncenter.utils import encode_base64
+from pytoncenter.v3.models import Message, MessageContent, Transaction, TransactionTrace
+
+TRANSFER_BODY = encode_base64(
+    "b5ee9c720101020100a10001ad0f8a7ea5000000000000000034c4b3f8017bc28408f06d3fc030d138584d9fcb47783984a2c899f8ac8a2fda3678a085fd000a5d50c10e52e1e7068f9149d6e2924659dea588b592dd5e3c9f7fd94dfde4b94973eed80101008a010000000000000000000000000000000000000000000000000000000000000016000000010000000000000000000000000000000000000000000000000147ae147ae147ae"
+)
+EXCESS_BODY = encode_base64("b5ee9c7201010101000e000018d53276db0000000000000000")
 
 
 class TestJettonParse:
@@ -25,6 +46,14 @@ class TestJettonParse:
         assert oralce_opcode == 1  # Tick Message
         assert expire_at != 0
 
+    def test_jetton_internal_transfer_amount_is_unsigned(self):
+        sender = Address("0:29754304394b879c1a3e45275b8a4919677a9622d64b7578f27dff6537f792e5").to_string(True)
+        body = begin_cell().store_uint(0x178D4519, 32).store_uint(1, 64).store_grams(200).store_address(sender).store_address(sender)
+        body = body.store_grams(10**7).store_uint(0, 1).end_cell()
+        for lazy in (False, True):
+            msg = JettonMessage.InternalTransfer.parse(body.begin_parse(), lazy=lazy)
+            assert msg.amount == 200 and msg.forward_ton_amount == 10**7 and msg.forward_payload is None
+
     def test_jetton_excess(self):
         # https://testnet.tonviewer.com/transaction/ee014cc0d95cd5589951956b11095de7dcb6288a126397a55f789a962f3d815f
         raw_body = encode_base64("b5ee9c7201010101000e000018d53276db0000000000000000")
@@ -46,3 +75,253 @@ class TestJettonParse:
         assert msg.custom_payload == None
         assert msg.forward_ton_amount == 3120000000
         assert msg.forward_payload is not None
+
+    def test_lazy_fields(self):
+        msg = JettonMessage.Transfer.parse(CellSlice(TRANSFER_BODY), lazy=True)
+        assert msg.is_lazy and msg.amount == 4999999 and msg.query_id == 0
+        # the addresses after the amount are not decoded yet
+        assert "destination" not in vars(msg) and msg.is_lazy
+        assert msg.response_destination == Address("0QApdUMEOUuHnBo-RSdbikkZZ3qWItZLdXjyff9lN_eS5Zib")
+        assert "destination" in vars(msg) and "forward_payload" not in vars(msg)
+        assert msg.fields() == {**JettonMessage.Transfer.parse(CellSlice(TRANSFER_BODY)).fields(), "forward_payload": msg.forward_payload}
+        assert not msg.is_lazy and msg.forward_payload is not None
+
+        registry = MessageRegistry(JettonMessage.Transfer, JettonMessage.Excess, lazy=True)
+        assert registry.parse(EXCESS_BODY).is_lazy and not registry.parse(EXCESS_BODY, lazy=False).is_lazy
+        # a malformed lazy body fails on the broken field instead of falling back to a RawMessage
+        broken = registry.parse(begin_cell().store_uint(0x0F8A7EA5, 32).store_uint(1, 64).store_uint(0, 4).store_uint(1, 2).end_cell().to_boc())
+        assert broken.query_id == 1 and broken.amount == 0
+        with pytest.raises(Exception):
+            broken.destination
+
+
+def message(body, opcode=None, body_hash="") -> Message:
+    content = MessageContent.model_construct(hash=body_hash, body=body, decoded=None) if body is not None else None
+    return Message.model_construct(opcode=opcode, message_content=content)
+
+
+class TestMessageRegistry:
+    def test_subclasses_are_registered(self):
+        assert message_registry.get(0x0F8A7EA5) is JettonMessage.Transfer
+        assert JettonMessage.Transfer.OPCODE_INT == 0x0F8A7EA5
+        assert all(message_registry.get(cls.OPCODE_INT) is cls for cls in (JettonMessage.Excess, JettonMessage.Burn, JettonMessage.BurnNotification))
+
+        class Private(BaseMessage["Private"], register=False):
+            OPCODE = "0x12345678"
+
+            def __init__(self, value: int):
+                self.value = value
+
+            @classmethod
+            def _parse(cls, body: CellSlice):
+                return cls(body.load_uint(8))
+
+        assert 0x12345678 not in message_registry
+        registry = MessageRegistry(Private)
+        assert registry.parse(begin_cell().store_uint(0x12345678, 32).store_uint(7, 8).end_cell().begin_parse()).value == 7
+        with pytest.raises(ValueError):
+            registry.register(type("Clash", (Private,), {}))
+        registry.unregister(Private)
+        assert len(registry) == 0
+
+    def test_parse_and_fallback(self):
+        msg = message_registry.parse(TRANSFER_BODY)
+        assert isinstance(msg, JettonMessage.Transfer) and msg.amount == 4999999
+        assert message_registry.parse(CellSlice(EXCESS_BODY)).query_id == 0
+
+        unknown = message_registry.parse(begin_cell().store_uint(0xDEADBEEF, 32).end_cell().begin_parse())
+        assert isinstance(unknown, RawMessage) and unknown.opcode == 0xDEADBEEF and unknown.error is None
+        short = message_registry.parse(begin_cell().store_uint(1, 8).end_cell().begin_parse())
+        assert isinstance(short, RawMessage) and short.opcode is None
+
+        # a transfer opcode followed by garbage
+        broken = begin_cell().store_uint(0x0F8A7EA5, 32).store_uint(1, 8).end_cell().to_boc()
+        raw = message_registry.parse(broken)
+        assert isinstance(raw, RawMessage) and raw.error and raw.body == broken and raw.cell_slice.preload_uint(32) == 0x0F8A7EA5
+
+    def test_parse_transactions(self):
+        tx = Transaction.model_construct(
+            hash="a",
+            in_msg=message(TRANSFER_BODY, "0x0f8a7ea5"),
+            out_msgs=[message(EXCESS_BODY), message(None), message("not a boc", "0x00000000")],
+        )
+        [item] = message_registry.parse_transactions([tx])
+        assert item["transaction"] is tx
+        assert isinstance(item["in_msg"], JettonMessage.Transfer)
+        excess, empty, comment = item["out_msgs"]
+        assert isinstance(excess, JettonMessage.Excess) and empty is None
+        # the opcode reported by the API is not registered, the body is not parsed
+        assert isinstance(comment, RawMessage) and comment.opcode == 0 and comment.body == "not a boc"
+
+
+OWNER = Address("0:29754304394b879c1a3e45275b8a4919677a9622d64b7578f27dff6537f792e5")
+COLLECTION = Address("kQC94UIEeDaf4BhonCwmz-WjvBzCUWRM_FZFF-0bPFBC_pDZ")
+
+
+def body(opcode: int, query_id: int = 7):
+    return begin_cell().store_uint(opcode, 32).store_uint(query_id, 64)
+
+
+class TestNFTMessages:
+    def test_nft_transfer_and_ownership_assigned(self):
+        payload = begin_cell().store_uint(0, 32).store_string("gift").end_cell()
+        transfer = body(0x5FCC3D14).store_address(OWNER.to_string(True)).store_uint(0, 2).store_uint(0, 1).store_grams(10**7).store_uint(1, 1).store_ref(payload)
+        msg = message_registry.parse(transfer.end_cell().to_boc())
+        assert isinstance(msg, NFTMessage.Transfer)
+        assert (msg.query_id, msg.new_owner, msg.response_destination, msg.custom_payload, msg.forward_amount) == (7, OWNER, None, None, 10**7)
+        assert msg.forward_payload.load_uint(32) == 0
+
+        # minted items have no previous owner
+        assigned = message_registry.parse(body(0x05138D91).store_uint(0, 2).store_uint(0, 1).end_cell().to_boc())
+        assert isinstance(assigned, NFTMessage.OwnershipAssigned) and assigned.prev_owner is None and assigned.forward_payload is None
+
+    def test_static_data_and_excesses(self):
+        assert isinstance(message_registry.parse(body(0x2FCB26A2).end_cell().to_boc()), NFTMessage.GetStaticData)
+        report = message_registry.parse(body(0x8B771735).store_uint(42, 256).store_address(COLLECTION.to_string(True)).end_cell().to_boc())
+        assert isinstance(report, NFTMessage.ReportStaticData) and (report.index, report.collection) == (42, COLLECTION)
+
+        # excesses of items and jetton wallets share the opcode, the jetton parser is the one registered
+        assert message_registry.get(NFTMessage.Excess.OPCODE_INT) is JettonMessage.Excess
+        registry = MessageRegistry(JettonMessage.Excess)
+        registry.register(NFTMessage.Excess, replace=True)
+        assert isinstance(registry.parse(EXCESS_BODY), NFTMessage.Excess)
+
+    def test_sbt(self):
+        data = begin_cell().store_uint(1, 8).end_cell()
+        prove = message_registry.parse(body(0x04DED148).store_address(COLLECTION.to_string(True)).store_ref(data).store_uint(1, 1).end_cell().to_boc())
+        assert isinstance(prove, SBTMessage.ProveOwnership) and prove.dest == COLLECTION and prove.with_content
+
+        info = body(0x0DD607E3).store_uint(3, 256).store_address(COLLECTION.to_string(True)).store_address(OWNER.to_string(True))
+        info = message_registry.parse(info.store_ref(data).store_uint(0, 64).store_uint(1, 1).store_ref(data).end_cell().to_boc(), lazy=True)
+        assert isinstance(info, SBTMessage.OwnerInfo) and info.item_id == 3 and info.is_lazy
+        assert (info.initiator, info.owner, info.revoked_at, info.content.load_uint(8)) == (COLLECTION, OWNER, 0, 1)
+
+        for opcode, cls in ((0x0524C7AE, SBTMessage.OwnershipProof), (0xD0C3BFEA, SBTMessage.RequestOwner), (0x1F04537A, SBTMessage.Destroy), (0x6F89F5E3, SBTMessage.Revoke)):
+            assert message_registry.get(opcode) is cls
+
+
+class TestMessageBuilder:
+    def test_jetton_messages_round_trip(self):
+        payload = begin_cell().store_uint(0, 32).store_string("payout").end_cell()
+        messages = [
+            JettonMessage.Transfer(1, 10**9, COLLECTION, None, None, 1, payload),
+            JettonMessage.InternalTransfer(2, 5, OWNER, OWNER, 0, None),
+            JettonMessage.Excess(3),
+            JettonMessage.TransferNotification(4, 5, OWNER, CellSlice(payload.to_boc())),
+            JettonMessage.Burn(5, 6, OWNER, payload.to_boc()),
+            JettonMessage.BurnNotification(6, 7, OWNER, COLLECTION),
+        ]
+        for msg, boc in zip(messages, MessageBuilder().build_many(messages)):
+            parsed = message_registry.parse(boc)
+            assert type(parsed) is type(msg) and boc == msg.to_boc()
+            for name, value in msg.fields().items():
+                expected = parsed.fields()[name]
+                if isinstance(expected, CellSlice):
+                    assert expected.to_boc() == payload.begin_parse().to_boc()
+                else:
+                    assert expected == value
+
+        # a body following TL-B is rebuilt bit for bit
+        transfer = body(0x0F8A7EA5).store_grams(10).store_address(COLLECTION.to_string(True)).store_address(OWNER.to_string(True))
+        transfer = transfer.store_uint(1, 1).store_ref(payload).store_grams(1).store_uint(1, 1).store_ref(payload).end_cell().to_boc()
+        assert message_registry.parse(transfer, lazy=True).to_boc() == transfer
+
+    def test_internal_transfer_matches_tlb(self):
+        # built by hand following TEP-74, amount:(VarUInteger 16) is unsigned
+        expected = begin_cell().store_uint(0x178D4519, 32).store_uint(9, 64).store_grams(200).store_address(OWNER.to_string(True))
+        expected = expected.store_address(COLLECTION.to_string(True)).store_grams(10**7).store_uint(0, 1).end_cell()
+        msg = JettonMessage.InternalTransfer(9, 200, OWNER, COLLECTION, 10**7, None)
+        assert msg.to_cell().get_hash() == expected.get_hash()
+        assert MessageBuilder().build_many([msg]) == [expected.to_boc()]
+
+    def test_cache(self):
+        builder = MessageBuilder(maxsize=2)
+        payload = CellSlice(begin_cell().store_uint(0, 32).end_cell().to_boc())
+        builder.build_many([JettonMessage.TransferNotification(i, i, OWNER, payload) for i in range(10)])
+        assert len(builder) == 2 and builder.cell(payload) is builder.cell(payload)
+        with pytest.raises(NotImplementedError):
+            builder.to_cell(RawMessage(1, payload))
+
+
+class TestParsedMessageCache:
+    def test_trace_bodies_are_parsed_once(self):
+        registry = MessageRegistry(JettonMessage.Transfer, JettonMessage.Excess, cache=ParsedMessageCache(maxsize=8))
+        root = Transaction.model_construct(hash="root", in_msg=message(TRANSFER_BODY, body_hash="t"), out_msgs=[message(EXCESS_BODY, body_hash="e")])
+        child = Transaction.model_construct(hash="child", in_msg=message(EXCESS_BODY, body_hash="e"), out_msgs=[])
+        trace = TransactionTrace.model_construct(id="root", transaction=root, children=[TransactionTrace.model_construct(id="root", transaction=child, children=[])])
+
+        items = registry.parse_trace(trace)
+        assert [item["transaction"].hash for item in items] == ["root", "child"]
+        assert isinstance(items[1]["in_msg"], JettonMessage.Excess) and items[0]["out_msgs"][0].fields() == items[1]["in_msg"].fields()
+        assert registry.cache.cache_info() == {"hits": 1, "misses": 2, "maxsize": 8, "currsize": 2, "hit_rate": 1 / 3}
+
+        again = registry.parse_trace(trace)
+        assert again[0]["in_msg"].amount == items[0]["in_msg"].amount and registry.cache.hits == 4
+
+        # registering a parser invalidates the parsed bodies
+        registry.register(JettonMessage.Burn)
+        assert len(registry.cache) == 0
+
+    def test_hits_do_not_share_payloads(self):
+        registry = MessageRegistry(JettonMessage.Transfer, cache=ParsedMessageCache())
+        first = registry.parse_message(message(TRANSFER_BODY, body_hash="t"))
+        expected = CellSlice(first.forward_payload.to_boc()).load_uint(8)
+        # the usual parse then load, which consumes the payload of this result only
+        assert first.forward_payload.load_uint(8) == expected
+        second = registry.parse_message(message(TRANSFER_BODY, body_hash="t"))
+        assert registry.cache.hits == 1 and second is not first
+        assert second.forward_payload.load_uint(8) == expected
+        third = registry.parse_message(message(TRANSFER_BODY, body_hash="t"))
+        assert third.forward_payload.bits == first.forward_payload.bits + 8
+
+    def test_eviction(self):
+        cache = ParsedMessageCache(maxsize=2)
+        registry = MessageRegistry(JettonMessage.Excess, cache=cache)
+        for body_hash in ("a", "b", "a", "c"):
+            registry.parse_message(message(EXCESS_BODY, body_hash=body_hash))
+        assert "a" in cache and "c" in cache and "b" not in cache
+        # bodies without a hash are not cached
+        registry.parse_message(message(EXCESS_BODY))
+        assert len(cache) == 2 and cache.misses == 3
+
+
+class TestParallelMessageDecoder:
+    def test_compact_message(self):
+        parsed = compact_message(message_registry.parse(TRANSFER_BODY))
+        assert parsed["type"] == "JettonMessage.Transfer" and parsed["opcode"] == 0x0F8A7EA5 and parsed["error"] is None
+        assert parsed["fields"]["destination"] == Address("kQC94UIEeDaf4BhonCwmz-WjvBzCUWRM_FZFF-0bPFBC_pDZ").to_string(False)
+        assert isinstance(parsed["fields"]["forward_payload"], str) and parsed["fields"]["custom_payload"] is None
+        assert pickle.loads(pickle.dumps(parsed)) == parsed
+
+    @pytest.mark.asyncio
+    async def test_stream_keeps_order_with_backpressure(self):
+        unknown = begin_cell().store_uint(0xDEADBEEF, 32).end_cell().to_boc()
+        bodies = [[TRANSFER_BODY, EXCESS_BODY, None, unknown][i % 4] for i in range(203)]
+        pulled = 0
+
+        async def fetch():
+            nonlocal pulled
+            for i, body in enumerate(bodies):
+                pulled += 1
+                yield i, body
+
+        decoder = ParallelMessageDecoder(executor=ProcessPoolExecutor(max_workers=2), chunksize=10, max_pending=2)
+        try:
+            consumed = 0
+            async for (i, body), parsed in decoder.stream(fetch(), body=lambda item: item[1]):
+                assert i == consumed
+                consumed += 1
+                # at most the chunk being filled and the pending chunks are ahead of the consumer
+                assert pulled <= consumed + 10 * 3
+                expected = [("JettonMessage.Transfer", 0x0F8A7EA5), ("JettonMessage.Excess", 0xD53276DB), None, ("RawMessage", 0xDEADBEEF)][i % 4]
+                if expected is None:
+                    assert parsed is None
+                else:
+                    assert (parsed["type"], parsed["opcode"]) == expected
+            assert consumed == 203
+
+            decoded = await decoder.decode([EXCESS_BODY, unknown])
+            assert [p["type"] for p in decoded] == ["JettonMessage.Excess", "RawMessage"]
+            assert decoded[1]["fields"]["body"] == unknown
+        finally:
+            decoder._executor.shutdown()
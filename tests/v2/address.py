@@ -1,14 +1,53 @@
 import asyncio
+import base64
+import itertools
+import os
+import pickle
+import random
 from typing import Union
 
 import pytest
 
-from pytoncenter.address import Address
+from pytoncenter.address import (
+    Address,
+    AddressBatch,
+    AddressCache,
+    AddressIndex,
+    AddressSet,
+    address_cache,
+    convert_addresses,
+    crc16,
+    crc16_many,
+    parse_addresses,
+)
 from pytoncenter.v2.api import AsyncTonCenterClientV2
+from pytoncenter.v3.models import JettonBurn
 
 pytest_plugins = ("pytest_asyncio",)
 
 
+def bitwise_crc16(data) -> bytearray:
+    """
+    The original bit by bit CRC16 implementation, kept as the reference of the fast one
+    """
+    POLY = 0x1021
+    reg = 0
+    message = bytes(data) + bytes(2)
+
+    for byte in message:
+        mask = 0x80
+        while mask > 0:
+            reg <<= 1
+            if byte & mask:
+                reg += 1
+            mask >>= 1
+            if reg > 0xFFFF:
+                reg &= 0xFFFF
+                reg ^= POLY
+
+    return bytearray([reg // 256, reg % 256])
+
+
 class TestAddress:
     client: AsyncTonCenterClientV2
 
@@ -53,3 +92,171 @@ class TestAddress:
             assert result["raw_form"] == Address(addr).to_string(is_user_friendly=False)
         else:
             assert result[form]["b64"] == Address(addr).to_string(is_user_friendly=True, is_test_only=False, is_bounceable=True)
+
+    def test_crc16_matches_reference(self):
+        rng = random.Random(0)
+        corpus = [os.urandom(34) for _ in range(5000)] + [os.urandom(rng.randint(0, 128)) for _ in range(1000)]
+        for chunk in corpus:
+            assert crc16(chunk) == bitwise_crc16(chunk)
+        assert crc16_many(corpus) == [bytes(bitwise_crc16(chunk)) for chunk in corpus]
+
+    def test_canonical_hash_and_eq(self):
+        forms = [
+            "0:2b790db779a6e344ee6094b09b859e0ac50f523888edc3678cd8fb845d784865",
+            "kQAreQ23eabjRO5glLCbhZ4KxQ9SOIjtw2eM2PuEXXhIZeh3",
+            "0QAreQ23eabjRO5glLCbhZ4KxQ9SOIjtw2eM2PuEXXhIZbWy",
+        ]
+        addrs = [Address(form) for form in forms]
+        assert len(set(addrs)) == 1
+        assert all(addr.key == bytes(1) + bytes.fromhex(forms[0][2:]) for addr in addrs)
+        assert {addrs[0]: "x"}[addrs[2]] == "x"
+        assert all(addr == form for addr in addrs for form in forms)
+        assert Address("-1:" + forms[0][2:]) != addrs[0]
+        assert Address("-1:" + forms[0][2:]).key[0] == 0xFF
+        assert addrs[0] != 1
+        assert not hasattr(addrs[0], "__dict__")
+        clone = pickle.loads(pickle.dumps(addrs[1]))
+        assert clone == addrs[1] and clone.to_string() == addrs[1].to_string()
+
+    def test_string_variants(self):
+        addr = Address("kQAreQ23eabjRO5glLCbhZ4KxQ9SOIjtw2eM2PuEXXhIZeh3")
+        assert isinstance(addr.hash_part, bytes)
+        for is_url_safe, is_bounceable, is_test_only in itertools.product([True, False], repeat=3):
+            friendly = addr.to_string(True, is_url_safe, is_bounceable, is_test_only)
+            assert friendly is addr.to_string(True, is_url_safe, is_bounceable, is_test_only)
+            parsed = Address(friendly)
+            assert parsed == addr
+            assert (parsed.is_user_friendly, parsed.is_bounceable, parsed.is_test_only) == (True, is_bounceable, is_test_only)
+            assert parsed.to_string() == friendly
+            assert addr.to_string(False, is_url_safe, is_bounceable, is_test_only) == "0:2b790db779a6e344ee6094b09b859e0ac50f523888edc3678cd8fb845d784865"
+        assert addr.to_string() == "kQAreQ23eabjRO5glLCbhZ4KxQ9SOIjtw2eM2PuEXXhIZeh3"
+        assert Address(addr).to_string(is_test_only=False) == "EQAreQ23eabjRO5glLCbhZ4KxQ9SOIjtw2eM2PuEXXhIZVP9"
+
+    def test_address_cache(self):
+        cache = AddressCache(maxsize=2)
+        forms = [
+            "0:2b790db779a6e344ee6094b09b859e0ac50f523888edc3678cd8fb845d784865",
+            "kQAreQ23eabjRO5glLCbhZ4KxQ9SOIjtw2eM2PuEXXhIZeh3",
+            "0QAreQ23eabjRO5glLCbhZ4KxQ9SOIjtw2eM2PuEXXhIZbWy",
+        ]
+        first = cache.get(forms[0])
+        assert cache.get(forms[0]) is first
+        assert cache.get(first) is first
+        # every input string keeps the flags it was parsed with
+        assert cache.get(forms[1]).to_string() == forms[1]
+        assert cache.get(forms[2]).is_bounceable is False
+        assert len(cache) == 2 and forms[0] not in cache
+        with pytest.raises(Exception):
+            cache.get("0:zz")
+        assert cache.cache_info() == {"hits": 1, "misses": 4, "maxsize": 2, "currsize": 2, "hit_rate": 0.2}
+        cache.clear()
+        assert len(cache) == 0 and cache.hit_rate == 0.0
+
+    def test_address_like_is_interned(self):
+        raw = "0:29754304394b879c1a3e45275b8a4919677a9622d64b7578f27dff6537f792e5"
+        fields = dict(query_id="0", transaction_hash="", transaction_lt="0", transaction_now=0, response_destination=None, custom_payload=None)
+        hits = address_cache.hits
+        a = JettonBurn(owner=raw, jetton_master=raw, **fields)
+        b = JettonBurn(owner=raw, jetton_master=raw, **fields)
+        assert a.owner is a.jetton_master is b.owner
+        assert address_cache.hits >= hits + 3
+        assert a.model_dump()["owner"] == "UQApdUMEOUuHnBo-RSdbikkZZ3qWItZLdXjyff9lN_eS5SMR"
+
+    def test_bulk_conversion(self):
+        rng = random.Random(1)
+        forms = []
+        for _ in range(500):
+            addr = Address(f"{rng.choice([0, -1])}:{os.urandom(32).hex()}")
+            forms.append(addr.to_string(*[rng.choice([True, False]) for _ in range(4)]))
+        forms.append(Address(forms[0]))
+        batch = parse_addresses(forms)
+        assert batch.errors == {}
+        flags = {
+            "raw": (False, False, False, False),
+            "bounceable": (True, False, True, False),
+            "non_bounceable_url": (True, True, False, False),
+            "bounceable_url_testnet": (True, True, True, True),
+        }
+        result = batch.encode(*flags)
+        for encoding, (is_user_friendly, is_url_safe, is_bounceable, is_test_only) in flags.items():
+            assert result[encoding] == [Address(form).to_string(is_user_friendly, is_url_safe, is_bounceable, is_test_only) for form in forms]
+        for i, form in enumerate(forms):
+            assert batch[i] == Address(form)
+            assert batch[i].to_string() == Address(form).to_string()
+        assert batch.crc16("bounceable") == [int.from_bytes(base64.b64decode(s)[34:], "big") for s in result["bounceable"]]
+
+    def test_bulk_errors(self):
+        good = "EQAreQ23eabjRO5glLCbhZ4KxQ9SOIjtw2eM2PuEXXhIZVP9"
+        forms = [good, "oops", good[:-1] + "A", "0:zz", good.replace("E", "=", 1), "1:" + "00" * 32]
+        batch = parse_addresses(forms)
+        assert sorted(batch.errors) == [1, 2, 3, 4, 5]
+        assert batch.errors[2] == "Wrong crc16 hashsum"
+        assert batch[0] == good and batch[2] is None
+        assert convert_addresses(forms, "raw")["raw"] == ["0:2b790db779a6e344ee6094b09b859e0ac50f523888edc3678cd8fb845d784865", None, None, None, None, None]
+
+    def test_bulk_padded_raw_row(self):
+        # bytes.fromhex skips whitespace, the padded row must not shift the hash parts of the other rows
+        bad = "0:  " + "ab" * 31
+        good = "0:2b790db779a6e344ee6094b09b859e0ac50f523888edc3678cd8fb845d784865"
+        friendly = "EQAreQ23eabjRO5glLCbhZ4KxQ9SOIjtw2eM2PuEXXhIZVP9"
+        batch = parse_addresses([bad, good, friendly])
+        assert list(batch.errors) == [0] and batch[0] is None
+        assert batch[1] == Address(good) and batch[2] == Address(friendly)
+        only_raw = parse_addresses([good, bad, "-1:" + "cd" * 32])
+        assert list(only_raw.errors) == [1]
+        assert only_raw.to_strings("raw") == [good, None, "-1:" + "cd" * 32]
+
+    def test_bulk_from_hash_parts(self):
+        hash_parts = os.urandom(32 * 3)
+        batch = AddressBatch.from_hash_parts(memoryview(hash_parts), [0, -1, 0])
+        assert batch.to_strings("raw") == [f"{wc}:{hash_parts[32 * i : 32 * i + 32].hex()}" for i, wc in enumerate([0, -1, 0])]
+        assert bytes(batch.hash_parts) == hash_parts
+        assert AddressBatch.from_hash_parts(hash_parts).to_strings("raw")[1].startswith("0:")
+        with pytest.raises(ValueError):
+            AddressBatch.from_hash_parts(hash_parts[:-1])
+        with pytest.raises(ValueError):
+            AddressBatch.from_hash_parts(hash_parts, [0, 1, 0])
+
+    @pytest.mark.parametrize("bloom_bits_per_key", [0, 10])
+    def test_address_set(self, bloom_bits_per_key, tmp_path):
+        members = [Address(f"{i % 2 * -1}:{os.urandom(32).hex()}") for i in range(2000)]
+        others = [f"0:{os.urandom(32).hex()}" for _ in range(2000)]
+        customers = AddressSet([m.to_string(True, True, True) for m in members] + members[:10], bloom_bits_per_key=bloom_bits_per_key)
+        assert len(customers) == 2000
+        assert all(m in customers for m in members)
+        assert all(m.to_string(False) in customers for m in members)
+        assert not any(o in customers for o in others)
+        # the same hash part on the other workchain is a different address
+        assert f"{-1 - members[0].wc}:{members[0].hash_part.hex()}" not in customers
+        assert "oops" not in customers and None not in customers
+        assert customers.contains_many(members[:3] + ["oops"] + others[:2]) == [True, True, True, False, False, False]
+        assert set(customers) == set(members)
+        with pytest.raises(ValueError):
+            AddressSet(["oops"])
+
+        path = str(tmp_path / "customers.addrs")
+        customers.save(path)
+        for use_mmap in (True, False):
+            loaded = AddressSet.load(path, use_mmap=use_mmap)
+            assert len(loaded) == 2000
+            assert loaded.contains_many(members) == [True] * 2000
+            assert loaded.contains_many(others) == [False] * 2000
+            loaded.close()
+
+    def test_address_index(self, tmp_path):
+        members = [f"0:{os.urandom(32).hex()}" for _ in range(100)]
+        index = AddressIndex(zip(members, range(100)), bloom_bits_per_key=8)
+        assert index[members[42]] == 42
+        assert index.get(Address(members[7]).to_string(True, True, True)) == 7
+        assert index.get("0:" + "00" * 32) is None and index.get("oops", -1) == -1
+        with pytest.raises(KeyError):
+            index["0:" + "00" * 32]
+        # like AddressSet, values which are not addresses are missing
+        assert index.get(None, -1) == -1 and index.get(b"\x00" * 33) is None and index.get(42, -1) == -1
+        with pytest.raises(KeyError):
+            index[None]
+        path = str(tmp_path / "index.addrs")
+        index.save(path)
+        loaded = AddressIndex.load(path)
+        assert loaded.get_many(members[::-1] + ["oops"]) == list(range(99, -1, -1)) + [None]
+        loaded.close()
@@ -0,0 +1,84 @@
+import pytest
+
+from pytoncenter.decoder import Decoder, Types
+from pytoncenter.exception import TonException
+from pytoncenter.getmethod import BulkProgress, GetMethodCache
+from pytoncenter.v2.api import AsyncTonCenterClientV2
+
+pytest_plugins = ("pytest_asyncio",)
+
+POOL = "EQAreQ23eabjRO5glLCbhZ4KxQ9SOIjtw2eM2PuEXXhIZVP9"
+
+
+class FakeGetMethodClient(AsyncTonCenterClientV2):
+    def __init__(self, **kwargs):
+        super().__init__(network="testnet", api_key="dummy", qps=1000, **kwargs)
+        self.lt = 1
+        self.calls = []
+
+    async def _async_get(self, handler, query=None):
+        assert handler == "getWalletInformation"
+        self.calls.append(handler)
+        return {"wallet": False, "balance": 0, "account_state": "active", "last_transaction_id": {"@type": "internal.transactionId", "lt": str(self.lt), "hash": ""}}
+
+    async def _async_post(self, handler, payload=None):
+        assert handler == "runGetMethod"
+        self.calls.append(handler)
+        return {"@type": "smc.runResult", "gas_used": 0, "stack": [["num", hex(self.lt)]], "exit_code": 0}
+
+
+class TestCachedRunGetMethod:
+    @pytest.mark.asyncio
+    async def test_results_are_reused_until_new_transaction(self):
+        client = FakeGetMethodClient(get_method_cache=GetMethodCache(ttl=60))
+        first = await client.run_get_method(POOL, "get_pool_data", [])
+        assert await client.run_get_method(POOL, "get_pool_data", []) is first
+        assert client.calls == ["getWalletInformation", "runGetMethod"]
+
+        client.lt = 2
+        assert await client.refresh_get_method_cache([POOL]) == 1
+        assert await client.run_get_method(POOL, "get_pool_data", []) == [{"type": "num", "value": "0x2"}]
+        assert client.calls == ["getWalletInformation", "runGetMethod", "getWalletInformation", "runGetMethod"]
+
+    @pytest.mark.asyncio
+    async def test_lt_moving_during_get_method(self):
+        client = FakeGetMethodClient(get_method_cache=GetMethodCache(ttl=60))
+        post = client._async_post
+
+        async def racing_post(handler, payload=None):
+            result = await post(handler, payload)
+            # a refresh sees a new transaction while the get method is in flight
+            client.lt = 2
+            await client.refresh_get_method_cache([POOL])
+            return result
+
+        client._async_post = racing_post
+        assert await client.run_get_method(POOL, "get_pool_data", []) == [{"type": "num", "value": "0x1"}]
+        assert client.get_method_cache.lt(POOL) == 2 and len(client.get_method_cache) == 0
+
+        client._async_post = post
+        assert await client.run_get_method(POOL, "get_pool_data", []) == [{"type": "num", "value": "0x2"}]
+
+
+class FlakyGetMethodClient(AsyncTonCenterClientV2):
+    def __init__(self):
+        super().__init__(network="testnet", api_key="dummy", qps=1000)
+        self.attempts = 0
+
+    async def _async_post(self, handler, payload=None):
+        self.attempts += 1
+        if self.attempts % 3 == 0:
+            raise TonException(502)
+        return {"@type": "smc.runResult", "gas_used": 0, "stack": [["num", hex(len(payload["stack"]))]], "exit_code": 0}
+
+
+class TestIterGetMethods:
+    @pytest.mark.asyncio
+    async def test_stream_with_retries(self):
+        client = FlakyGetMethodClient()
+        progress = BulkProgress()
+        calls = ((POOL, "get_pool_data", [["num", 1]] * (i % 3)) for i in range(30))
+        items = [item async for item in client.iter_get_methods(calls, decoder=Decoder(Types.Number("size")), max_concurrency=4, backoff=0, progress=progress)]
+        assert sorted(item["index"] for item in items) == list(range(30))
+        assert all(item["error"] is None and item["result"]["size"] == item["index"] % 3 for item in items)
+        assert progress.retries > 0 and progress.failed == 0
@@ -0,0 +1,104 @@
+import asyncio
+from typing import Dict, List, Tuple
+
+import aiohttp
+import pytest
+
+from pytoncenter.exception import TonException
+from pytoncenter.v2.api import AsyncTonCenterClientV2
+from pytoncenter.v2.types import Message, Tx
+
+pytest_plugins = ("pytest_asyncio",)
+
+
+def make_msg(source: str, destination: str, created_lt: int) -> Message:
+    return {"source": source, "destination": destination, "created_lt": str(created_lt), "value": "0"}  # type: ignore
+
+
+def make_tx(name: str, out_msgs: List[Message]) -> Tx:
+    return {"@type": "raw.transaction", "transaction_id": {"lt": 0, "hash": name}, "in_msg": {}, "out_msgs": out_msgs}  # type: ignore
+
+
+class FakeTraceClient(AsyncTonCenterClientV2):
+    """
+    A client which locates transactions from an in-memory mapping and records the lookups it made
+    """
+
+    def __init__(self, txs: Dict[Tuple[str, str, int], Tx], **kwargs):
+        super().__init__(network="testnet", api_key="dummy", qps=1000, **kwargs)
+        self.txs = txs
+        self.lookups: List[Tuple[str, str, int]] = []
+        self.failures: Dict[Tuple[str, str, int], List[Exception]] = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def try_locate_tx(self, source: str, destination: str, created_lt: int) -> Tx:
+        key = (source, destination, created_lt)
+        self.lookups.append(key)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0)
+            if self.failures.get(key):
+                raise self.failures[key].pop(0)
+            if key not in self.txs:
+                raise TonException(404)
+            return self.txs[key]
+        finally:
+            self.in_flight -= 1
+
+
+def make_fanout(width: int):
+    root = make_tx("root", [make_msg("A", f"B{i}", i) for i in range(width)] + [make_msg("A", "", 99)])
+    txs = {("A", f"B{i}", i): make_tx(f"b{i}", [make_msg(f"B{i}", "C", 1000 + i)]) for i in range(width)}
+    txs.update({(f"B{i}", "C", 1000 + i): make_tx(f"c{i}", []) for i in range(width)})
+    return root, txs
+
+
+class TestTraceTx:
+    @pytest.mark.asyncio
+    async def test_bounded_and_ordered(self):
+        root, txs = make_fanout(20)
+        client = FakeTraceClient(txs)
+        trace = await client.trace_tx(root, max_concurrency=4)
+        assert client.max_in_flight <= 4
+        assert [child["transaction_id"]["hash"] for child in trace["children"]] == [f"b{i}" for i in range(20)]
+        assert all(child["children"][0]["transaction_id"]["hash"] == f"c{i}" for i, child in enumerate(trace["children"]))
+        # external out messages are never looked up, response dicts are reused as nodes
+        assert len(client.lookups) == 40
+        assert trace["children"][0] is txs[("A", "B0", 0)]
+        assert "children" not in root
+
+    @pytest.mark.asyncio
+    async def test_dedup_messages(self):
+        msg = make_msg("A", "B", 1)
+        root = make_tx("root", [msg, dict(msg)])  # type: ignore
+        client = FakeTraceClient({("A", "B", 1): make_tx("b", [])})
+        trace = await client.trace_tx(root)
+        assert client.lookups == [("A", "B", 1)]
+        assert len(trace["children"]) == 1
+
+    @pytest.mark.asyncio
+    async def test_retry_transient_errors(self):
+        root, txs = make_fanout(2)
+        client = FakeTraceClient(txs)
+        client.failures[("A", "B1", 1)] = [TonException(500), asyncio.TimeoutError()]
+        trace = await client.trace_tx(root, backoff=0)
+        assert [child["transaction_id"]["hash"] for child in trace["children"]] == ["b0", "b1"]
+        assert client.lookups.count(("A", "B1", 1)) == 3
+
+    @pytest.mark.asyncio
+    async def test_raise_after_max_retries(self):
+        root, txs = make_fanout(2)
+        client = FakeTraceClient(txs)
+        client.failures[("A", "B1", 1)] = [aiohttp.ClientConnectionError()] * 3
+        with pytest.raises(aiohttp.ClientConnectionError):
+            await client.trace_tx(root, max_retries=2, backoff=0)
+
+    @pytest.mark.asyncio
+    async def test_missing_child_is_dropped(self):
+        root, txs = make_fanout(2)
+        del txs[("A", "B1", 1)]
+        client = FakeTraceClient(txs)
+        trace = await client.trace_tx(root)
+        assert [child["transaction_id"]["hash"] for child in trace["children"]] == ["b0"]
@@ -0,0 +1,65 @@
+from pytoncenter.address import Address
+from pytoncenter.v3.analytics import flatten_traces
+from pytoncenter.v3.models import *
+from tests.v3.trace import ALICE, BOB, make_hash, make_tx
+
+CAROL = "0:0000000000000000000000000000000000000000000000000000000000000001"
+
+
+def make_swap() -> TransactionTrace:
+    """
+    ALICE (external) -> BOB -> CAROL -> ALICE (bounced)
+                            -> ALICE
+    """
+    root = make_tx("root", None, lt=1, fees=10, value=0, account=ALICE)
+    to_bob = make_tx("bob", ALICE, lt=2, fees=20, value=1000, account=BOB)
+    to_carol = make_tx("carol", BOB, lt=3, fees=30, value=600, account=CAROL)
+    refund = make_tx("refund", BOB, lt=3, fees=5, value=300, account=ALICE)
+    bounce = make_tx("bounce", CAROL, lt=4, fees=1, value=500, account=ALICE)
+    bounce.in_msg.bounced = True
+    bounce.in_msg.opcode = "0xffffffff"
+    return TransactionTrace(
+        id=root.hash,
+        transaction=root,
+        children=[
+            TransactionTrace(
+                id=to_bob.hash,
+                transaction=to_bob,
+                children=[
+                    TransactionTrace(id=to_carol.hash, transaction=to_carol, children=[TransactionTrace(id=bounce.hash, transaction=bounce)]),
+                    TransactionTrace(id=refund.hash, transaction=refund),
+                ],
+            )
+        ],
+    )
+
+
+class TestTraceAnalytics:
+    def test_flatten(self):
+        flat = flatten_traces(make_swap())
+        assert flat.rows == 5
+        assert list(flat.parent) == [-1, 0, 1, 2, 1]
+        assert list(flat.depth) == [0, 1, 2, 3, 2]
+        assert list(flat.opcode) == [-1, -1, -1, 0xFFFFFFFF, -1]
+        assert flat.accounts[0] == Address(ALICE).to_string(False)
+
+    def test_aggregates(self):
+        flat = flatten_traces(make_swap())
+        assert flat.summary() == [{"id": make_hash("root"), "transactions": 5, "total_fees": 66, "total_value": 2400, "depth": 3, "bounced": 1}]
+        assert [flat.hashes[row] for row in flat.critical_path()] == [make_hash(name) for name in ("root", "bob", "carol", "bounce")]
+        assert [flat.hashes[row] for row in flat.bounced_rows()] == [make_hash("bounce")]
+        flows = flat.account_flows()
+        assert flows[Address(ALICE).to_string(False)] == {"received": 800, "sent": 1000, "fees": 16}
+        assert flows[Address(BOB).to_string(False)] == {"received": 1000, "sent": 900, "fees": 20}
+        assert flows[Address(CAROL).to_string(False)] == {"received": 600, "sent": 500, "fees": 30}
+
+    def test_batch(self):
+        single = make_tx("single", None, fees=7, account=BOB)
+        flat = flatten_traces(make_swap(), TransactionTrace(id=single.hash, transaction=single), make_swap())
+        assert len(flat) == 3
+        assert list(flat.offsets) == [0, 5, 6, 11]
+        assert flat.total_fees() == [66, 7, 66]
+        assert flat.max_depth() == [3, 0, 3]
+        assert flat.critical_path(2) == [6, 7, 8, 9]
+        assert flat.account_flows(1) == {Address(BOB).to_string(False): {"received": 0, "sent": 0, "fees": 7}}
+        assert flat.account_flows()[Address(ALICE).to_string(False)]["sent"] == 2000
@@ -1,11 +1,18 @@
 import asyncio
+from array import array
 
 import pytest
+from tonpy import begin_cell
 
 from pytoncenter import AsyncTonCenterClientV3, get_client
 from pytoncenter.address import Address
 from pytoncenter.decoder import AutoDecoder, Decoder, JettonDataDecoder, Types
-from pytoncenter.v3.models import GetDNSRecordRequest, RunGetMethodRequest
+from pytoncenter.v3.models import (
+    GetDNSRecordRequest,
+    GetMethodParameterOutput,
+    RunGetMethodRequest,
+    RunGetMethodResponse,
+)
 
 pytest_plugins = ("pytest_asyncio",)
 
@@ -71,3 +78,193 @@ class TestDecoder:
             )
         )
         assert record.address == Address("EQDVjQWmoS6xrPqPJ5vEFBPZdBnY075ydcoEEqpVWjJXZ9RE")
+
+
+OWNER = "0:2b790db779a6e344ee6094b09b859e0ac50f523888edc3678cd8fb845d784865"
+MASTER = "0:29754304394b879c1a3e45275b8a4919677a9622d64b7578f27dff6537f792e5"
+
+
+def address_cell(address: str) -> str:
+    return begin_cell().store_address(Address(address).to_string(True)).end_cell().to_boc()
+
+
+def wallet_data(balance: int, owner: str = OWNER, master: str = MASTER) -> RunGetMethodResponse:
+    """
+    A synthetic get_wallet_data result: balance, owner, jetton master and wallet code
+    """
+    stack = [
+        GetMethodParameterOutput(type="num", value=hex(balance)),
+        GetMethodParameterOutput(type="cell", value=address_cell(owner)),
+        GetMethodParameterOutput(type="cell", value=address_cell(master)),
+        GetMethodParameterOutput(type="cell", value=begin_cell().store_uint(balance % 2**64, 64).end_cell().to_boc()),
+    ]
+    return RunGetMethodResponse(gas_used=0, exit_code=0, stack=stack)
+
+
+def to_v2(result: RunGetMethodResponse):
+    return [{"type": p.type, "value": {"bytes": p.value} if p.type == "cell" else p.value} for p in result.stack]
+
+
+WalletDataDecoder = Decoder(
+    Types.Number("balance"),
+    Types.Address("owner"),
+    Types.Address("jetton"),
+    Types.B64String("jetton_wallet_code"),
+)
+
+
+class TestDecodeMany:
+    def test_decode_matches_v2_and_v3(self):
+        result = wallet_data(10**9)
+        output = WalletDataDecoder.decode(result)
+        assert list(output) == ["balance", "owner", "jetton", "jetton_wallet_code"]
+        assert output["balance"] == 10**9 and output["owner"] == OWNER and output["jetton"] == MASTER
+        assert WalletDataDecoder.decode(to_v2(result)) == output
+        with pytest.raises(AssertionError):
+            Decoder(Types.Number("balance"), Types.Number("owner"), Types.Address("jetton"), Types.Cell("code")).decode(to_v2(result))
+        with pytest.raises(AssertionError):
+            Decoder(Types.Number("balance")).decode(result)
+        with pytest.raises(ValueError):
+            WalletDataDecoder.decode("oops")
+
+    def test_decode_many_outputs(self):
+        results = [wallet_data(i, owner=OWNER if i % 2 else MASTER) for i in range(20)]
+        results[3] = to_v2(results[3])
+        expected = [WalletDataDecoder.decode(result) for result in results]
+        assert WalletDataDecoder.decode_many(results) == expected
+        assert WalletDataDecoder.decode_many(results, output="tuple") == [tuple(row.values()) for row in expected]
+        columns = WalletDataDecoder.decode_many(results, output="columns")
+        assert columns["balance"] == array("q", range(20))
+        assert columns["owner"] == [row["owner"] for row in expected]
+        # the shared jetton master is decoded once per batch
+        assert all(jetton is columns["jetton"][0] for jetton in columns["jetton"])
+
+    def test_decode_many_wide_numbers(self):
+        columns = WalletDataDecoder.decode_many([wallet_data(2**100), wallet_data(1)], output="columns")
+        assert columns["balance"] == [2**100, 1]
+        assert WalletDataDecoder.decode_many([], output="columns") == {"balance": array("q"), "owner": [], "jetton": [], "jetton_wallet_code": []}
+
+
+class TestAutoDecoderSchema:
+    def test_schema_is_learned_and_exported(self, monkeypatch):
+        decoder = AutoDecoder()
+        first = decoder.decode(wallet_data(1), code_hash="CODE", method="get_wallet_data")
+        assert first["idx_1"] == OWNER and first["idx_2"] == MASTER
+        assert isinstance(first["idx_3"], str)
+
+        # cached schema, no trial parsing of the code cell any more
+        def fail(*args, **kwargs):
+            raise AssertionError("trial parsing")
+
+        monkeypatch.setattr("pytoncenter.decoder._infer", fail)
+        second = decoder.decode(wallet_data(2), code_hash="CODE", method="get_wallet_data")
+        assert second["idx_0"] == 2 and second["idx_1"] == OWNER
+        assert decoder.decode(to_v2(wallet_data(3)), code_hash="CODE", method="get_wallet_data")["idx_0"] == 3
+        assert (decoder.hits, decoder.misses) == (2, 1)
+
+        exported = decoder.export("CODE", "get_wallet_data")
+        assert [type(t) for t in exported.types] == [Types.Number, Types.Address, Types.Address, Types.B64String]
+        assert exported.decode_many([wallet_data(4)], output="tuple")[0][:2] == (4, Address(OWNER))
+        with pytest.raises(KeyError):
+            decoder.export("CODE", "get_jetton_data")
+
+    def test_ambiguous_and_mismatched_results(self):
+        decoder = AutoDecoder()
+        addr_none = GetMethodParameterOutput(type="cell", value=begin_cell().store_uint(0, 2).end_cell().to_boc())
+        empty_admin = RunGetMethodResponse(gas_used=0, exit_code=0, stack=[GetMethodParameterOutput(type="num", value="0x1"), addr_none])
+        assert decoder.decode(empty_admin, code_hash="MASTER", method="get_jetton_data")["idx_0"] == 1
+        # an empty address could be any cell, so the schema is not learned yet
+        assert decoder.schemas() == {}
+
+        admin = wallet_data(1).stack[1]
+        with_admin = RunGetMethodResponse(gas_used=0, exit_code=0, stack=[GetMethodParameterOutput(type="num", value="0x1"), admin])
+        assert decoder.decode(with_admin, code_hash="MASTER", method="get_jetton_data")["idx_1"] == OWNER
+        assert list(decoder.schemas()) == [("MASTER", "get_jetton_data")]
+        # the admin renounced ownership, the schema does not fit and is learned again
+        assert isinstance(decoder.decode(empty_admin, code_hash="MASTER", method="get_jetton_data")["idx_1"], str)
+        assert decoder.schemas() == {}
+
+    def test_nested_values(self):
+        nested = GetMethodParameterOutput(type="tuple", value=[GetMethodParameterOutput(type="num", value="0x2"), wallet_data(1).stack[1]])
+        result = RunGetMethodResponse(gas_used=0, exit_code=0, stack=[nested])
+        assert AutoDecoder().decode(result) == {"idx_0": [2, Address(OWNER)]}
+
+
+def num(value: int) -> GetMethodParameterOutput:
+    return GetMethodParameterOutput(type="num", value=hex(value))
+
+
+def tup(*values: GetMethodParameterOutput, type: str = "tuple") -> GetMethodParameterOutput:
+    return GetMethodParameterOutput(type=type, value=list(values))
+
+
+def to_v2_entry(entry: GetMethodParameterOutput):
+    if entry.type == "num":
+        return {"@type": "tvm.stackEntryNumber", "number": {"@type": "tvm.numberDecimal", "number": str(int(entry.value, 16))}}
+    if entry.type in ("cell", "slice"):
+        return {"@type": f"tvm.stackEntry{entry.type.title()}", entry.type: {"@type": f"tvm.{entry.type}", "bytes": entry.value}}
+    return {"@type": f"tvm.stackEntry{entry.type.title()}", entry.type: {"@type": f"tvm.{entry.type}", "elements": [to_v2_entry(e) for e in entry.value]}}
+
+
+def to_v2_stack(result: RunGetMethodResponse):
+    return [{"type": p.type, "value": {"bytes": p.value} if p.type == "cell" else p.value if p.type == "num" else to_v2_entry(p)[p.type]} for p in result.stack]
+
+
+class TestNestedTypes:
+    def pool_state(self) -> RunGetMethodResponse:
+        owner = wallet_data(0).stack[1]
+        slice_boc = begin_cell().store_uint(0xABCD, 16).end_cell().to_boc()
+        stack = [
+            tup(num(10**12), num(2**100)),
+            tup(owner, owner, type="list"),
+            tup(tup(num(1), num(2)), tup(num(3), num(4)), type="list"),
+            GetMethodParameterOutput(type="slice", value=slice_boc),
+            tup(num(-5), tup(num(6)), GetMethodParameterOutput(type="slice", value=slice_boc)),
+        ]
+        return RunGetMethodResponse(gas_used=0, exit_code=0, stack=stack)
+
+    def decoder(self) -> Decoder:
+        return Decoder(
+            Types.Tuple("reserves", Types.Number("reserve0"), Types.Number("reserve1")),
+            Types.List("lps", Types.Address("lp")),
+            Types.List("ranges", Types.Tuple("range", Types.Number("lower"), Types.Number("upper"))),
+            Types.Slice("extra"),
+            Types.Tuple("untyped"),
+        )
+
+    def test_typed_nesting_v2_and_v3(self):
+        result = self.pool_state()
+        for data in (result, to_v2_stack(result)):
+            output = self.decoder().decode(data)
+            assert output["reserves"] == {"reserve0": 10**12, "reserve1": 2**100}
+            assert output["lps"] == [Address(OWNER), Address(OWNER)]
+            assert output["ranges"] == [{"lower": 1, "upper": 2}, {"lower": 3, "upper": 4}]
+            assert output["extra"].load_uint(16) == 0xABCD
+            assert output["untyped"][:2] == [-5, [6]]
+            assert output["untyped"][2].load_uint(16) == 0xABCD
+
+    def test_wrong_arity(self):
+        with pytest.raises(AssertionError):
+            Types.Tuple("reserves", Types.Number("reserve0")).decode([num(1), num(2)])
+        with pytest.raises(AssertionError):
+            Types.Tuple("reserves", Types.Number("reserve0"), Types.Number("reserve1")).decode([num(1)])
+
+    def test_deep_nesting(self):
+        depth = 5000
+        entry = num(7)
+        for _ in range(depth):
+            entry = tup(entry)
+        value = Types.Tuple("deep").decode(entry.value)
+        for _ in range(depth - 1):
+            value = value[0]
+        assert value == [7]
+
+    def test_numeric_arrays(self):
+        prices = tup(*[num(i) for i in range(10_000)], type="list")
+        assert Types.List("prices", Types.Number("price"), as_array=True).decode(prices.value) == array("q", range(10_000))
+        assert Types.List("prices", as_array=True).decode(to_v2_entry(prices)["list"]) == array("q", range(10_000))
+        assert Types.List("flags", Types.Bool("flag"), as_array=True).decode([num(0), num(2**64 - 1)]) == array("q", [0, 1])
+        # values that do not fit in 64 bits stay a list
+        assert Types.List("prices", as_array=True).decode([num(2**70)]) == [2**70]
+        with pytest.raises(AssertionError):
+            Types.List("prices", Types.Address("owner"), as_array=True)
@@ -0,0 +1,245 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict
+
+import pytest
+from tonpy import CellSlice, begin_cell
+from tonpy.fift.fift import convert_assembler
+from tonpy.tvm.tvm import method_name_to_id
+
+from pytoncenter import AsyncTonCenterClientV3
+from pytoncenter.address import Address, AddressBatch
+from pytoncenter.decoder import Decoder, Types
+from pytoncenter.exception import TonCenterException
+from pytoncenter.getmethod import BulkProgress, GetMethodCache, LocalGetMethodRunner
+from pytoncenter.v3.models import *
+
+pytest_plugins = ("pytest_asyncio",)
+
+POOL = "0:2b790db779a6e344ee6094b09b859e0ac50f523888edc3678cd8fb845d784865"
+OTHER = "0:29754304394b879c1a3e45275b8a4919677a9622d64b7578f27dff6537f792e5"
+
+
+class FakeGetMethodClient(AsyncTonCenterClientV3):
+    """
+    A client which runs get methods against in-memory accounts and counts the requests it made
+    """
+
+    def __init__(self, lts: Dict[str, int], **kwargs):
+        super().__init__(network="testnet", api_key="dummy", qps=1000, **kwargs)
+        self.lts = lts
+        self.account_calls = 0
+        self.run_calls = 0
+
+    async def get_account(self, req: GetAccountRequest) -> Account:
+        self.account_calls += 1
+        lt = self.lts[req.address.to_string(False)]
+        return Account(balance=0, code=None, data=None, last_transaction_lt=lt, last_transaction_hash=None, status="active")
+
+    async def _async_post(self, handler: str, payload):
+        assert handler == "runGetMethod"
+        self.run_calls += 1
+        lt = self.lts[Address(payload["address"]).to_string(False)]
+        return {"gas_used": 0, "exit_code": 0, "stack": [{"type": "num", "value": hex(lt)}]}
+
+
+# get_counter(x) returns x + counter, 77 returns (counter, [now, [balance, null]]), 78 returns (c4, c4 as slice, my_address, null)
+COUNTER_CODE = convert_assembler(
+    f"<{{ SETCP0 DUP {method_name_to_id('get_counter')} INT EQUAL IFJMP:<{{ DROP c4 PUSH CTOS 64 LDU DROP ADD }}> "
+    "DUP 77 EQINT IFJMP:<{ DROP c4 PUSH CTOS 64 LDU DROP NOW BALANCE 2 TUPLE }> "
+    "DUP 78 EQINT IFJMP:<{ DROP c4 PUSH c4 PUSH CTOS MYADDR NULL }> 11 THROW }>c"
+).to_boc()
+
+
+class FakeAccountClient(AsyncTonCenterClientV3):
+    """
+    A client which serves counter contracts whose counter is the last transaction lt
+    """
+
+    def __init__(self, lts: Dict[str, int]):
+        super().__init__(network="testnet", api_key="dummy", qps=1000)
+        self.lts = lts
+        self.account_calls = 0
+
+    async def get_account(self, req: GetAccountRequest) -> Account:
+        self.account_calls += 1
+        lt = self.lts[req.address.to_string(False)]
+        data = begin_cell().store_uint(lt, 64).end_cell().to_boc()
+        return Account(balance=5, code=COUNTER_CODE, data=data, last_transaction_lt=lt, last_transaction_hash=None, status="active")
+
+
+def run(address: str, method: str = "get_pool_data", stack=None) -> RunGetMethodRequest:
+    return RunGetMethodRequest(address=address, method=method, stack=stack or [])
+
+
+class TestGetMethodCache:
+    def test_validate_and_evict(self):
+        cache = GetMethodCache(maxsize=2, ttl=60)
+        assert cache.get(POOL, "m") is None
+        cache.validate(POOL, 10)
+        cache.put(POOL, "m", [], "a")
+        cache.put(Address(POOL).to_string(True), "m", [("num", 1)], "b")
+        assert cache.get(POOL, "m") == "a"
+        assert cache.get(POOL, "m", [("num", 1)]) == "b"
+        assert cache.validate(POOL, 10) == 0
+        assert cache.validate(POOL, 11) == 2
+        assert len(cache) == 0
+
+        cache.put(POOL, "m", [], "a", lt=12)
+        cache.put(OTHER, "m", [], "c", lt=5)
+        cache.put(OTHER, "n", [], "d", lt=5)
+        assert len(cache) == 2 and cache.get(POOL, "m") is None
+        assert cache.invalidate(OTHER) == 2 and cache.get(OTHER, "n") is None
+
+    def test_stale_addresses(self):
+        cache = GetMethodCache(ttl=0)
+        cache.put(POOL, "m", [], "a", lt=1)
+        assert not cache.is_fresh(POOL)
+        assert cache.stale_addresses() == [Address(POOL)]
+        assert cache.lt(POOL) == 1
+
+
+class TestCachedRunGetMethod:
+    @pytest.mark.asyncio
+    async def test_results_are_reused_until_new_transaction(self):
+        client = FakeGetMethodClient({POOL: 1, OTHER: 1}, get_method_cache=GetMethodCache(ttl=60))
+        first = await client.run_get_method(run(POOL))
+        assert (client.account_calls, client.run_calls) == (1, 1)
+        assert await client.run_get_method(run(Address(POOL).to_string(True))) is first
+        assert await client.run_get_method(run(POOL, stack=[GetMethodParameterInput(type="num", value=1)])) is not first
+        assert (client.account_calls, client.run_calls) == (1, 2)
+
+        # a new transaction on the pool, refresh checks every stale account once
+        client.lts[POOL] = 2
+        client.get_method_cache.ttl = 0
+        await client.run_get_method(run(OTHER))
+        account_calls = client.account_calls
+        assert await client.refresh_get_method_cache() == 2
+        assert client.account_calls == account_calls + 2
+        client.get_method_cache.ttl = 60
+        second = await client.run_get_method(run(POOL))
+        assert second.stack[0].value == "0x2"
+        assert await client.run_get_method(run(OTHER)) is not None
+        assert client.account_calls == account_calls + 2
+
+    @pytest.mark.asyncio
+    async def test_without_cache(self):
+        client = FakeGetMethodClient({POOL: 1})
+        await client.run_get_method(run(POOL))
+        await client.run_get_method(run(POOL))
+        assert (client.account_calls, client.run_calls) == (0, 2)
+
+
+class TestLocalGetMethodRunner:
+    @pytest.mark.asyncio
+    async def test_run_get_method(self):
+        client = FakeAccountClient({POOL: 41})
+        runner = LocalGetMethodRunner(client)
+        result = await runner.run_get_method(run(POOL, "get_counter", [GetMethodParameterInput(type="num", value=16)]))
+        assert (result.exit_code, result.stack[0].type, result.stack[0].value) == (0, "num", "0x39")
+
+        result = await runner.run_get_method(run(POOL, "77"), now=1000)
+        assert result.stack[0].value == "0x29"
+        assert result.stack[1].type == "tuple"
+        now, balance = result.stack[1].value
+        assert now.value == "0x3e8" and balance.value[0].value == "0x5" and balance.value[1].type == "unsupported_type"
+
+        result = await runner.run_get_method(run(Address(POOL).to_string(True), "78"))
+        assert [p.type for p in result.stack] == ["cell", "slice", "slice", "unsupported_type"]
+        assert Address(CellSlice(result.stack[2].value).load_address()) == Address(POOL)
+
+        result = await runner.run_get_method(run(POOL, "79"))
+        assert result.exit_code == 11
+        assert client.account_calls == 1
+
+    @pytest.mark.asyncio
+    async def test_refresh(self):
+        client = FakeAccountClient({POOL: 1, OTHER: 2})
+        runner = LocalGetMethodRunner(client)
+        assert (await runner.run_get_method(run(POOL, "get_counter", [GetMethodParameterInput(type="num", value=0)]))).stack[0].value == "0x1"
+        await runner.load(OTHER)
+        client.lts[POOL] = 3
+        assert await runner.refresh() == 1
+        assert (await runner.run_get_method(run(POOL, "get_counter", [GetMethodParameterInput(type="num", value=0)]))).stack[0].value == "0x3"
+        assert client.account_calls == 4
+        runner.invalidate(POOL)
+        assert len(runner) == 1
+
+    @pytest.mark.asyncio
+    async def test_run_many_over_process_pool(self):
+        client = FakeAccountClient({POOL: 10, OTHER: 20})
+        runner = LocalGetMethodRunner(client, executor=ProcessPoolExecutor(max_workers=2))
+        try:
+            reqs = [run(POOL if i % 2 else OTHER, "get_counter", [GetMethodParameterInput(type="num", value=i)]) for i in range(50)]
+            results = await runner.run_many(reqs, chunksize=7)
+            assert [int(r.stack[0].value, 16) for r in results] == [i + (10 if i % 2 else 20) for i in range(50)]
+            assert client.account_calls == 2
+            assert await runner.run_many([]) == []
+        finally:
+            runner._executor.shutdown()
+
+
+class FlakyGetMethodClient(AsyncTonCenterClientV3):
+    """
+    A client whose first request for every fifth address fails with 503, and whose get method `fail` throws
+    """
+
+    def __init__(self):
+        super().__init__(network="testnet", api_key="dummy", qps=1000)
+        self.failed = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def _async_post(self, handler: str, payload):
+        assert handler == "runGetMethod"
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.001)
+            address = Address(payload["address"]).to_string(False)
+            index = int(address[-4:], 16)
+            if index % 5 == 0 and address not in self.failed:
+                self.failed.add(address)
+                raise TonCenterException(503, "busy")
+            if payload["method"] == "fail":
+                return {"gas_used": 0, "exit_code": 11, "stack": []}
+            return {"gas_used": 0, "exit_code": 0, "stack": [{"type": "num", "value": hex(index)}]}
+        finally:
+            self.in_flight -= 1
+
+
+class TestIterGetMethods:
+    @pytest.mark.asyncio
+    async def test_stream_with_retries(self):
+        client = FlakyGetMethodClient()
+        addresses = AddressBatch.from_hash_parts(b"".join(i.to_bytes(32, "big") for i in range(200))).to_strings("raw")
+        pulled = 0
+
+        def calls():
+            nonlocal pulled
+            for i, address in enumerate(addresses):
+                pulled += 1
+                yield (address, "fail") if i == 7 else run(address, "get_index")
+
+        progress = BulkProgress()
+        results = {}
+        async for item in client.iter_get_methods(calls(), decoder=Decoder(Types.Number("index")), max_concurrency=8, backoff=0, progress=progress):
+            # calls are pulled only when a slot is free
+            assert pulled <= progress.completed + 8
+            results[item["index"]] = item
+
+        assert client.max_in_flight <= 8
+        assert len(results) == 200 and progress.completed == 200 and progress.in_flight == 0
+        assert (progress.failed, progress.retries) == (1, 40)
+        assert results[7]["error"].code == 11 and results[7]["result"].exit_code == 11
+        assert results[10]["attempts"] == 2 and results[10]["result"]["index"] == 10
+        assert all(results[i]["result"] == {"index": i} for i in range(200) if i != 7)
+        assert progress.rate > 0 and "completed=200" in repr(progress)
+
+    @pytest.mark.asyncio
+    async def test_give_up_after_max_retries(self):
+        client = FlakyGetMethodClient()
+        address = Address(f"0:{bytes(32).hex()}")
+        client.failed = set()
+        items = [item async for item in client.iter_get_methods([(address, "get_index")], max_retries=0)]
+        assert isinstance(items[0]["error"], TonCenterException) and items[0]["attempts"] == 1 and items[0]["result"] is None
@@ -0,0 +1,105 @@
+import base64
+
+import pytest
+from tonpy import CellSlice, begin_cell
+
+from pytoncenter import AsyncTonCenterClientV3, get_client
+from pytoncenter.address import Address, AddressBatch
+from pytoncenter.jetton import JettonWalletDeriver
+from pytoncenter.v3.models import *
+
+pytest_plugins = ("pytest_asyncio",)
+
+USDT = "EQCxE6mUtQJKFnGfaROTKOt1lZbDiiX1kCixRv7Nw2Id_sDs"
+OWNER = "0:2b790db779a6e344ee6094b09b859e0ac50f523888edc3678cd8fb845d784865"
+CODE = begin_cell().store_uint(0xDEAD, 16).store_ref(begin_cell().store_uint(1, 5).store_ref(begin_cell().end_cell()).end_cell()).end_cell()
+
+
+def store(address) -> str:
+    return Address(address).to_string(True)
+
+
+def reference_wallet(master: str, owner: str, layout: str = "standard", code=CODE) -> Address:
+    """
+    The wallet address computed by building the data and StateInit cells with tonpy
+    """
+    builder = begin_cell() if layout == "standard" else begin_cell().store_uint(0, 4)
+    builder = builder.store_grams(0).store_address(store(owner)).store_address(store(master))
+    data = (builder.store_ref(code) if layout == "standard" else builder).end_cell()
+    state_init = begin_cell().store_uint(0b0011, 4).store_ref(code).store_ref(data).store_uint(0, 1).end_cell()
+    return Address(f"0:{state_init.get_hash().lower()}")
+
+
+class FakeJettonClient(AsyncTonCenterClientV3):
+    def __init__(self):
+        super().__init__(network="testnet", api_key="dummy", qps=1000)
+        self.calls = 0
+
+    async def run_get_method(self, req: RunGetMethodRequest) -> RunGetMethodResponse:
+        self.calls += 1
+        if req.method == "get_jetton_data":
+            stack = [
+                GetMethodParameterOutput(type="num", value="0x0"),
+                GetMethodParameterOutput(type="num", value="0x0"),
+                GetMethodParameterOutput(type="cell", value=begin_cell().store_address(store(OWNER)).end_cell().to_boc()),
+                GetMethodParameterOutput(type="cell", value=begin_cell().end_cell().to_boc()),
+                GetMethodParameterOutput(type="cell", value=CODE.to_boc()),
+            ]
+            return RunGetMethodResponse(gas_used=0, exit_code=0, stack=stack)
+        assert req.method == "get_wallet_address"
+        owner = Address(CellSlice(req.stack[0].value).load_address())
+        wallet = begin_cell().store_address(store(reference_wallet(req.address.to_string(False), owner))).end_cell()
+        return RunGetMethodResponse(gas_used=0, exit_code=0, stack=[GetMethodParameterOutput(type="slice", value=wallet.to_boc())])
+
+
+class TestJettonWalletDeriver:
+    @pytest.mark.parametrize("layout", ["standard", "stablecoin"])
+    def test_derive_matches_cells(self, layout: str):
+        deriver = JettonWalletDeriver(layout)
+        deriver.register(USDT, CODE.to_boc())
+        owners = AddressBatch.from_hash_parts(bytes(range(32)) + bytes(32) + bytes(range(100, 132)), [0, -1, 0]).to_strings("raw")
+        expected = [reference_wallet(USDT, owner, layout) for owner in owners]
+        assert [deriver.derive(USDT, owner) for owner in owners] == expected
+        assert list(deriver.derive_many(Address(USDT).to_string(False), owners).to_strings("raw")) == [wallet.to_string(False) for wallet in expected]
+
+    def test_custom_layout_and_code_forms(self):
+        def layout(owner: Address, master: Address, code):
+            return begin_cell().store_grams(0).store_address(store(owner)).store_address(store(master)).store_ref(code).end_cell()
+
+        deriver = JettonWalletDeriver(layout=layout)
+        # the hex boc returned by JettonDataDecoder
+        deriver.register(USDT, base64.b64decode(CODE.to_boc()).hex(), layout="stablecoin")
+        assert deriver.derive(USDT, OWNER) == reference_wallet(USDT, OWNER, "stablecoin")
+        deriver.register(USDT, CODE)
+        assert deriver.derive(USDT, OWNER) == reference_wallet(USDT, OWNER)
+        with pytest.raises(KeyError):
+            deriver.derive(OWNER, OWNER)
+
+    def test_code_cache_is_bounded(self):
+        deriver = JettonWalletDeriver(maxsize=1)
+        deriver.register(USDT, CODE)
+        deriver.register(OWNER, CODE)
+        assert len(deriver) == 1 and OWNER in deriver and USDT not in deriver
+
+    @pytest.mark.asyncio
+    async def test_load_and_verify(self):
+        client = FakeJettonClient()
+        deriver = JettonWalletDeriver()
+        await deriver.load(client, USDT)
+        await deriver.load(client, USDT)
+        assert client.calls == 1
+        owners = AddressBatch.from_hash_parts(bytes(range(32)) * 20).to_strings("raw")
+        assert await deriver.verify(client, USDT, owners, sample=5) == []
+        assert client.calls == 6
+
+        stablecoin = JettonWalletDeriver("stablecoin")
+        stablecoin.register(USDT, CODE)
+        mismatches = await stablecoin.verify(client, USDT, [OWNER])
+        assert mismatches == [(Address(OWNER), stablecoin.derive(USDT, OWNER), reference_wallet(USDT, OWNER))]
+
+    @pytest.mark.asyncio
+    async def test_derive_match_api(self):
+        client = get_client(version="v3", network="mainnet", api_key="")
+        deriver = JettonWalletDeriver("stablecoin")
+        await deriver.load(client, USDT)
+        assert await deriver.verify(client, USDT, [OWNER], sample=1) == []
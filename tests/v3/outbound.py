@@ -0,0 +1,133 @@
+import asyncio
+import time
+from typing import Dict, List, Set
+
+import pytest
+from tonpy import begin_cell
+
+from pytoncenter import AsyncTonCenterClientV2, AsyncTonCenterClientV3
+from pytoncenter.exception import TonCenterException
+from pytoncenter.outbound import OutboundPipeline, message_hash
+from pytoncenter.v3.models import *
+
+pytest_plugins = ("pytest_asyncio",)
+
+
+def boc(i: int) -> str:
+    return begin_cell().store_uint(i, 32).end_cell().to_boc()
+
+
+class FakeChain:
+    """
+    Messages land after `delay` lookups, unless they are dropped
+    """
+
+    def __init__(self, delay: int = 1, dropped: Set[str] = frozenset(), aborted: Set[str] = frozenset()):
+        self.delay = delay
+        self.dropped = dropped
+        self.aborted = aborted
+        self.sent: List[str] = []
+        self.lookups: Dict[str, int] = {}
+
+    def lookup(self, msg_hash: str) -> List[Transaction]:
+        self.lookups[msg_hash] = self.lookups.get(msg_hash, 0) + 1
+        if msg_hash not in self.sent or msg_hash in self.dropped or self.lookups[msg_hash] <= self.delay:
+            return []
+        return [Transaction.model_construct(hash=f"tx-{msg_hash}", description={"aborted": msg_hash in self.aborted})]
+
+
+class FakeSendClient(AsyncTonCenterClientV3):
+    def __init__(self, chain: FakeChain, errors: Dict[str, List[Exception]] = {}):
+        super().__init__(network="testnet", api_key="dummy", qps=1000)
+        self.chain = chain
+        self.errors = {k: list(v) for k, v in errors.items()}
+
+    async def send_message(self, req: ExternalMessage) -> SentMessage:
+        msg_hash = message_hash(req.boc)
+        errors = self.errors.get(msg_hash)
+        if errors:
+            error = errors.pop(0)
+            # a timed out send may still reach the network
+            if getattr(error, "landed", False):
+                self.chain.sent.append(msg_hash)
+            raise error
+        self.chain.sent.append(msg_hash)
+        return SentMessage(message_hash=msg_hash)
+
+    async def get_transaction_by_message(self, req: GetTransactionByMessageRequest):
+        await asyncio.sleep(0)
+        return self.chain.lookup(req.msg_hash), {}
+
+
+class FakeV2SendClient(AsyncTonCenterClientV2):
+    def __init__(self, chain: FakeChain):
+        super().__init__(network="testnet", api_key="dummy", qps=1000)
+        self.chain = chain
+
+    async def send_boc(self, boc: str):
+        self.chain.sent.append(message_hash(boc))
+        return {"@type": "ok"}
+
+
+class TestOutboundPipeline:
+    @pytest.mark.asyncio
+    async def test_send_many_dedup_and_status(self):
+        chain = FakeChain(delay=2, aborted={message_hash(boc(3))})
+        pipeline = OutboundPipeline(FakeSendClient(chain), poll_interval=0.01, max_concurrency=2)
+        results = [result async for result in pipeline.send_many([boc(i) for i in range(5)] + [boc(1), (boc(2), 0)])]
+        assert sorted(r["hash"] for r in results) == sorted(message_hash(boc(i)) for i in range(5))
+        assert sorted(chain.sent) == sorted(message_hash(boc(i)) for i in range(5))
+        statuses = {r["hash"]: r["status"] for r in results}
+        assert statuses.pop(message_hash(boc(3))) == "failed" and set(statuses.values()) == {"confirmed"}
+        assert all(r["attempts"] == 1 and r["transaction"].hash == f"tx-{r['hash']}" for r in results)
+        assert len(pipeline) == 0 and message_hash(boc(0)) in pipeline
+        with pytest.raises(AssertionError):
+            pipeline.put(boc(9))
+
+    @pytest.mark.asyncio
+    async def test_retries_do_not_send_twice(self):
+        landed = TonCenterException(504, "timeout")
+        landed.landed = True
+        chain = FakeChain(delay=0)
+        errors = {message_hash(boc(0)): [landed], message_hash(boc(1)): [TonCenterException(502, "bad gateway")], message_hash(boc(2)): [TonCenterException(400, "invalid")]}
+        pipeline = OutboundPipeline(FakeSendClient(chain, errors), poll_interval=0.01, backoff=0.001)
+        results = {r["hash"]: r async for r in pipeline.send_many([boc(0), boc(1), boc(2)])}
+        # the timed out send landed, the retry finds its transaction instead of sending again
+        assert results[message_hash(boc(0))]["status"] == "confirmed" and chain.sent.count(message_hash(boc(0))) == 1
+        assert results[message_hash(boc(1))]["status"] == "confirmed" and results[message_hash(boc(1))]["attempts"] == 2
+        failed = results[message_hash(boc(2))]
+        assert failed["status"] == "failed" and failed["error"].code == 400 and failed["transaction"] is None
+
+    @pytest.mark.asyncio
+    async def test_expired_and_resend(self):
+        dropped = message_hash(boc(0))
+        chain = FakeChain(delay=0, dropped={dropped})
+        pipeline = OutboundPipeline(FakeSendClient(chain), poll_interval=0.01, resend_after=0.02)
+        pipeline.put(boc(0), valid_until=int(time.time()) + 1)
+        pipeline.close()
+        [result] = [r async for r in pipeline.results()]
+        assert result["status"] == "expired" and result["attempts"] > 1 and set(chain.sent) == {dropped}
+
+    @pytest.mark.asyncio
+    async def test_lookup_errors(self):
+        class BrokenLookupClient(FakeSendClient):
+            async def get_transaction_by_message(self, req: GetTransactionByMessageRequest):
+                if req.msg_hash == message_hash(boc(0)):
+                    raise TonCenterException(401, "unauthorized")
+                return await super().get_transaction_by_message(req)
+
+        chain = FakeChain(delay=1)
+        pipeline = OutboundPipeline(BrokenLookupClient(chain), poll_interval=0.01)
+        results = {r["hash"]: r async for r in pipeline.send_many([boc(i) for i in range(3)])}
+        # the broken lookup fails its message only, the others are still confirmed
+        broken = results.pop(message_hash(boc(0)))
+        assert broken["status"] == "failed" and broken["error"].code == 401
+        assert [r["status"] for r in results.values()] == ["confirmed", "confirmed"]
+
+    @pytest.mark.asyncio
+    async def test_v2_client(self):
+        chain = FakeChain(delay=0)
+        with pytest.raises(AssertionError):
+            OutboundPipeline(FakeV2SendClient(chain))
+        pipeline = OutboundPipeline(FakeV2SendClient(chain), confirm_client=FakeSendClient(chain), poll_interval=0.01)
+        assert [r["status"] async for r in pipeline.send_many([boc(0)])] == ["confirmed"] and chain.sent == [message_hash(boc(0))]
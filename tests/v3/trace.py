@@ -0,0 +1,256 @@
+import base64
+import hashlib
+import io
+from typing import Dict, List, Optional
+
+import pytest
+
+from pytoncenter import AsyncTonCenterClientV3
+from pytoncenter.utils import (
+    format_trace,
+    iter_trace_lines,
+    truncate_address,
+    write_trace,
+)
+from pytoncenter.v3.models import *
+from pytoncenter.v3.trace import (
+    TraceBuilder,
+    TraceStore,
+    build_trace,
+    is_pending,
+    iter_trace_nodes,
+    normalize_hash,
+)
+
+pytest_plugins = ("pytest_asyncio",)
+
+ALICE = "0:29754304394b879c1a3e45275b8a4919677a9622d64b7578f27dff6537f792e5"
+BOB = "0:2b790db779a6e344ee6094b09b859e0ac50f523888edc3678cd8fb845d784865"
+
+
+def make_hash(name: str) -> str:
+    return base64.b64encode(hashlib.sha256(name.encode()).digest()).decode()
+
+
+def make_message(name: str, source: Optional[str], destination: Optional[str], value: int = 0) -> Message:
+    return Message(
+        hash=make_hash(f"msg-{name}"),
+        source=source,
+        destination=destination,
+        value=value,
+        fwd_fee=None,
+        ihr_fee=None,
+        created_lt=None,
+        created_at=None,
+        opcode=None,
+        ihr_disabled=None,
+        bounce=None,
+        bounced=None,
+        import_fee=None,
+        message_content=None,
+        init_state=None,
+    )
+
+
+def make_tx(name: str, source: Optional[str], out: int = 0, lt: int = 1, fees: int = 0, value: int = 0, account: str = BOB) -> Transaction:
+    return Transaction(
+        account=account,
+        hash=make_hash(name),
+        lt=lt,
+        now=0,
+        orig_status="active",
+        end_status="active",
+        total_fees=fees,
+        prev_trans_hash=make_hash(f"prev-{name}"),
+        prev_trans_lt=0,
+        description=None,
+        block_ref=None,
+        in_msg=make_message(name, source, account, value),
+        out_msgs=[make_message(f"{name}-{i}", account, ALICE) for i in range(out)],
+        account_state_before=None,
+        account_state_after=None,
+        mc_block_seqno=None,
+    )
+
+
+class FakeTraceClient(AsyncTonCenterClientV3):
+    """
+    A client which resolves adjacent transactions from an in-memory graph and counts the requests it made
+    """
+
+    def __init__(self, txs: Dict[str, Transaction], children: Dict[str, List[str]], **kwargs):
+        super().__init__(network="testnet", api_key="dummy", qps=1000, **kwargs)
+        self.txs = txs
+        self.children = children
+        self.parents = {child: parent for parent, kids in children.items() for child in kids}
+        self.calls = 0
+
+    async def get_transactions(self, req=None):
+        self.calls += 1
+        return self.txs.get(req.hash), {}
+
+    async def get_adjacent_transactions(self, req: GetAdjacentTransactionsRequest):
+        self.calls += 1
+        if req.direction == "in":
+            return [self.txs[self.parents[req.hash]]], {}
+        return [self.txs[h] for h in self.children.get(req.hash, []) if h in self.txs], {}
+
+
+def make_graph():
+    root = make_tx("root", None, out=2)
+    a = make_tx("a", BOB, out=1)
+    b = make_tx("b", BOB)
+    c = make_tx("c", BOB)
+    txs = {tx.hash: tx for tx in (root, a, b, c)}
+    children = {root.hash: [a.hash, b.hash], a.hash: [c.hash]}
+    return txs, children, (root, a, b, c)
+
+
+class TestTraceStore:
+    def test_normalize_hash(self):
+        digest = hashlib.sha256(b"tx").digest()
+        expected = base64.b64encode(digest).decode()
+        assert normalize_hash(digest.hex()) == expected
+        assert normalize_hash(expected) == expected
+        assert normalize_hash(base64.urlsafe_b64encode(digest).decode().rstrip("=")) == expected
+
+    def test_index_members(self):
+        txs, _, (root, a, b, c) = make_graph()
+        trace = TransactionTrace(
+            id=root.hash,
+            transaction=root,
+            children=[TransactionTrace(id=a.hash, transaction=a, children=[TransactionTrace(id=c.hash, transaction=c)]), TransactionTrace(id=b.hash, transaction=b)],
+        )
+        store = TraceStore()
+        store.put(trace)
+        assert [node.transaction.hash for node in iter_trace_nodes(trace)] == [root.hash, a.hash, c.hash, b.hash]
+        for tx in txs.values():
+            assert store.get(base64.b64decode(tx.hash).hex()) is trace
+            assert store.trace_id(tx.hash) == root.hash
+        assert store.hits == 4
+
+    def test_lru_eviction(self):
+        store = TraceStore(maxsize=2)
+        traces = [TransactionTrace(id=make_hash(str(i)), transaction=make_tx(str(i), None)) for i in range(3)]
+        store.put(traces[0])
+        store.put(traces[1])
+        assert store.get(traces[0].id) is traces[0]
+        store.put(traces[2])
+        assert len(store) == 2
+        assert traces[1].id not in store
+        assert traces[0].id in store and traces[2].id in store
+
+    @pytest.mark.asyncio
+    async def test_member_lookup_is_local(self):
+        txs, children, (root, a, b, c) = make_graph()
+        client = FakeTraceClient(txs, children, trace_store=TraceStore())
+        trace = await client.get_trace_alternative(GetTransactionTraceRequest(hash=c.hash))
+        assert trace.id == root.hash
+        assert len(list(iter_trace_nodes(trace))) == 4
+        calls = client.calls
+        for tx in (root, a, b, c):
+            assert await client.get_trace_alternative(GetTransactionTraceRequest(hash=tx.hash)) is trace
+        assert client.calls == calls
+
+    @pytest.mark.asyncio
+    async def test_partial_trace_is_extended(self):
+        txs, children, (root, a, b, c) = make_graph()
+        indexed = {h: tx for h, tx in txs.items() if h != c.hash}
+        client = FakeTraceClient(indexed, children, trace_store=TraceStore())
+        trace = await client.get_trace_alternative(GetTransactionTraceRequest(hash=root.hash))
+        assert [node.transaction.hash for node in iter_trace_nodes(trace) if is_pending(node)] == [a.hash]
+
+        # the missing transaction gets indexed, only the pending node is fetched again
+        client.txs = txs
+        calls = client.calls
+        extended = await client.get_trace_alternative(GetTransactionTraceRequest(hash=b.hash))
+        assert client.calls == calls + 2
+        assert not any(is_pending(node) for node in iter_trace_nodes(extended))
+        assert client.trace_store.trace_id(c.hash) == root.hash
+
+
+def shape(trace: TransactionTrace):
+    return (trace.transaction.hash, [shape(child) for child in trace.children])
+
+
+class TestIterTrace:
+    @pytest.mark.asyncio
+    async def test_stream_edges(self):
+        txs, children, (root, a, b, c) = make_graph()
+        client = FakeTraceClient(txs, children)
+        edges = [edge async for edge in client.iter_trace(GetTransactionTraceRequest(hash=c.hash))]
+        assert sorted(edges, key=lambda e: e[1].hash) == sorted([(None, root), (root.hash, a), (root.hash, b), (a.hash, c)], key=lambda e: e[1].hash)
+        expected = await client.get_trace_alternative(GetTransactionTraceRequest(hash=c.hash))
+        assert shape(build_trace(edges, sort="asc")) == shape(expected)
+
+    @pytest.mark.asyncio
+    async def test_first_edge_from_root(self):
+        txs, children, (root, a, b, c) = make_graph()
+        client = FakeTraceClient(txs, children)
+        stream = client.iter_trace(GetTransactionTraceRequest(hash=root.hash))
+        assert await stream.__anext__() == (None, root)
+        assert client.calls == 1
+        await stream.aclose()
+
+    @pytest.mark.asyncio
+    async def test_stream_from_store(self):
+        txs, children, (root, a, b, c) = make_graph()
+        client = FakeTraceClient(txs, children, trace_store=TraceStore())
+        trace = await client.get_trace_alternative(GetTransactionTraceRequest(hash=root.hash))
+        calls = client.calls
+        builder = TraceBuilder()
+        async for parent_hash, tx in client.iter_trace(GetTransactionTraceRequest(hash=b.hash)):
+            builder.add(parent_hash, tx)
+        assert client.calls == calls
+        assert len(builder) == 4
+        assert shape(builder.build()) == shape(trace)
+
+    @pytest.mark.asyncio
+    async def test_errors_propagate(self):
+        txs, children, (root, a, b, c) = make_graph()
+        client = FakeTraceClient(txs, children)
+        del client.parents[a.hash]
+        with pytest.raises(KeyError):
+            async for _ in client.iter_trace(GetTransactionTraceRequest(hash=c.hash)):
+                pass
+
+
+class TestTraceRenderer:
+    def make_trace(self) -> TransactionTrace:
+        _, _, (root, a, b, c) = make_graph()
+        return TransactionTrace(
+            id=root.hash,
+            transaction=root,
+            children=[TransactionTrace(id=a.hash, transaction=a, children=[TransactionTrace(id=c.hash, transaction=c)]), TransactionTrace(id=b.hash, transaction=b)],
+        )
+
+    def test_tree_layout(self):
+        calls = []
+
+        def mapping(address):
+            calls.append(address)
+            return truncate_address(address)
+
+        lines = list(iter_trace_lines(self.make_trace(), address_mapping=mapping))
+        assert len(lines) == 4
+        assert lines[0].startswith("\033[95mExternal")
+        assert lines[1].startswith("├── ")
+        assert lines[2].startswith("│   └── ")
+        assert lines[3].startswith("└── ")
+        # BOB appears six times but is labelled once
+        assert len(calls) == 1
+
+    def test_write_and_format(self):
+        trace = self.make_trace()
+        buf = io.StringIO()
+        write_trace(trace, buf.write)
+        assert buf.getvalue() == format_trace(trace)
+        assert buf.getvalue().count("\n") == 4
+
+    def test_deep_trace(self):
+        node = TransactionTrace(id=make_hash("leaf"), transaction=make_tx("leaf", BOB))
+        for i in range(3000):
+            node = TransactionTrace(id=make_hash(str(i)), transaction=make_tx(str(i), BOB, out=1), children=[node])
+        lines = list(iter_trace_lines(node))
+        assert len(lines) == 3001
+        assert lines[-1].startswith(" " * 4 * 2999 + "└── ")